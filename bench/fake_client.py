@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TelegramClient simulado para benchmarks offline (sem rede, sem conta).
+
+Implementa o subconjunto usado pelo teleclone_mod:
+    iter_messages, get_messages, download_media, iter_download, upload_file,
+    send_file, send_message, get_input_entity, get_peer_id, get_entity,
+    client(GetForumTopicsRequest / SaveFilePartRequest / SaveBigFilePartRequest),
+    on / remove_event_handler (no-op)
+
+As mensagens são objetos Message reais do Telethon, gerados sob demanda a partir do id
+(determinísticos por `seed`): o cliente não guarda o histórico, então a memória medida
+é a do código sob teste.
+
+Simulação:
+- `latency`: segundos por RPC (cada página de iter_messages, parte de upload, envio…)
+- `bandwidth`: bytes/s por direção, COMPARTILHADO entre transferências simultâneas
+- `flood_every`: a cada N RPCs, FloodWaitError(`flood_seconds`)
+- `expire_ratio`: fração das mídias cuja 1ª referência vem expirada
+  (FileReferenceExpiredError até a mensagem ser recarregada com get_messages)
+"""
+import asyncio
+import inspect
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from telethon import utils
+from telethon.errors import FileReferenceExpiredError, FloodWaitError
+from telethon.extensions import markdown
+from telethon.tl import types
+from telethon.tl.custom.message import Message
+
+PART = 512 * 1024
+BIG_FILE = 10 * 1024 * 1024
+
+_EXTS = (
+    (".jpg", "image/jpeg"),
+    (".mp4", "video/mp4"),
+    (".pdf", "application/pdf"),
+    (".mp3", "audio/mpeg"),
+)
+_WORDS = ("lorem", "ipsum", "dolor", "sit", "amet", "teleclone", "backup", "tópico", "mídia", "olá")
+
+
+class SimConfig:
+    def __init__(
+        self,
+        messages: int = 10_000,
+        topics: int = 0,
+        media_ratio: float = 0.3,
+        media_size: int = 16 * 1024,
+        latency: float = 0.0,
+        bandwidth: float = 0.0,
+        flood_every: int = 0,
+        flood_seconds: int = 1,
+        expire_ratio: float = 0.0,
+        page_size: int = 100,
+        users: int = 50,
+        seed: int = 1,
+    ):
+        self.messages = int(messages)
+        self.topics = int(topics)
+        self.media_ratio = float(media_ratio)
+        self.media_size = int(media_size)
+        self.latency = float(latency)
+        self.bandwidth = float(bandwidth)      # 0 = ilimitado
+        self.flood_every = int(flood_every)    # 0 = sem FloodWait
+        self.flood_seconds = int(flood_seconds)
+        self.expire_ratio = float(expire_ratio)
+        self.page_size = max(1, int(page_size))
+        self.users = max(1, int(users))
+        self.seed = int(seed)
+
+
+class _Link:
+    """Um sentido do enlace: transferências simultâneas dividem a banda."""
+
+    def __init__(self, bandwidth: float):
+        self.bandwidth = bandwidth
+        self._free_at = 0.0
+
+    async def transfer(self, nbytes: int):
+        if not self.bandwidth or nbytes <= 0:
+            return
+        now = time.monotonic()
+        self._free_at = max(now, self._free_at) + nbytes / self.bandwidth
+        await asyncio.sleep(self._free_at - now)
+
+
+class FakeTelegramClient:
+    def __init__(self, cfg: Optional[SimConfig] = None, chat_id: int = 1_000_001, title: str = "Bench"):
+        self.cfg = cfg or SimConfig()
+        self.chat = types.Channel(
+            id=chat_id, title=title, photo=types.ChatPhotoEmpty(),
+            date=datetime(2024, 1, 1, tzinfo=timezone.utc),
+            megagroup=True, forum=self.cfg.topics > 0, access_hash=chat_id,
+        )
+        self.dest = types.Channel(
+            id=chat_id + 1, title=f"{title} (destino)", photo=types.ChatPhotoEmpty(),
+            date=datetime(2024, 1, 1, tzinfo=timezone.utc), megagroup=True, access_hash=chat_id + 1,
+        )
+        self.users = {
+            uid: types.User(id=uid, access_hash=uid, first_name=f"User{uid}", username=f"user{uid}")
+            for uid in range(10_001, 10_001 + self.cfg.users)
+        }
+        # atributos que Message._finish_init consulta
+        self._self_id = 1
+        self._mb_entity_cache: Dict[int, object] = {}
+        self.parse_mode = markdown  # padrão do TelegramClient (msg.text faz unparse)
+        self.session = SimpleNamespace(dc_id=2)
+
+        self._down = _Link(self.cfg.bandwidth)
+        self._up = _Link(self.cfg.bandwidth)
+        self._refreshed: set = set()   # ids recarregados (referência nova: b"ref-1")
+        self._next_out = 0
+        self.stats = {"rpcs": 0, "floods": 0, "expired": 0, "bytes_down": 0, "bytes_up": 0, "sent": 0}
+
+    # ───────── histórico sintético ─────────
+    @property
+    def first_id(self) -> int:
+        return self.cfg.topics + 2  # 1 = Geral; 2..T+1 = mensagens de criação dos tópicos
+
+    @property
+    def last_id(self) -> int:
+        return self.first_id + self.cfg.messages - 1
+
+    def topic_ids(self) -> List[int]:
+        return list(range(2, self.cfg.topics + 2))
+
+    def _topic_of(self, rnd: random.Random) -> int:
+        if not self.cfg.topics:
+            return 0
+        return rnd.randint(1, self.cfg.topics + 1)  # 1 = Geral
+
+    def _doomed(self, mid: int) -> bool:
+        """A 1ª referência desta mídia vem expirada?"""
+        if not self.cfg.expire_ratio:
+            return False
+        return random.Random(self.cfg.seed * 7_919 + mid).random() < self.cfg.expire_ratio
+
+    def build_message(self, mid: int) -> Message:
+        rnd = random.Random(self.cfg.seed * 1_000_003 + mid)
+        tid = self._topic_of(rnd)
+        reply_to = None
+        if tid > 1:
+            reply_to = types.MessageReplyHeader(forum_topic=True, reply_to_msg_id=tid, reply_to_top_id=tid)
+        text = " ".join(rnd.choice(_WORDS) for _ in range(rnd.randint(0, 30)))
+        media = None
+        if rnd.random() < self.cfg.media_ratio:
+            ext, mime = rnd.choice(_EXTS)
+            size = max(1, int(rnd.expovariate(1 / self.cfg.media_size)))
+            attrs = [types.DocumentAttributeFilename(f"arquivo_{mid}{ext}")]
+            if mime.startswith("video/"):
+                attrs.append(types.DocumentAttributeVideo(duration=10, w=640, h=360, supports_streaming=True))
+            media = types.MessageMediaDocument(document=types.Document(
+                id=mid, access_hash=mid, file_reference=b"ref-%d" % (mid in self._refreshed),
+                date=None, mime_type=mime, size=size, dc_id=2, attributes=attrs,
+            ))
+        if not text and media is None:
+            text = f"mensagem {mid}"
+        uid = 10_001 + rnd.randrange(self.cfg.users)
+        msg = Message(
+            id=mid, peer_id=types.PeerChannel(self.chat.id),
+            date=datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(seconds=mid),
+            message=text, out=False, from_id=types.PeerUser(uid),
+            reply_to=reply_to, media=media,
+        )
+        msg._finish_init(self, {uid: self.users[uid], utils.get_peer_id(self.chat): self.chat}, None)
+        return msg
+
+    # ───────── custo simulado ─────────
+    async def _rpc(self, flood: bool = True):
+        self.stats["rpcs"] += 1
+        if self.cfg.latency:
+            await asyncio.sleep(self.cfg.latency)
+        if flood and self.cfg.flood_every and self.stats["rpcs"] % self.cfg.flood_every == 0:
+            self.stats["floods"] += 1
+            raise FloodWaitError(None, capture=self.cfg.flood_seconds)
+
+    async def _recv(self, n: int):
+        self.stats["bytes_down"] += n
+        await self._down.transfer(n)
+
+    async def _send_bytes(self, n: int):
+        self.stats["bytes_up"] += n
+        await self._up.transfer(n)
+
+    # ───────── entidades ─────────
+    async def get_input_entity(self, entity):
+        return utils.get_input_peer(entity)
+
+    async def get_entity(self, entity):
+        return entity
+
+    async def get_peer_id(self, entity):
+        return utils.get_peer_id(entity)
+
+    def on(self, _event):
+        return lambda fn: fn
+
+    def add_event_handler(self, *_a, **_k):
+        pass
+
+    def remove_event_handler(self, *_a, **_k):
+        pass
+
+    # ───────── leitura ─────────
+    async def iter_messages(self, entity, limit: Optional[int] = None, *, reverse: bool = False,
+                            reply_to: Optional[int] = None, min_id: int = 0, max_id: int = 0, **_kw):
+        ids = range(self.first_id, self.last_id + 1)
+        if not reverse:
+            ids = reversed(ids)
+        served = 0
+        for mid in ids:
+            if mid <= min_id or (max_id and mid >= max_id):
+                continue
+            msg = self.build_message(mid)
+            if reply_to is not None:
+                rt = msg.reply_to
+                top = (rt.reply_to_top_id or rt.reply_to_msg_id) if rt else 0
+                if top != reply_to:
+                    continue
+            if served % self.cfg.page_size == 0:
+                # uma página por page_size mensagens; o Telethon absorve FloodWait
+                # curto na paginação (flood_sleep_threshold), então aqui não há injeção
+                await self._rpc(flood=False)
+            served += 1
+            yield msg
+            if limit is not None and served >= limit:
+                return
+
+    async def get_messages(self, entity, limit: Optional[int] = None, *, ids=None, **_kw):
+        await self._rpc()
+        if ids is None:
+            out = []
+            async for m in self.iter_messages(entity, limit=limit or 1):
+                out.append(m)
+            return out
+        single = isinstance(ids, int)
+        ids = [ids] if single else list(ids)
+        res = []
+        for mid in ids:
+            if self.first_id <= mid <= self.last_id:
+                self._refreshed.add(mid)
+                res.append(self.build_message(mid))
+            else:
+                res.append(None)
+        return res[0] if single else res
+
+    def _document(self, media):
+        media = getattr(media, "media", media)
+        doc = getattr(media, "document", None)
+        if doc is None:
+            return None
+        if doc.file_reference == b"ref-0" and self._doomed(doc.id):
+            self.stats["expired"] += 1
+            raise FileReferenceExpiredError(None)
+        return doc
+
+    async def download_media(self, message, file=None, *, progress_callback=None, thumb=None, **_kw):
+        if isinstance(message, (types.PhotoSize, types.PhotoStrippedSize, types.PhotoCachedSize)):
+            await self._rpc()
+            return b"\xff\xd8thumb"
+        await self._rpc()
+        doc = self._document(message)
+        if doc is None:
+            return None
+        size = int(doc.size)
+        to_bytes = file is bytes
+        buf = bytearray() if to_bytes else None
+        fh = None
+        if not to_bytes and isinstance(file, (str, os.PathLike)):
+            fh = open(file, "wb")
+        try:
+            done = 0
+            while done < size:
+                n = min(PART, size - done)
+                await self._recv(n)
+                chunk = bytes(n)
+                if to_bytes:
+                    buf += chunk
+                elif fh is not None:
+                    fh.write(chunk)
+                elif file is not None:
+                    file.write(chunk)
+                done += n
+                if progress_callback:
+                    r = progress_callback(done, size)
+                    if inspect.isawaitable(r):  # como o Telethon
+                        await r
+        finally:
+            if fh is not None:
+                fh.close()
+        if to_bytes:
+            return bytes(buf)
+        return str(file) if fh is not None else file
+
+    async def iter_download(self, media, *, offset: int = 0, request_size: int = PART,
+                            file_size: Optional[int] = None, **_kw):
+        doc = self._document(media)
+        size = int(file_size if file_size is not None else doc.size)
+        done = offset
+        while done < size:
+            await self._rpc()
+            n = min(request_size, size - done)
+            await self._recv(n)
+            done += n
+            yield bytes(n)
+
+    # ───────── escrita ─────────
+    async def upload_file(self, file, *, file_name: Optional[str] = None, part_size_kb: float = 512, **_kw):
+        if isinstance(file, (str, os.PathLike)):
+            size = os.path.getsize(file)
+            name = file_name or os.path.basename(file)
+        else:
+            size = len(file.read())
+            name = file_name or "file"
+        part = int(part_size_kb * 1024)
+        parts = max(1, -(-size // part))
+        for i in range(parts):
+            await self._rpc()
+            await self._send_bytes(min(part, size - i * part))
+        fid = random.getrandbits(63)
+        if size > BIG_FILE:
+            return types.InputFileBig(fid, parts, name)
+        return types.InputFile(fid, parts, name, "")
+
+    def _sent(self, entity, text: str) -> Message:
+        self._next_out += 1
+        self.stats["sent"] += 1
+        return Message(id=self._next_out, peer_id=utils.get_peer(entity), message=text or "", out=True,
+                       date=datetime.now(timezone.utc))
+
+    async def send_file(self, entity, file, *, caption: str = "", **_kw):
+        if isinstance(file, (str, os.PathLike)) or callable(getattr(file, "read", None)):
+            await self.upload_file(file)
+        await self._rpc()
+        return self._sent(entity, caption)
+
+    async def send_message(self, entity, message: str = "", **_kw):
+        await self._rpc()
+        return self._sent(entity, message)
+
+    async def __call__(self, request, ordered: bool = False):
+        name = type(request).__name__
+        await self._rpc()
+        if name == "GetForumTopicsRequest":
+            tids = [t for t in self.topic_ids() if not request.offset_topic or t > request.offset_topic]
+            page = tids[: request.limit or 100]
+            return SimpleNamespace(topics=[
+                SimpleNamespace(id=t, title=f"Tópico {t}", top_message=t,
+                                date=datetime(2024, 1, 1, tzinfo=timezone.utc))
+                for t in page
+            ])
+        if name in ("SaveFilePartRequest", "SaveBigFilePartRequest"):
+            await self._send_bytes(len(request.bytes))
+            return True
+        raise NotImplementedError(f"FakeTelegramClient: {name}")
+
+    # ───────── ciclo de vida ─────────
+    async def start(self, *_a, **_k):
+        return self
+
+    async def disconnect(self):
+        pass
+
+    def is_connected(self) -> bool:
+        return True
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de tempo de import (startup) com orçamento para detectar regressões.
+
+Uso:
+    python bench/import_time.py             # melhor de 5 execuções por módulo
+    python bench/import_time.py --runs 10
+    TC_IMPORT_BUDGET_SCALE=2 python bench/import_time.py   # máquina lenta (CI)
+
+Cada módulo é importado num interpretador novo (stdin fechado). Além do tempo, verifica:
+- import não pede credenciais (input() com stdin fechado quebraria o import)
+- import não cria teleclone_mod/data/
+- tkinter e bs4 não são carregados no import
+Sai com código 1 se algum módulo passar do orçamento ou violar as regras acima.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+DATA_DIR = ROOT / "teleclone_mod" / "data"
+
+# orçamento (ms) por módulo; Telethon sozinho custa ~250ms numa máquina comum
+BUDGET_MS = {
+    "teleclone_mod": 50,
+    "teleclone_mod.cli": 800,
+    "teleclone_mod.core": 900,
+    "teleclone_mod.forwarding": 900,
+    "teleclone_mod.daemon": 1000,
+}
+FORBIDDEN = ("tkinter", "bs4")
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import {mod}
+dt = (time.perf_counter() - t0) * 1000
+print(json.dumps({{"ms": dt, "heavy": [m for m in {forbidden!r} if m in sys.modules]}}))
+"""
+
+
+def measure(mod: str, runs: int):
+    best = None
+    heavy = []
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(mod=mod, forbidden=FORBIDDEN)],
+            cwd=str(ROOT), stdin=subprocess.DEVNULL, capture_output=True, text=True,
+            env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1"),
+        )
+        if proc.returncode != 0:
+            return None, [], proc.stderr.strip().splitlines()[-1:]
+        res = json.loads(proc.stdout.strip().splitlines()[-1])
+        best = res["ms"] if best is None else min(best, res["ms"])
+        heavy = res["heavy"]
+    return best, heavy, []
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+    scale = float(os.getenv("TC_IMPORT_BUDGET_SCALE", "1"))
+    data_existed = DATA_DIR.exists()
+
+    failed = False
+    print(f"{'módulo':28} {'ms':>8} {'orçamento':>10}  status")
+    for mod, budget in BUDGET_MS.items():
+        ms, heavy, err = measure(mod, args.runs)
+        limit = budget * scale
+        if ms is None:
+            status, failed = f"ERRO: {' '.join(err)}", True
+            print(f"{mod:28} {'-':>8} {limit:10.0f}  {status}")
+            continue
+        problems = []
+        if ms > limit:
+            problems.append("acima do orçamento")
+        if heavy:
+            problems.append("carregou " + ", ".join(heavy))
+        failed |= bool(problems)
+        print(f"{mod:28} {ms:8.1f} {limit:10.0f}  {'; '.join(problems) or 'ok'}")
+
+    if not data_existed and DATA_DIR.exists():
+        print("❌ import criou teleclone_mod/data/ (efeito colateral)")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
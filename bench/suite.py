@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmarks offline dos fluxos principais contra o TelegramClient simulado (fake_client.py).
+
+Uso:
+    python bench/suite.py                                   # 10k mensagens, todos os casos
+    python bench/suite.py --messages 10k,100k,1m --cases export,html
+    python bench/suite.py --latency-ms 30 --bandwidth-mbs 8 --flood-every 500 --expire-ratio 0.01
+    python bench/suite.py --json resultados.json
+    python bench/suite.py --archive                          # export/upload via export.tar
+
+Casos (nesta ordem, num diretório temporário compartilhado):
+    export   core.export_topic       (baixa as mídias + chat.html)
+    html     core.generate_html_only (refaz o chat.html sem baixar)
+    upload   core.upload_from_export (reenvia a pasta exportada)
+    forward  forwarding.forward_history
+    forum    core.export_forum       (todos os tópicos em paralelo; só com --cases, use --topics)
+
+Cada caso roda num interpretador novo: o pico de memória (RSS máximo) é só dele.
+Diferenças em relação ao uso real, para o benchmark medir trabalho e não espera:
+- core.DELAY_BETWEEN_UPLOADS = 0 (pausa fixa entre envios)
+- flood.FLOOD_MARGIN = --flood-margin (padrão 0; o FloodWait simulado já é o prazo)
+- prompts (input) respondem ENTER
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BENCH = Path(__file__).resolve().parent
+
+CASES = ("export", "html", "upload", "forward")
+EXTRA_CASES = ("forum",)  # fora do padrão
+TOPIC_NAME = "bench"
+
+
+def _count(v: str) -> int:
+    v = v.strip().lower()
+    mult = {"k": 1_000, "m": 1_000_000}.get(v[-1:], 1)
+    return int(float(v[:-1] if mult > 1 else v) * mult)
+
+
+def _peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024  # bytes no macOS, KB no Linux
+
+
+# ───────────────────── processo filho (um caso) ─────────────────────
+def _child(case: str, cfg: dict, flood_margin: float):
+    import asyncio
+    import builtins
+
+    sys.path[:0] = [str(ROOT), str(BENCH)]
+    from fake_client import FakeTelegramClient, SimConfig
+    from teleclone_mod import core, flood, forwarding
+
+    core.DELAY_BETWEEN_UPLOADS = 0
+    flood.FLOOD_MARGIN = flood_margin
+    builtins.input = lambda *_a, **_k: ""
+
+    client = FakeTelegramClient(SimConfig(**cfg))
+    grp = client.chat
+    folder = Path(core.sanitize(grp.title)) / core.sanitize(TOPIC_NAME)
+
+    async def _run():
+        if case == "export":
+            await core.export_topic(client, grp, None, TOPIC_NAME, 0)
+        elif case == "html":
+            await core.generate_html_only(client, grp, None, TOPIC_NAME)
+        elif case == "upload":
+            await core.upload_from_export(client, folder, client.dest, None)
+        elif case == "forward":
+            await forwarding.forward_history(client, grp, client.dest)
+        elif case == "forum":
+            await core.export_forum(client, grp)
+        else:
+            raise SystemExit(f"caso desconhecido: {case}")
+
+    real_stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w", encoding="utf-8")  # barras de progresso
+    try:
+        t0 = time.perf_counter()
+        asyncio.run(_run())
+        secs = time.perf_counter() - t0
+    finally:
+        sys.stdout.close()
+        sys.stdout = real_stdout
+
+    st = client.stats
+    print(json.dumps({
+        "case": case,
+        "messages": cfg["messages"],
+        "seconds": round(secs, 3),
+        "msgs_per_s": round(cfg["messages"] / secs, 1) if secs else None,
+        "mb_per_s": round((st["bytes_down"] + st["bytes_up"]) / 1024**2 / secs, 2) if secs else None,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "sim": st,
+    }))
+
+
+def _spawn(case: str, cfg: dict, args, workdir: Path, env: dict) -> dict:
+    cmd = [sys.executable, str(Path(__file__).resolve()), "--child", case,
+           "--cfg", json.dumps(cfg), "--flood-margin", str(args.flood_margin)]
+    env = dict(env, TC_STORE_DIR=str(workdir / "msgstore"),  # cache de mensagens por execução
+               TC_UPLOAD_JOURNAL=str(workdir / "upload_journal.sqlite"))
+    proc = subprocess.run(cmd, cwd=workdir, env=env, stdin=subprocess.DEVNULL,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"case": case, "messages": cfg["messages"], "error": (proc.stderr or proc.stdout).strip()[-2000:]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+# ───────────────────── processo pai ─────────────────────
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--messages", default="10k", help="tamanhos do histórico (ex.: 10k,100k,1m)")
+    ap.add_argument("--cases", default=",".join(CASES))
+    ap.add_argument("--topics", type=int, default=0)
+    ap.add_argument("--media-ratio", type=float, default=0.3)
+    ap.add_argument("--media-kb", type=float, default=16, help="tamanho médio das mídias (KB)")
+    ap.add_argument("--latency-ms", type=float, default=0)
+    ap.add_argument("--bandwidth-mbs", type=float, default=0, help="MB/s por direção (0 = ilimitado)")
+    ap.add_argument("--flood-every", type=int, default=0)
+    ap.add_argument("--flood-seconds", type=int, default=1, help="prazo do FloodWait simulado (0 vira 60s no retry)")
+    ap.add_argument("--flood-margin", type=float, default=0.0)
+    ap.add_argument("--expire-ratio", type=float, default=0.0)
+    ap.add_argument("--concurrency", type=int, default=None, help="TC_CONCURRENCY do forward")
+    ap.add_argument("--archive", action="store_true", help="TC_EXPORT_ARCHIVE=1 (export num .tar)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--json", help="grava os resultados neste arquivo")
+    ap.add_argument("--keep", action="store_true", help="mantém o diretório de trabalho")
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    ap.add_argument("--cfg", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        _child(args.child, json.loads(args.cfg), args.flood_margin)
+        return
+
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+    bad = [c for c in cases if c not in CASES + EXTRA_CASES]
+    if bad:
+        ap.error(f"casos desconhecidos: {', '.join(bad)}")
+
+    env = dict(os.environ)
+    if args.concurrency:
+        env["TC_CONCURRENCY"] = str(args.concurrency)
+    if args.archive:
+        env["TC_EXPORT_ARCHIVE"] = "1"
+
+    results = []
+    print(f"{'mensagens':>10}  {'caso':8} {'s':>9} {'msgs/s':>10} {'MB/s':>8} {'pico RSS MB':>12}")
+    for n in (_count(v) for v in args.messages.split(",") if v.strip()):
+        cfg = dict(
+            messages=n, topics=args.topics, media_ratio=args.media_ratio,
+            media_size=int(args.media_kb * 1024), latency=args.latency_ms / 1000,
+            bandwidth=args.bandwidth_mbs * 1024**2, flood_every=args.flood_every,
+            flood_seconds=args.flood_seconds, expire_ratio=args.expire_ratio, seed=args.seed,
+        )
+        workdir = Path(tempfile.mkdtemp(prefix=f"tc-bench-{n}-"))
+        try:
+            if "upload" in cases and "export" not in cases:
+                _spawn("export", cfg, args, workdir, env)  # pasta exportada para o upload
+            for case in cases:
+                r = _spawn(case, cfg, args, workdir, env)
+                results.append(r)
+                if "error" in r:
+                    print(f"{n:>10}  {case:8} ❌ {r['error'].splitlines()[-1]}")
+                else:
+                    print(f"{n:>10}  {case:8} {r['seconds']:>9.2f} {r['msgs_per_s']:>10.1f} "
+                          f"{r['mb_per_s']:>8.2f} {r['peak_rss_mb']:>12.1f}")
+        finally:
+            if args.keep:
+                print(f"   (arquivos em {workdir})")
+            else:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2, ensure_ascii=False), "utf-8")
+    sys.exit(1 if any("error" in r for r in results) else 0)
+
+
+if __name__ == "__main__":
+    main()
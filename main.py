@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import asyncio
-from teleclone_mod.cli import main
+from teleclone_mod.cli import main, setup_event_loop_policy
 
 if __name__ == "__main__":
+    setup_event_loop_policy()
     asyncio.run(main())
@@ -1,3 +1,13 @@
 # teleclone_mod/__init__.py
-from .forwarding import forward_history, live_mirror
-from .users      import copy_users
+# Imports preguiçosos: `import teleclone_mod` não carrega Telethon nem submódulos.
+__all__ = ["forward_history", "live_mirror", "copy_users"]
+
+
+def __getattr__(name):
+    if name in ("forward_history", "live_mirror"):
+        from . import forwarding
+        return getattr(forwarding, name)
+    if name == "copy_users":
+        from .users import copy_users
+        return copy_users
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Export num único arquivo .tar (em vez de milhares de arquivos soltos em media/):
+- Cada mídia baixada é anexada ao <tópico>/export.tar assim que termina (só append)
+- Índice ao lado (export.tar.idx, uma linha JSON por entrada: nome, id da mensagem,
+  offset e tamanho) → leitura de qualquer entrada por offset, sem extrair
+- Retomada: o índice diz o que já está no tar; ao reabrir, os bytes depois da última
+  entrada indexada (gravação interrompida) são descartados
+- Índice perdido (ex.: só o .tar foi para o armazenamento frio)? É refeito lendo
+  só os cabeçalhos do tar (o id da mensagem vai no comentário PAX da entrada)
+- Sem compressão: foto/vídeo já vêm comprimidos e cada entrada continua contígua
+  (tar comum: `tar -xf export.tar` também funciona)
+- Mesmo nome de novo (chat.html a cada export) deixa a cópia anterior morta no
+  meio do .tar; no close(), com mais de TC_ARCHIVE_COMPACT_MB mortos e mais de 10%
+  do arquivo, o .tar é reescrito só com as entradas vivas (índice apagado antes da
+  troca: queda no meio → o índice é refeito pelos cabeçalhos)
+- TC_EXPORT_ARCHIVE=1 → export_topic grava no .tar por padrão
+"""
+import io
+import json
+import os
+import shutil
+import tarfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Set
+
+ARCHIVE_NAME = "export.tar"
+INDEX_SUFFIX = ".idx"
+TO_ARCHIVE = os.getenv("TC_EXPORT_ARCHIVE", "0") == "1"
+COMPACT_MIN = float(os.getenv("TC_ARCHIVE_COMPACT_MB", "16")) * 1024 * 1024
+COMPACT_RATIO = 0.10
+
+_BLOCK = tarfile.BLOCKSIZE
+_PAX_COMMENT = "comment"  # chave PAX padrão (ignorada pelo tar): "msg_id=<id>"
+
+
+def _padded(n: int) -> int:
+    return -(-n // _BLOCK) * _BLOCK
+
+
+class Entry(NamedTuple):
+    name: str
+    msg_id: int
+    offset: int  # início dos dados (depois do cabeçalho)
+    size: int
+
+
+class EntryReader(io.RawIOBase):
+    """Leitura de uma entrada do tar como arquivo próprio (seek/tell/read)."""
+
+    def __init__(self, path: Path, entry: Entry):
+        super().__init__()
+        self.name = os.path.basename(entry.name)  # Telethon usa o nome para o tipo/atributos
+        self._fh = open(path, "rb")
+        self._start = entry.offset
+        self._size = entry.size
+        self._pos = 0
+
+    def mmap_region(self):
+        """(fd, início, tamanho) da entrada dentro do .tar (parupload.py mapeia sem copiar)."""
+        return self._fh.fileno(), self._start, self._size
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self._size}[whence]
+        self._pos = max(0, min(self._size, base + offset))
+        return self._pos
+
+    def readinto(self, b):
+        n = min(len(b), self._size - self._pos)
+        if n <= 0:
+            return 0
+        self._fh.seek(self._start + self._pos)
+        got = self._fh.readinto(memoryview(b)[:n])
+        self._pos += got
+        return got
+
+    def close(self):
+        if not self.closed:
+            self._fh.close()
+        super().close()
+
+
+class ExportArchive:
+    """export.tar + índice. Escritas serializadas (chame add_* via asyncio.to_thread)."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.idx_path = self.path.with_name(self.path.name + INDEX_SUFFIX)
+        self.entries: Dict[str, Entry] = {}
+        self.dead = 0  # bytes de cópias substituídas (mesmo nome gravado de novo)
+        self._lock = threading.Lock()
+        self._fh = None
+        self._idx = None
+        self._load()
+
+    # ───────── índice ─────────
+    def _load(self):
+        torn = False
+        if self.idx_path.exists():
+            with self.idx_path.open(encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        if not line.endswith("\n"):
+                            raise ValueError(line)
+                        e = Entry(**json.loads(line))
+                    except (ValueError, TypeError):
+                        torn = True  # linha parcial de uma gravação interrompida
+                        break
+                    self._put(e)
+        elif self.path.exists():
+            self._rebuild()
+        # entradas além do fim real do arquivo (queda antes do flush dos dados)
+        size = self.path.stat().st_size if self.path.exists() else 0
+        bad = [n for n, e in self.entries.items() if e.offset + e.size > size]
+        for n in bad:
+            del self.entries[n]
+        if bad or torn:
+            # reescreve sem a cauda: o append seguinte não pode ficar atrás do lixo
+            self._write_index()
+
+    def _rebuild(self):
+        try:
+            with tarfile.open(self.path, "r:") as tf:
+                for ti in tf:
+                    if ti.isfile():
+                        note = ti.pax_headers.get(_PAX_COMMENT, "")
+                        mid = int(note[7:]) if note.startswith("msg_id=") and note[7:].isdigit() else 0
+                        self._put(Entry(ti.name, mid, ti.offset_data, ti.size))
+        except tarfile.TarError:
+            pass  # cauda truncada: fica o que deu para ler
+        self._write_index()
+
+    def _put(self, e: Entry):
+        old = self.entries.get(e.name)
+        if old is not None and old.offset != e.offset:
+            self.dead += _padded(old.size) + _BLOCK  # dados + cabeçalho (aprox.)
+        self.entries[e.name] = e
+
+    def _write_index(self):
+        tmp = self.idx_path.with_suffix(self.idx_path.suffix + ".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            for e in sorted(self.entries.values(), key=lambda e: e.offset):
+                f.write(json.dumps(e._asdict(), ensure_ascii=False) + "\n")
+        os.replace(tmp, self.idx_path)
+
+    def _end(self) -> int:
+        return max((e.offset + _padded(e.size) for e in self.entries.values()), default=0)
+
+    # ───────── escrita ─────────
+    def _open_for_append(self):
+        if self._fh is None:
+            self._fh = open(self.path, "r+b" if self.path.exists() else "w+b")
+            end = self._end()
+            self._fh.truncate(end)  # descarta entrada parcial e o fim-de-arquivo anterior
+            self._fh.seek(end)
+            self._idx = self.idx_path.open("a", encoding="utf-8")
+
+    def _append(self, name: str, size: int, msg_id: int, write) -> Entry:
+        with self._lock:
+            self._open_for_append()
+            ti = tarfile.TarInfo(name)
+            ti.size, ti.mtime, ti.mode = size, int(time.time()), 0o644
+            if msg_id:
+                ti.pax_headers = {_PAX_COMMENT: f"msg_id={msg_id}"}
+            hdr = ti.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape")
+            start = self._fh.tell()
+            self._fh.write(hdr)
+            write(self._fh)
+            self._fh.write(b"\0" * (_padded(size) - size))
+            self._fh.flush()
+            e = Entry(name, int(msg_id), start + len(hdr), size)
+            # índice só depois dos dados: entrada indexada = entrada completa
+            self._idx.write(json.dumps(e._asdict(), ensure_ascii=False) + "\n")
+            self._idx.flush()
+            self._put(e)
+            return e
+
+    def add_file(self, name: str, src: Path, msg_id: int = 0) -> Entry:
+        with open(src, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            return self._append(name, size, msg_id, lambda out: shutil.copyfileobj(f, out, 1 << 20))
+
+    def add_bytes(self, name: str, data: bytes, msg_id: int = 0) -> Entry:
+        """Mesmo nome de novo (ex.: chat.html a cada export) → vale a última cópia (a velha some no compact)."""
+        return self._append(name, len(data), msg_id, lambda out: out.write(data))
+
+    def close(self):
+        """Fecha a escrita; compacta se as cópias mortas passaram do limite (chame fora do loop)."""
+        with self._lock:
+            if self._fh is not None:
+                self._fh.write(b"\0" * (2 * _BLOCK))  # fim de arquivo tar (removido na retomada)
+                self._fh.close()
+                self._idx.close()
+                self._fh = self._idx = None
+                if self.dead > max(COMPACT_MIN, COMPACT_RATIO * self._end()):
+                    self._compact()
+
+    def _compact(self):
+        """Reescreve o .tar só com as entradas vivas (mesma ordem)."""
+        tmp = self.path.with_name(self.path.name + ".compact")
+        fresh: Dict[str, Entry] = {}
+        with open(self.path, "rb") as src, open(tmp, "wb") as out:
+            for e in sorted(self.entries.values(), key=lambda e: e.offset):
+                ti = tarfile.TarInfo(e.name)
+                ti.size, ti.mtime, ti.mode = e.size, int(time.time()), 0o644
+                if e.msg_id:
+                    ti.pax_headers = {_PAX_COMMENT: f"msg_id={e.msg_id}"}
+                hdr = ti.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape")
+                out.write(hdr)
+                start = out.tell()
+                src.seek(e.offset)
+                left = e.size
+                while left:
+                    chunk = src.read(min(left, 1 << 20))
+                    if not chunk:
+                        raise OSError(f"{self.path}: entrada '{e.name}' truncada")
+                    out.write(chunk)
+                    left -= len(chunk)
+                out.write(b"\0" * (_padded(e.size) - e.size))
+                fresh[e.name] = Entry(e.name, e.msg_id, start, e.size)
+            out.write(b"\0" * (2 * _BLOCK))
+            out.flush()
+            os.fsync(out.fileno())
+        # sem índice entre as duas trocas: _load() refaz pelos cabeçalhos do .tar que ficou
+        self.idx_path.unlink(missing_ok=True)
+        os.replace(tmp, self.path)
+        self.entries, self.dead = fresh, 0
+        self._write_index()
+
+    # ───────── leitura ─────────
+    def has(self, name: str) -> bool:
+        return name in self.entries
+
+    def size(self, name: str) -> int:
+        return self.entries[name].size
+
+    def msg_ids(self) -> Set[int]:
+        return {e.msg_id for e in self.entries.values() if e.msg_id}
+
+    def open(self, name: str) -> EntryReader:
+        return EntryReader(self.path, self.entries[name])
+
+    def read_text(self, name: str) -> str:
+        with self.open(name) as f:
+            return f.read().decode("utf-8")
+
+
+def open_export(src: Path) -> Optional[ExportArchive]:
+    """`src` = o próprio .tar ou a pasta do tópico com export.tar; None se não houver."""
+    src = Path(src)
+    if src.is_file() and src.suffix == ".tar":
+        return ExportArchive(src)
+    if (src / ARCHIVE_NAME).is_file():
+        return ExportArchive(src / ARCHIVE_NAME)
+    return None
@@ -27,15 +27,19 @@ from typing import Optional, List, Tuple
 from telethon import TelegramClient
 from telethon.tl.functions.channels import GetForumTopicsRequest
 
-from teleclone_mod import core, forwarding as fw, users as us
-from teleclone_mod.core import load_creds
+from teleclone_mod import metrics
+from teleclone_mod.titleindex import TitleIndex
+
+# core/forwarding/users são importados só no ramo do menu que os usa (startup rápido)
 
 # ───────────────────── Windows: event loop mais estável ─────────────────────
-if os.name == "nt":
-    try:
-        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
-    except Exception:
-        pass
+def setup_event_loop_policy():
+    """Chamar antes de asyncio.run (não roda no import)."""
+    if os.name == "nt":
+        try:
+            asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+        except Exception:
+            pass
 
 # ───────────────────── Checkpoint CLI ─────────────────────
 CKPT_FILE = Path("cli_checkpoint.json")
@@ -59,8 +63,16 @@ def update_checkpoint(src_id: int, topic_id: int, message_id: int):
     save_cli_checkpoint(data)
 
 # ───────────────────── Credenciais ─────────────────────
-api_id, api_hash, session_name = load_creds()
-client = TelegramClient(session_name, api_id, api_hash)
+client: Optional[TelegramClient] = None
+
+def get_client() -> TelegramClient:
+    """Cria o cliente no primeiro uso (credenciais lidas/pedidas só aqui)."""
+    global client
+    if client is None:
+        from teleclone_mod.core import get_creds
+        api_id, api_hash, session_name = get_creds()
+        client = TelegramClient(session_name, api_id, api_hash)
+    return client
 
 # ───────────────────── Helpers de UI ─────────────────────
 def _print_columns_local(lines: List[str], gap: int = 6):
@@ -79,30 +91,38 @@ def _print_columns_safe(lines: List[str]):
     Evita AttributeError quando core._print_columns não está disponível.
     """
     try:
+        from teleclone_mod import core
         fn = getattr(core, "_print_columns", _print_columns_local)
     except Exception:
         fn = _print_columns_local
     fn(lines)
 
-def _filter_casefold(seq: List[Tuple[int, str]], term: str) -> List[Tuple[int, str]]:
-    q = (term or "").strip().casefold()
-    if not q:
+def _filter_casefold(seq: List[Tuple[int, str]], term: str,
+                     index: Optional[TitleIndex] = None) -> List[Tuple[int, str]]:
+    """Busca ordenada por título; passe o `index` da lista para não remontá-lo a cada busca."""
+    if not (term or "").strip():
         return seq
-    return [(i, t) for (i, t) in seq if q in (t or "").casefold()]
+    if index is None:
+        index = TitleIndex(seq, key=lambda x: x[1] or "")
+    return index.search(term)
 
 # ───────────────────── Listagem/Escolha de CHATS com busca ─────────────────────
+def _print_dialogs(dialogs):
+    print("\n=== Chats disponíveis ===\n")
+    linhas = [f"[{i:>3}]  {d.entity.title}" for i, d in enumerate(dialogs)]
+    _print_columns_safe(linhas)
+
 async def _list_dialogs(client):
     dialogs = [
         d for d in await client.get_dialogs(limit=None)
         if d.is_group or d.is_channel
     ]
-    print("\n=== Chats disponíveis ===\n")
-    linhas = [f"[{i:>3}]  {d.entity.title}" for i, d in enumerate(dialogs)]
-    _print_columns_safe(linhas)
+    _print_dialogs(dialogs)
     return dialogs
 
 async def _choose_dialog(client, papel):
-    dialogs = await _list_dialogs(client)
+    dialogs = await _list_dialogs(client)  # única ida à rede; buscas usam o índice
+    index = TitleIndex(dialogs, key=lambda d: d.entity.title or "")
 
     while True:
         print("Digite o número, 'p' para procurar, ou ENTER para voltar.")
@@ -117,14 +137,14 @@ async def _choose_dialog(client, papel):
         if opt.lower() == "p" or opt.startswith("/"):
             termo = opt[1:] if opt.startswith("/") else input("🔎 Título contém: ").strip()
             if termo == "":
-                dialogs = await _list_dialogs(client)
+                _print_dialogs(dialogs)
                 continue
 
-            filtrados = [d for d in dialogs if termo.casefold() in (d.entity.title or "").casefold()]
+            filtrados = index.search(termo)
             if not filtrados:
                 print("❌ Nada encontrado. Pressione ENTER para voltar.")
                 input()
-                dialogs = await _list_dialogs(client)
+                _print_dialogs(dialogs)
                 continue
 
             print("\n=== Resultados ===\n")
@@ -133,7 +153,7 @@ async def _choose_dialog(client, papel):
 
             escolha = input("Número do resultado (ou ENTER p/ voltar): ").strip()
             if escolha == "":
-                dialogs = await _list_dialogs(client)
+                _print_dialogs(dialogs)
                 continue
             try:
                 idx = int(escolha)
@@ -172,7 +192,7 @@ async def _fetch_all_topics(ent) -> List[Tuple[int, str]]:
 
     while True:
         try:
-            res = await client(GetForumTopicsRequest(
+            res = await get_client()(GetForumTopicsRequest(
                 channel=ent,
                 offset_date=off_date,
                 offset_id=off_id,
@@ -224,6 +244,7 @@ async def _choose_topic_in_forum(ent, titulo="TÓPICO"):
         return None, None
 
     all_topics = await _fetch_all_topics(ent)  # [(id,título)...] com "Geral" no topo
+    index = TitleIndex(all_topics, key=lambda x: x[1] or "")
     filtered = all_topics[:]
     per_page = 30
     page = 1
@@ -250,7 +271,7 @@ async def _choose_topic_in_forum(ent, titulo="TÓPICO"):
         # 1) Busca primeiro (evita conflito com 'p' de previous)
         if s.lower() == "s" or s.startswith("/"):
             term = s[1:] if s.startswith("/") else input("🔎 Título contém: ").strip()
-            filtered = _filter_casefold(all_topics, term) if term else all_topics[:]
+            filtered = _filter_casefold(all_topics, term, index) if term else all_topics[:]
             page = 1
             continue
 
@@ -285,7 +306,9 @@ async def _choose_topic_in_forum(ent, titulo="TÓPICO"):
 
 # ───────────────────── Menu principal ─────────────────────
 async def main():
+    client = get_client()
     await client.start()
+    await metrics.start_exporters()  # TC_METRICS_PORT / TC_METRICS_JSON
     try:
         while True:
             BANNER = r"""
@@ -336,6 +359,7 @@ async def main():
                         save_cli_checkpoint(data)
                         last_id = None  # recomeça do zero
 
+                from teleclone_mod import forwarding as fw
                 await fw.forward_history(
                     client, src, dst,
                     topic_id=th_src,
@@ -354,11 +378,20 @@ async def main():
                     continue
                 strip = input("❓ Remover legendas ao espelhar? (s/N): ").lower().startswith('s')
 
+                from teleclone_mod import forwarding as fw
+                # fórum inteiro: cada tópico da origem → tópico de mesmo título no destino
+                routes = None
+                if (not th_src and getattr(src, "forum", False) and getattr(dst, "forum", False)
+                        and input("❓ Manter tópicos separados (casando pelo título)? (s/N): ").lower().startswith('s')):
+                    routes = await fw.routes_by_title(client, src, dst)
+                    print(f"🧭 {len(routes)} tópico(s) casado(s); o restante vai para o tópico escolhido do destino.")
+
                 fw.live_mirror(
                     client, src, dst,
                     topic_id=th_src,
                     dst_topic_id=th_dst,
-                    strip_caption=strip
+                    strip_caption=strip,
+                    routes=routes
                 )
                 print("🔄 Espelhando… CTRL+C para parar.")
                 await client.run_until_disconnected()
@@ -370,9 +403,11 @@ async def main():
                 dst, _ = await _choose_dialog(client, "DESTINO")
                 if not dst:
                     continue
+                from teleclone_mod import users as us
                 await us.copy_users(client, src, dst)
 
             elif op == "4":  # ── APP ORIGINAL ──
+                from teleclone_mod import core
                 await core.main(client)
 
             elif op == "0":
@@ -386,6 +421,7 @@ async def main():
 
 # ───────────────────── Run ─────────────────────
 if __name__ == "__main__":
+    setup_event_loop_policy()
     try:
         asyncio.run(main())
     except (KeyboardInterrupt, EOFError):
@@ -17,12 +17,19 @@ import re
 from pathlib import Path
 from typing import Dict, Optional, Any, Tuple, List
 from datetime import datetime, timezone
-from tkinter import Tk, filedialog
-from bs4 import BeautifulSoup
-from telethon.errors import RPCError, FloodWaitError
+from telethon.errors import RPCError
 from telethon.tl.functions.channels import GetForumTopicsRequest
 from telethon.tl.types import Channel, Message
-from telethon import TelegramClient
+from telethon import TelegramClient, utils
+
+from teleclone_mod import archive, dcpool, logs, metrics, partial, retry, search, tracing, upjournal
+from teleclone_mod.dcpool import print_pool_summary
+from teleclone_mod.flood import print_flood_summary
+from teleclone_mod.msgstore import store_for
+from teleclone_mod.records import MessageRecord, SenderNames
+from teleclone_mod.refresh import refetch_message
+from teleclone_mod.search import INDEX_NAME, ArchiveIndex
+from teleclone_mod.titleindex import TitleIndex
 
 # ───────────────────── 0. UTILITÁRIOS ─────────────────────
 def clear_screen():
@@ -38,7 +45,6 @@ def pause(msg="Pressione ENTER para continuar..."):
 # ───────────────────── 1. CREDENCIAIS ─────────────────────
 BASE_DIR = Path(__file__).resolve().parent
 DATA_DIR = BASE_DIR / "data"
-DATA_DIR.mkdir(parents=True, exist_ok=True)
 CRED_FILE = DATA_DIR / "creds.json"
 
 def load_creds() -> Tuple[int, str, str]:
@@ -53,18 +59,36 @@ def load_creds() -> Tuple[int, str, str]:
             print("❌ API ID deve ser número.")
     api_hash = getpass.getpass("🔑 API HASH Telegram: ").strip()
     session = input("📁 Nome da sessão: ").strip() or "minha_conta"
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
     CRED_FILE.write_text(json.dumps({
         "api_id": api_id, "api_hash": api_hash, "session": session
     }, indent=2), encoding="utf-8")
     print(f"✅ Credenciais salvas em {CRED_FILE}\n")
     return api_id, api_hash, session
 
-api_id, api_hash, session_name = load_creds()
+_creds: Optional[Tuple[int, str, str]] = None
+
+def get_creds() -> Tuple[int, str, str]:
+    """Credenciais carregadas no primeiro uso (import do módulo não pede nada)."""
+    global _creds
+    if _creds is None:
+        _creds = load_creds()
+    return _creds
+
+def __getattr__(name: str):
+    # compatibilidade: core.api_id / core.api_hash / core.session_name continuam válidos
+    if name in ("api_id", "api_hash", "session_name"):
+        return get_creds()[("api_id", "api_hash", "session_name").index(name)]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # ───────────────────── 2. CONFIGS GERAIS ─────────────────────
 CHECKPOINT_FILE = "checkpoint.json"
 BAR_LEN, SLOTS = 30, 5
+FETCH_BATCH = 100  # ids por get_messages ao recarregar mídias no export
 DELAY_BETWEEN_UPLOADS = 2
+FORUM_STATE = "forum.json"  # progresso do export_forum (na pasta do grupo)
+FORUM_TOPICS = max(1, int(os.getenv("TC_FORUM_TOPICS", "4")))              # tópicos ao mesmo tempo
+FORUM_SLOTS = max(1, int(os.getenv("TC_FORUM_SLOTS", str(2 * SLOTS))))     # downloads no fórum todo
 IMG_EXTS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
 VIDEO_EXTS = {".mp4", ".mkv", ".mov", ".webm", ".3gp", ".avi"}
 AUDIO_EXTS = {".mp3", ".m4a", ".aac", ".ogg", ".flac", ".wav"}
@@ -91,10 +115,8 @@ HTML_HEAD_TPL = (
 )
 HTML_FOOT = "</div></body></html>"
 
-# ───────────────────── 4. GLOBAIS DE PROGRESSO ─────────────────────
-dl_size = dl_done = 0
-time_start = time.time()
-bar_lock = asyncio.Lock()
+# ───────────────────── 4. LOG ─────────────────────
+log = logs.get(__name__)
 
 # ───────────────────── 5. AUXILIARES ─────────────────────
 def sanitize(t: str, n: int = 150) -> str:
@@ -121,6 +143,7 @@ def save_ckpt(path: Path, ck: Dict):
         (path / CHECKPOINT_FILE).write_text(json.dumps(ck, ensure_ascii=False, indent=2))
 
 def ask_directory() -> Optional[Path]:
+    from tkinter import Tk, filedialog  # só quando o diálogo é usado
     Tk().withdraw()
     folder = filedialog.askdirectory()
     return Path(folder) if folder else None
@@ -176,12 +199,13 @@ async def select_dialog_with_search(client: TelegramClient, prompt_title: str) -
     """
     Lista chats/grupos/canais com:
       • paginação (20 por página)
-      • busca case-insensitive por título (digite '/texto')
+      • busca por título (digite '/texto'): sem acento/caixa, tolera erro de digitação
       • voltar com 'b'
     Retorna o objeto Dialog.entity selecionado ou None ao voltar/cancelar.
     """
     per_page = 20
     dialogs = await list_dialogs(client)
+    index = TitleIndex(dialogs, key=_title_of_dialog)  # montado uma vez; buscas sem rede
     filtered = dialogs[:]  # lista corrente (pode ser reduzida pela busca)
     page = 1
 
@@ -217,11 +241,7 @@ async def select_dialog_with_search(client: TelegramClient, prompt_title: str) -
             if page > 1: page -= 1
             continue
         if s.startswith("/"):
-            term = s[1:].strip().lower()
-            if not term:
-                filtered = dialogs[:]
-            else:
-                filtered = [d for d in dialogs if term in _title_of_dialog(d).lower()]
+            filtered = index.search(s[1:])
             page = 1
             continue
         if s.isdigit():
@@ -267,7 +287,7 @@ async def select_topic_with_search(client: TelegramClient, chan: Channel, prompt
     """
     Seleciona tópico com:
       • paginação (20 por página)
-      • busca '/texto'
+      • busca '/texto' (índice de títulos: sem acento/caixa, tolera erro de digitação)
       • opção 'b' para voltar (retorna (0,'Geral') como padrão)
     Retorna (topic_id, topic_title).
     """
@@ -279,6 +299,7 @@ async def select_topic_with_search(client: TelegramClient, chan: Channel, prompt
     items = [(0, "Geral")] + base
 
     per_page = 20
+    index = TitleIndex(items, key=lambda x: x[1] or "")
     filtered = items[:]  # pode sofrer busca
     page = 1
 
@@ -311,11 +332,7 @@ async def select_topic_with_search(client: TelegramClient, chan: Channel, prompt
             if page > 1: page -= 1
             continue
         if s.startswith("/"):
-            term = s[1:].strip().lower()
-            if not term:
-                filtered = items[:]
-            else:
-                filtered = [(tid, tname) for (tid, tname) in items if term in (tname or "").lower()]
+            filtered = index.search(s[1:])
             page = 1
             continue
         if s.isdigit():
@@ -333,65 +350,108 @@ async def select_topic_with_search(client: TelegramClient, chan: Channel, prompt
         pause()
 
 # ───────────────────── 7. BARRA DE PROGRESSO ─────────────────────
-async def refresh_download_bar(topic: str):
-    async with bar_lock:
-        elapsed = max(1e-6, time.time() - time_start)
-        speed = dl_done / elapsed
-        speed_k = speed / 1024
-        pct = (dl_done / dl_size * 100) if dl_size else 0
-        bar_len = int(BAR_LEN * pct / 100)
-        bar = '█' * bar_len + '-' * (BAR_LEN - bar_len)
-        remain = dl_size - dl_done
-        eta = remain / speed if speed else 0
-        h, m, s = int(eta // 3600), int((eta % 3600) // 60), int(eta % 60)
-        sys.stdout.write(
-            f"\rBaixando {sanitize(topic)[:28]:28} |{bar}| {pct:6.2f}% "
-            f"{speed_k:8.2f} KB/s ETA {h:02d}:{m:02d}:{s:02d}"
-        )
-        sys.stdout.flush()
+class ExportProgress:
+    """
+    Bytes de um export (um tópico). Com `parent` (export_forum), cada byte também
+    conta no total do fórum, que é quem desenha a barra.
+    """
+
+    def __init__(self, name: str, parent: Optional["ExportProgress"] = None):
+        self.name = name
+        self.parent = parent
+        self.children: List["ExportProgress"] = []
+        self.size = self.done = 0
+        self.files = self.failed = 0
+        self.active = self.finished = False
+        self.truncated = False  # seleção cortada pelo orçamento de bytes do fórum
+        self.start = time.time()
+        if parent is not None:
+            parent.children.append(self)
+
+    def grow(self, n: int):
+        self.size += n
+        if self.parent is not None:
+            self.parent.grow(n)
+
+    def add(self, n: int):
+        self.done += n
+        if self.parent is not None:
+            self.parent.add(n)
+
+    @property
+    def pct(self) -> float:
+        return (self.done / self.size * 100) if self.size else 0.0
+
+
+def refresh_download_bar(prog: ExportProgress, final: bool = False):
+    top = prog.parent or prog
+    elapsed = max(1e-6, time.time() - top.start)
+    speed = top.done / elapsed
+    speed_k = speed / 1024
+    pct = top.pct
+    bar_len = int(BAR_LEN * pct / 100)
+    bar = '█' * bar_len + '-' * (BAR_LEN - bar_len)
+    remain = top.size - top.done
+    eta = remain / speed if speed else 0
+    h, m, s = int(eta // 3600), int((eta % 3600) // 60), int(eta % 60)
+    text = (f"Baixando {sanitize(top.name)[:28]:28} |{bar}| {pct:6.2f}% "
+            f"{speed_k:8.2f} KB/s ETA {h:02d}:{m:02d}:{s:02d}")
+    if isinstance(top, ForumRun):
+        # fórum: agregado + tópicos em andamento na mesma linha
+        ended = top.skipped + sum(c.finished for c in top.children)
+        running = [c for c in top.children if c.active]
+        text += f" │ {ended}/{top.skipped + len(top.children)} tópico(s)"
+        text += "".join(f" │ {c.name[:14]} {c.pct:3.0f}%" for c in running[:3])
+    # fila de log (logs.py): terminal lento não segura o loop dos downloads
+    logs.progress(text, bar="export", final=final, bytes=top.done, size=top.size)
 
 # ───────────────────── 8A. GERAR chat.html (SEM DOWNLOAD) ─────────────────────
 async def generate_html_only(client: TelegramClient, grp: Channel,
-                             tid: Optional[int], tname: str) -> Path:
+                             tid: Optional[int], tname: str, sync: bool = True) -> Path:
+    """
+    chat.html a partir do cache local (msgstore.py). `sync=False` não toca na rede.
+    Mesmo escopo/numeração do export_topic (reply_to=tid), então os links casam
+    com os arquivos já baixados.
+    """
     base = Path(sanitize(grp.title))
     base.mkdir(exist_ok=True)
     tdir = base / sanitize(tname)
     tdir.mkdir(exist_ok=True)
+    # export em .tar (archive.py): as mídias estão no arquivo, não em media/
+    arc = archive.open_export(tdir)
     mdir = tdir / "media"
-    mdir.mkdir(exist_ok=True)
+    if arc is None:
+        mdir.mkdir(exist_ok=True)
     html_path = tdir / "chat.html"
 
     print(f"\n📝 Gerando chat.html de '{tname}' (sem novos downloads)…")
-    all_msgs = [m async for m in client.iter_messages(grp, reverse=True)]
-    if tid:
-        msgs = [m for m in all_msgs if m.id == tid or getattr(m, "reply_to_msg_id", None) == tid]
-    else:
-        msgs = all_msgs
+    store = store_for(grp)
+    if sync or not store.synced(tid or 0):
+        new = await store.sync(client, grp, tid or 0)
+        print(f"🗄️  Cache local: {new} mensagem(ns) nova(s).")
+    names = store.sender_names()
+    msgs: List[MessageRecord] = list(store.records(tid or 0))
 
     total = len(msgs)
     pad = len(str(total))
 
     html_path.write_text(HTML_HEAD_TPL.format(title=html.escape(tname)), "utf-8")
     for seq, msg in enumerate(msgs, 1):
-        if msg.file:
-            ext = msg.file.ext or ""
-            orig = sanitize(msg.file.name) if msg.file.name else f"media{ext}"
+        if msg.has_file:
+            ext = msg.file_ext or ""
+            orig = sanitize(msg.file_name) if msg.file_name else f"media{ext}"
             fname = f"{str(seq).zfill(pad)}_{orig}"
-            file_exists = (mdir / fname).exists()
+            file_exists = (mdir / fname).exists() or (arc is not None and arc.has(f"media/{fname}"))
         else:
             ext = fname = ""
             file_exists = False
 
-        sender = await msg.get_sender()
-        sname = html.escape(
-            (f"{getattr(sender,'first_name','')} {getattr(sender,'last_name','')}".strip())
-            or getattr(sender, "username", "?")
-        )
-        cont = html.escape(msg.text or "").replace("\n", "<br>")
+        sname = html.escape(await names.get(client, msg.sender_id))
+        cont = html.escape(msg.text).replace("\n", "<br>")
 
         img_tag = ""
         media_btn = ""
-        if msg.file:
+        if msg.has_file:
             if ext.lower() in IMG_EXTS and file_exists:
                 img_tag = f"<img src='media/{fname}' style='max-width:100%;border-radius:8px;margin:6px 0'>"
             media_btn = (
@@ -413,37 +473,66 @@ async def generate_html_only(client: TelegramClient, grp: Channel,
             )
 
     html_path.write_text(html_path.read_text("utf-8") + HTML_FOOT, "utf-8")
+    if arc is not None:
+        # mesma regra do export_topic: a cópia no .tar acompanha a da pasta
+        await asyncio.to_thread(arc.add_bytes, "chat.html", html_path.read_bytes())
+        await asyncio.to_thread(arc.close)  # pode compactar o .tar
+    await index_archive(client, grp, tdir, tname, msgs, names)
+    logs.flush()
     print("✅ chat.html gerado!\n")
     return tdir
 
 # ───────────────────── 8B. DOWNLOAD COMPLETO ─────────────────────
 async def export_topic(client: TelegramClient, grp: Channel, tid: Optional[int],
                        tname: str, limit_bytes: int,
-                       max_size_per_file: Optional[int] = None) -> Path:
-    global dl_size, dl_done, time_start
-    dl_done = 0
-    time_start = time.time()
+                       max_size_per_file: Optional[int] = None,
+                       to_archive: Optional[bool] = None,
+                       progress: Optional[ExportProgress] = None) -> Path:
+    """
+    `to_archive=True` grava mídias e chat.html em <tópico>/export.tar (archive.py)
+    em vez da pasta media/; padrão: TC_EXPORT_ARCHIVE.
+    `progress` filho de um ForumRun (export_forum): sem perguntas, downloads dentro
+    das vagas/bytes do fórum e sem o resumo final (o fórum faz um só).
+    """
+    prog = progress or ExportProgress(tname)
+    run = prog.parent if isinstance(prog.parent, ForumRun) else None
+    dcpool.attach(client)  # mídia de outros DCs: conexões autorizadas reaproveitadas
 
     base = Path(sanitize(grp.title))
     base.mkdir(exist_ok=True)
     tdir = base / sanitize(tname)
     tdir.mkdir(exist_ok=True)
-    mdir = tdir / "media"
+    arc: Optional[archive.ExportArchive] = None
+    if archive.TO_ARCHIVE if to_archive is None else to_archive:
+        arc = archive.ExportArchive(tdir / archive.ARCHIVE_NAME)
+        mdir = tdir / ".incoming"  # um arquivo por download em curso; vai para o .tar e some
+    else:
+        mdir = tdir / "media"
     mdir.mkdir(exist_ok=True)
     ck = load_ckpt(tdir)
     html_path = tdir / "chat.html"
-
-    print(f"\n🔍 Coletando mensagens de '{tname}'…")
-    msgs = [m async for m in client.iter_messages(grp, reply_to=tid, reverse=True)]
+    # retomada: o que já está no .tar conta como baixado, mesmo sem o checkpoint.json
+    done = set(ck["done_ids"]) | (arc.msg_ids() if arc else set())
+
+    log.info("🔍 Coletando mensagens de '%s'…", tname)
+    # cache local (msgstore.py): só ids novos vêm do Telegram; registros compactos,
+    # a mídia é recarregada pelo id só na hora do download
+    store = store_for(grp)
+    new = await store.sync(client, grp, tid or 0)
+    log.info("🗄️  Cache local ('%s'): %d mensagem(ns) nova(s).", tname, new)
+    names = store.sender_names()
+    msgs: List[MessageRecord] = list(store.records(tid or 0))
     total = len(msgs)
     pad = len(str(total))
+    await index_archive(client, grp, tdir, tname, msgs, names)
 
-    done_pos = [i for i, m in enumerate(msgs, 1) if m.id in ck["done_ids"]]
-    if done_pos:
+    done_pos = [i for i, m in enumerate(msgs, 1) if m.id in done]
+    if done_pos and run is None:
+        logs.flush()  # antes do prompt
         last_i = max(done_pos)
         last_m = msgs[last_i - 1]
-        ext = last_m.file.ext or ""
-        orig = sanitize(last_m.file.name) if last_m.file and last_m.file.name else f"media{ext}"
+        ext = last_m.file_ext or ""
+        orig = sanitize(last_m.file_name) if last_m.file_name else f"media{ext}"
         print(f"\nVocê parou no arquivo '{str(last_i).zfill(pad)}_{orig}'.")
         if input("➡️  Continuar desse ponto? (1-Sim, 2-Não) ").strip() != "1":
             while True:
@@ -454,64 +543,92 @@ async def export_topic(client: TelegramClient, grp: Channel, tid: Optional[int],
                 print("❌ inválido.")
         start_idx = last_i + 1
     else:
-        start_idx = 1
+        start_idx = 1  # fórum: tudo que não está no checkpoint (falhas de antes também)
 
-    pend: list[Tuple[int, Message]] = [
+    pend: list[Tuple[int, MessageRecord]] = [
         (seq, m) for seq, m in enumerate(msgs, 1)
         if seq >= start_idx
-           and m.file
-           and m.id not in ck["done_ids"]
-           and (max_size_per_file is None or (m.file.size or 0) <= max_size_per_file)
+           and m.has_file
+           and m.id not in done
+           and (max_size_per_file is None or m.file_size <= max_size_per_file)
     ]
     if not pend:
-        print("✅ Nada a baixar.")
+        log.info("✅ '%s': nada a baixar.", tname)
         return tdir
 
     sel, acc = [], 0
     remain = None if not limit_bytes else limit_bytes - ck["bytes"]
     for seq, m in pend:
-        sz = m.file.size or 0
+        sz = m.file_size
         if remain and acc + sz > remain:
             break
+        if run is not None and not run.take(sz):
+            prog.truncated = True  # orçamento de bytes do fórum esgotado
+            break
         sel.append((seq, m))
         acc += sz
-    dl_size = acc
+    prog.grow(acc)
 
-    print(f"📁 Baixando {len(sel)} arquivos ({acc/1024**3:.2f} GB).")
+    log.info("📁 '%s': baixando %d arquivos (%.2f GB)%s", tname, len(sel), acc / 1024**3,
+             f" → {arc.path.name}." if arc else ".")
     if not html_path.exists():
-        html_path.write_text(HTML_HEAD_TPL.format(title=html.escape(tname)), "utf-8")
+        if arc and arc.has("chat.html"):
+            html_path.write_text(arc.read_text("chat.html"), "utf-8")  # continua o do .tar
+        else:
+            html_path.write_text(HTML_HEAD_TPL.format(title=html.escape(tname)), "utf-8")
 
-    async def worker(seq: int, msg: Message):
-        nonlocal_dl = None
-        global dl_done
-        ext = msg.file.ext or ".bin"
-        orig = sanitize(msg.file.name) if msg.file and msg.file.name else f"media{ext}"
+    async def worker(seq: int, rec: MessageRecord, msg: Optional[Message]):
+        ext = rec.file_ext or ".bin"
+        orig = sanitize(rec.file_name) if rec.file_name else f"media{ext}"
         fname = f"{str(seq).zfill(pad)}_{orig}"
-        prog = 0
+        # bytes já no .part de uma execução anterior (partial.py): contam na barra, não na métrica
+        got = partial.resume_offset(msg, mdir / fname) if msg is not None else 0
+        prog.add(got)
 
         def cb(curr, tot):
-            nonlocal prog
-            global dl_done
-            dl_done += curr - prog
-            prog = curr
-            asyncio.get_running_loop().call_soon_threadsafe(
-                lambda: asyncio.create_task(refresh_download_bar(tname))
-            )
+            nonlocal got
+            prog.add(curr - got)
+            if curr > got:
+                metrics.inc("tc_bytes_downloaded_total", curr - got, path="export")
+            got = curr
+            refresh_download_bar(prog)
+
+        async def _on_retry(exc, kind):
+            # retentativa continua do .part (o cb acerta a barra pelo offset retomado)
+            nonlocal msg
+            if kind == retry.FILE_REF:
+                msg = await refetch_message(client, grp, msg)
 
         try:
-            path = await msg.download_media(file=mdir / fname, progress_callback=cb)
-            success = path and Path(path).exists()
+            if msg is None:
+                raise RuntimeError("mensagem não encontrada (apagada?)")
+            # fórum: vaga de download compartilhada por todos os tópicos
+            async with run.slots if run else contextlib.nullcontext():
+                with metrics.inflight("export"), tracing.span("download_media", msg=rec.id):
+                    path = await retry.run(
+                        lambda: partial.download(msg, mdir / fname, progress_callback=cb),
+                        client=client, name="download", on_retry=_on_retry,
+                    )
+                success = path and Path(path).exists()
+                nbytes = Path(path).stat().st_size if success else 0
+                if success and arc:
+                    await asyncio.to_thread(arc.add_file, f"media/{fname}", Path(path), rec.id)
+                    Path(path).unlink()
         except Exception as e:
-            print(f"\n❌ Erro em '{fname}': {e}")
+            log.error("❌ Erro em '%s': %s", fname, e, extra={"msg_id": rec.id})
             success = False
+        if success:
+            prog.files += 1
+            if run is not None:
+                run.used += nbytes
+        else:
+            prog.failed += 1
+        metrics.inc("tc_messages_total", job="export", result="processed" if success else "failed")
 
+        msg = None  # HTML sai do registro compacto; solta o Message (e a mídia) já
         try:
-            sender = await msg.get_sender()
-            sname = html.escape(
-                (f"{getattr(sender,'first_name','')} {getattr(sender,'last_name','')}".strip())
-                or getattr(sender,"username","?")
-            )
-            cont = html.escape(msg.text or "").replace("\n","<br>")
+            sname = html.escape(await names.get(client, rec.sender_id))
+            cont = html.escape(rec.text).replace("\n","<br>")
             img_tag = ""
             if ext.lower() in IMG_EXTS and success:
                 img_tag = f"<img src='media/{fname}' style='max-width:100%;border-radius:8px;margin:6px 0'>"
@@ -520,36 +637,205 @@ async def export_topic(client: TelegramClient, grp: Channel, tid: Optional[int],
                 if success else
                 "<a class='btn' style='opacity:0.5;text-decoration:line-through'>MÍDIA AUSENTE</a> "
             )
-            ts = msg.date.astimezone().strftime("%d/%m/%Y %H:%M")
+            ts = rec.date.astimezone().strftime("%d/%m/%Y %H:%M")
             with html_path.open("a", encoding="utf-8") as h:
                 h.write(
-                    f"<div class='message {'sent' if msg.out else 'received'}'>"
+                    f"<div class='message {'sent' if rec.out else 'received'}'>"
                     f"<div class='sender'>{sname}</div>"
                     f"<div class='content'>{cont}</div>"
                     f"{img_tag}{media_btn}"
-                    f"<a href='{permalink(grp,msg.id)}' class='btn'>Link</a>"
+                    f"<a href='{permalink(grp,rec.id)}' class='btn'>Link</a>"
                     f"<div class='timestamp'>{ts}</div></div>\n"
                 )
             if success:
-                ck["done_ids"].append(msg.id)
-                ck["bytes"] += Path(path).stat().st_size
+                ck["done_ids"].append(rec.id)
+                ck["bytes"] += nbytes
                 save_ckpt(tdir, ck)
         except Exception as e:
-            print(f"\n❌ Falha HTML '{fname}': {e}")
-
-    sem = asyncio.Semaphore(SLOTS)
+            log.error("❌ Falha HTML '%s': %s", fname, e, extra={"msg_id": rec.id})
 
-    async def sem_worker(pair):
-        async with sem:
-            await worker(*pair)
+    # mídias recarregadas em lotes (1 RPC por FETCH_BATCH ids, referência fresca),
+    # no máximo ~FETCH_BATCH Messages completos vivos por vez
+    queue: asyncio.Queue = asyncio.Queue(maxsize=FETCH_BATCH)
 
-    await asyncio.gather(*(sem_worker(p) for p in sel))
+    async def producer():
+        try:
+            for i in range(0, len(sel), FETCH_BATCH):
+                chunk = sel[i:i + FETCH_BATCH]
+                try:
+                    fresh = await retry.run(
+                        lambda: client.get_messages(grp, ids=[r.id for _, r in chunk]),
+                        client=client, name="get_messages",
+                    )
+                except Exception as e:
+                    log.error("❌ Falha ao recarregar %d mensagem(ns): %s", len(chunk), e)
+                    fresh = [None] * len(chunk)
+                for (seq, rec), m in zip(chunk, fresh):
+                    await queue.put((seq, rec, m))
+        finally:
+            for _ in range(SLOTS):
+                await queue.put(None)
+
+    async def consumer():
+        while (item := await queue.get()) is not None:
+            with tracing.span("message", msg=item[1].id, seq=item[0]):
+                await worker(*item)
 
-    if not html_path.read_text("utf-8").endswith(HTML_FOOT):
-        html_path.write_text(html_path.read_text("utf-8") + HTML_FOOT, "utf-8")
+    try:
+        await asyncio.gather(producer(), *(consumer() for _ in range(SLOTS)))
+        if not html_path.read_text("utf-8").endswith(HTML_FOOT):
+            html_path.write_text(html_path.read_text("utf-8") + HTML_FOOT, "utf-8")
+    finally:
+        if arc:
+            # chat.html entra no .tar a cada execução (a última cópia vale)
+            with contextlib.suppress(OSError):
+                await asyncio.to_thread(arc.add_bytes, "chat.html", html_path.read_bytes())
+            await asyncio.to_thread(arc.close)  # pode compactar o .tar
+            with contextlib.suppress(OSError):
+                mdir.rmdir()
+    if run is not None:
+        return tdir  # resumo único no export_forum
+    refresh_download_bar(prog, final=True)
+    logs.flush()
+    print_flood_summary(client)
+    print_pool_summary(client)
+    retry.print_retry_summary()
+    tracing.flush()
     print("\n✅ Download concluído!\n")
     return tdir
 
+# ───────────────────── 8C. ÍNDICE DE BUSCA (search.sqlite) ─────────────────────
+async def index_archive(client: TelegramClient, grp: Channel, tdir: Path, tname: str,
+                        msgs: List[MessageRecord], names: SenderNames) -> int:
+    """
+    Atualiza o índice FTS5 da pasta com todas as mensagens do escopo (não só as com
+    mídia). Mesma numeração/nome de arquivo do export. Retorna quantas linhas mudaram.
+    """
+    pad = len(str(len(msgs)))
+    with tracing.span("index_archive", n=len(msgs)), ArchiveIndex(tdir) as idx:
+        idx.set_meta(chat=grp.title, chat_id=grp.id, topic=tname)
+        for seq, rec in enumerate(msgs, 1):
+            media = None
+            if rec.has_file:
+                ext = rec.file_ext or ".bin"
+                orig = sanitize(rec.file_name) if rec.file_name else f"media{ext}"
+                media = f"media/{str(seq).zfill(pad)}_{orig}"
+            idx.add(rec.id, seq=seq, ts=rec.ts, sender=await names.get(client, rec.sender_id),
+                    text=rec.text, link=permalink(grp, rec.id), media=media)
+        idx.commit()
+        changed = idx.changed
+    log.info("🔎 Índice de busca ('%s'): %d mensagem(ns) (re)indexada(s) em '%s'.", tname, changed, INDEX_NAME)
+    return changed
+
+# ───────────────────── 8D. FÓRUM INTEIRO ─────────────────────
+class ForumRun(ExportProgress):
+    """
+    Total de um export_forum + o que os tópicos dividem: vagas de download
+    (`slots`) e orçamento de bytes desta execução (`take`).
+    """
+
+    def __init__(self, name: str, slots: int, limit_bytes: int = 0, used: int = 0):
+        super().__init__(name)
+        self.slots = asyncio.Semaphore(slots)
+        self.limit = limit_bytes
+        self.used = used           # bytes baixados (persistido em forum.json)
+        self._reserved = used      # + selecionados e ainda não baixados
+        self.skipped = 0           # tópicos já concluídos numa execução anterior
+
+    def take(self, n: int) -> bool:
+        if self.limit and self._reserved + n > self.limit:
+            return False
+        self._reserved += n
+        return True
+
+
+def _load_forum_state(base: Path) -> Dict:
+    fp = base / FORUM_STATE
+    if fp.exists():
+        with contextlib.suppress(Exception):
+            return json.loads(fp.read_text("utf-8"))
+    return {"done_topics": [], "bytes": 0}
+
+
+def _save_forum_state(base: Path, st: Dict):
+    with contextlib.suppress(Exception):
+        (base / FORUM_STATE).write_text(json.dumps(st, ensure_ascii=False, indent=2))
+
+
+async def export_forum(client: TelegramClient, grp: Channel, limit_bytes: int = 0,
+                       to_archive: Optional[bool] = None) -> Path:
+    """
+    Exporta todos os tópicos do fórum (get_topics), até TC_FORUM_TOPICS ao mesmo tempo
+    e no máximo TC_FORUM_SLOTS downloads simultâneos somando todos. Cada tópico usa a
+    própria pasta/checkpoint (export_topic); forum.json guarda os tópicos concluídos e
+    os bytes da execução, então rodar de novo continua de onde parou.
+    `limit_bytes` (0 = sem limite) vale para o fórum inteiro.
+    """
+    base = Path(sanitize(grp.title))
+    base.mkdir(exist_ok=True)
+    st = _load_forum_state(base)
+    topics = await get_topics(client, grp)
+    if len(topics) > 1:
+        topics.pop(0, None)  # "Geral" (escopo 0) é o chat inteiro: repetiria todos os tópicos
+
+    # pastas únicas: dois tópicos com o mesmo título não dividem checkpoint
+    names: Dict[int, str] = {}
+    seen: Dict[str, int] = {}
+    for tid, title in topics.items():
+        key = sanitize(title).casefold()
+        names[tid] = title if key not in seen else f"{title} ({tid})"
+        seen.setdefault(key, tid)
+
+    done_topics = set(st["done_topics"])
+    run = ForumRun(grp.title, FORUM_SLOTS, limit_bytes, st["bytes"])
+    run.skipped = sum(1 for tid in topics if tid in done_topics)
+    pending = [(tid, ExportProgress(names[tid], parent=run)) for tid in topics if tid not in done_topics]
+    print(f"\n🗂️  Fórum '{grp.title}': {len(topics)} tópico(s), {len(pending)} a exportar "
+          f"({FORUM_TOPICS} por vez, {FORUM_SLOTS} downloads simultâneos).")
+    if not pending:
+        print("✅ Todos os tópicos já foram exportados.")
+        return base
+
+    dcpool.attach(client)
+    topic_sem = asyncio.Semaphore(FORUM_TOPICS)
+
+    async def one(tid: int, prog: ExportProgress):
+        async with topic_sem:
+            prog.active = True
+            try:
+                await export_topic(client, grp, tid or None, prog.name, 0,
+                                   to_archive=to_archive, progress=prog)
+            except Exception as e:
+                prog.failed += 1
+                log.exception("❌ Tópico '%s' falhou: %s", prog.name, e, extra={"topic": tid})
+            finally:
+                prog.active = False
+            prog.finished = True
+            # concluído = nada falhou e o orçamento não cortou a seleção
+            if not prog.failed and not prog.truncated:
+                st["done_topics"].append(tid)
+            st["bytes"] = run.used
+            _save_forum_state(base, st)
+            log.info("%s '%s': %d arquivo(s), %d falha(s).", "✅" if not prog.failed else "⚠️",
+                     prog.name, prog.files, prog.failed, extra={"topic": tid})
+            refresh_download_bar(prog)
+
+    await asyncio.gather(*(one(tid, prog) for tid, prog in pending))
+    refresh_download_bar(run, final=True)
+    logs.flush()
+    print_flood_summary(client)
+    print_pool_summary(client)
+    retry.print_retry_summary()
+    tracing.flush()
+    left = len(topics) - len(st["done_topics"])
+    if not left:
+        # passada completa: a próxima execução recomeça (incremental pelos checkpoints)
+        _save_forum_state(base, {"done_topics": [], "bytes": 0})
+    print(f"\n✅ Fórum: {len(topics) - left}/{len(topics)} tópico(s) completos, "
+          f"{sum(p.files for _, p in pending)} arquivo(s) nesta execução."
+          + (f" Rode de novo para continuar os {left} restante(s)." if left else "") + "\n")
+    return base
+
 # ───────────────────── 9. UPLOAD – envia mídia como mídia ─────────────────────
 async def upload_from_export(client: TelegramClient, src_folder: Path,
                              dest_grp: Channel, dest_tid: Optional[int]):
@@ -557,12 +843,21 @@ async def upload_from_export(client: TelegramClient, src_folder: Path,
     print(f"📤 UPLOAD DA PASTA '{src_folder.name}' → '{dest_grp.title}'")
     print("=" * 60)
 
+    # export em .tar (archive.py): mídias lidas direto do arquivo, sem extrair
+    arc = archive.open_export(src_folder)
+    if arc:
+        src_folder = arc.path.parent
     chat_html = src_folder / "chat.html"
-    if not chat_html.exists():
+    if chat_html.exists():
+        page = chat_html.read_text("utf-8")
+    elif arc and arc.has("chat.html"):
+        page = arc.read_text("chat.html")
+    else:
         print("❌ 'chat.html' não encontrado.")
         return
 
-    soup = BeautifulSoup(chat_html.read_text("utf-8"), "html.parser")
+    from bs4 import BeautifulSoup  # dependência pesada: só neste caminho
+    soup = BeautifulSoup(page, "html.parser")
     msgs = soup.find_all("div", class_="message")
 
     resp = input("➡️  ENTER = começo no 1º, ou digite prefixo (ex: 4 para '004_'): ").strip()
@@ -576,7 +871,7 @@ async def upload_from_export(client: TelegramClient, src_folder: Path,
             return
         start_idx = next(
             (i for i, div in enumerate(msgs)
-             if (mp := _extract_media_path(div, str(src_folder)))
+             if (mp := _extract_media_path(div, str(src_folder), arc))
              and int(Path(mp).name.split('_', 1)[0]) == start_pref),
             None
         )
@@ -590,9 +885,10 @@ async def upload_from_export(client: TelegramClient, src_folder: Path,
 
     extra = {"reply_to": dest_tid} if dest_tid else {}
 
+    failed = 0
     for i, div in enumerate(to_send, 1):
         abs_idx = start_idx + i
-        media_path = _extract_media_path(div, str(src_folder))
+        media_path = _extract_media_path(div, str(src_folder), arc)
         content_div = div.find("div", class_="content")
         text = ""
         if content_div:
@@ -605,44 +901,92 @@ async def upload_from_export(client: TelegramClient, src_folder: Path,
                 ext = Path(clean_name).suffix.lower()
                 is_video = ext in VIDEO_EXTS
 
-                sys.stdout.write(f"\r📤 [{i}/{total}] {clean_name[:30]:30} ...")
-                sys.stdout.flush()
-                await client.send_file(
-                    dest_grp,
-                    file=media_path,
-                    filename=clean_name,
-                    caption=text,
-                    parse_mode="md",
-                    force_document=False,          # ← mídia quando aplicável
-                    supports_streaming=is_video,   # ← vídeos com player
-                    **extra
-                )
+                logs.progress(f"📤 [{i}/{total}] {clean_name[:30]:30} ...", bar="import")
+                # send_file com caminho = upload_file + envio na mesma chamada
+                in_tar = arc is not None and arc.has(media_path)
+                size = arc.size(media_path) if in_tar else os.path.getsize(media_path)
+                # > 10MB: partes no diário (upjournal.py), retomáveis depois de uma queda
+                jkey = None
+                if size > upjournal.BIG_FILE:
+                    jkey = (f"tar:{arc.path.resolve()}:{media_path}:{arc.entries[media_path].offset}"
+                            if in_tar else upjournal.path_key(media_path))
+
+                async def _send():
+                    # do .tar: leitor novo a cada tentativa (offset da entrada, sem extrair)
+                    src = arc.open(media_path) if in_tar else media_path
+                    try:
+                        # atributos (duração/dimensões) do arquivo, não do handle
+                        attrs, mime = utils.get_attributes(src, supports_streaming=is_video)
+                        # partes em paralelo (parupload.py); > 10MB também no diário
+                        handle = await upjournal.upload(client, src, clean_name, jkey)
+
+                        async def _send_file():
+                            return await client.send_file(
+                                dest_grp,
+                                file=handle,
+                                filename=clean_name,
+                                caption=text,
+                                parse_mode="md",
+                                force_document=False,          # ← mídia quando aplicável
+                                supports_streaming=is_video,   # ← vídeos com player
+                                attributes=attrs,
+                                mime_type=mime,
+                                **extra
+                            )
+
+                        try:
+                            res = await _send_file()
+                        except upjournal.PARTS_GONE:
+                            # partes expiraram no servidor: upload completo de novo
+                            upjournal.finish(handle)
+                            handle = await upjournal.upload(client, src, clean_name, jkey)
+                            res = await _send_file()
+                        upjournal.finish(handle)
+                        return res
+                    finally:
+                        if in_tar:
+                            src.close()
+
+                with tracing.span("send_file", idx=abs_idx, file=clean_name):
+                    await retry.run(_send, client=client, name="upload")
+                metrics.inc("tc_bytes_uploaded_total", size, path="import")
             elif text:
                 preview = text.replace("\n", " ")[:30]
-                sys.stdout.write(f"\r📤 [{i}/{total}] '{preview}' ...")
-                sys.stdout.flush()
-                await client.send_message(dest_grp, text, parse_mode="md", **extra)
+                logs.progress(f"📤 [{i}/{total}] '{preview}' ...", bar="import")
+                with tracing.span("send_message", idx=abs_idx):
+                    await retry.run(
+                        lambda: client.send_message(dest_grp, text, parse_mode="md", **extra),
+                        client=client, name="send",
+                    )
             else:
-                print(f"\n⚠️ Msg {abs_idx} sem conteúdo → pulando")
+                log.warning("⚠️ Msg %d sem conteúdo → pulando", abs_idx)
+                metrics.inc("tc_messages_total", job="import", result="skipped")
                 continue
 
-            sys.stdout.write(" " * 10 + "\r")
-            print(f"✅ {i}/{total}")
+            logs.progress(f"✅ {i}/{total}", bar="import", final=True, idx=abs_idx)
+            metrics.inc("tc_messages_total", job="import", result="processed")
             await asyncio.sleep(DELAY_BETWEEN_UPLOADS)
 
-        except FloodWaitError as e:
-            print(f"\n⏳ FLOOD WAIT {e.seconds}s")
-            await asyncio.sleep(e.seconds)
         except Exception as e:
-            print(f"\n❌ Erro na msg {abs_idx}: {e}")
-            if input("🛑 Continuar? (s/n): ").lower() != "s":
-                break
-
+            # retentativas esgotadas ou erro permanente: registra e segue (sem prompt)
+            failed += 1
+            metrics.inc("tc_messages_total", job="import", result="failed")
+            log.error("❌ Erro na msg %d: %s → pulando", abs_idx, e, extra={"idx": abs_idx})
+
+    logs.flush()
+    print_flood_summary(client)
+    retry.print_retry_summary()
+    if failed:
+        print(f"⚠️ {failed} mensagem(ns) não enviada(s).")
+    tracing.flush()
     print("\n🎉 UPLOAD CONCLUÍDO!")
 
 # helpers de leitura/HTML
-def _extract_media_path(div, src_folder: str) -> Optional[str]:
+def _extract_media_path(div, src_folder: str, arc: Optional[archive.ExportArchive] = None) -> Optional[str]:
+    """Nome da entrada no .tar (com `arc`, mesmo com chat.html na pasta) ou caminho na pasta."""
     a = div.find('a', href=re.compile(r'^media/'))
+    if a and arc is not None and arc.has(a['href']):
+        return a['href']
     if a:
         full = Path(src_folder) / a['href']
         return str(full) if full.exists() else None
@@ -661,6 +1005,7 @@ def update_chat_html(folder: Path):
         print("❌ Pasta inválida.")
         return
 
+    from bs4 import BeautifulSoup  # dependência pesada: só neste caminho
     soup = BeautifulSoup(chat_path.read_text("utf-8"), "html.parser")
     msgs = soup.find_all("div", class_="message")
 
@@ -712,9 +1057,11 @@ async def main(client: TelegramClient | None = None):
     """
     close_when_done = False
     if client is None:
+        api_id, api_hash, session_name = get_creds()
         client = TelegramClient(session_name, api_id, api_hash)
         await client.start()
         close_when_done = True
+        await metrics.start_exporters()
 
     BANNER = r"""
         .--------.
@@ -745,6 +1092,7 @@ async def main(client: TelegramClient | None = None):
             "[3] Enviar por pasta\n"
             "[4] Gerar clone html\n"
             "[5] Atualizar clone html\n"
+            "[6] Buscar nos arquivos exportados\n"
             "[0] Voltar/Sair\n"
         )
         op = input("➡️  Escolha: ").strip()
@@ -753,22 +1101,34 @@ async def main(client: TelegramClient | None = None):
             src_grp = await select_dialog_with_search(client, "📥 SELECIONE A ORIGEM (grupos/canais)")
             if not src_grp:
                 continue
+            if op == '1' and getattr(src_grp, "forum", False) and input(
+                "📚 Exportar o fórum inteiro (todos os tópicos em paralelo)? (s/N) "
+            ).strip().lower().startswith("s"):
+                to_tar = archive.TO_ARCHIVE or input(
+                    f"📦 Gravar cada tópico num único {archive.ARCHIVE_NAME}? (s/N) "
+                ).strip().lower().startswith("s")
+                await export_forum(client, src_grp, limit_bytes=0, to_archive=to_tar)
+                pause()
+                continue
             src_tid, src_name = await select_topic_with_search(client, src_grp, "📌 SELECIONE O TÓPICO DA ORIGEM")
+            to_tar = archive.TO_ARCHIVE or input(
+                f"📦 Gravar num único {archive.ARCHIVE_NAME} (sem pasta media/)? (s/N) "
+            ).strip().lower().startswith("s")
             if op == '1':
-                await export_topic(client, src_grp, src_tid, src_name, limit_bytes=0)
+                await export_topic(client, src_grp, src_tid, src_name, limit_bytes=0, to_archive=to_tar)
                 pause()
             else:
-                await export_topic(client, src_grp, src_tid, src_name, limit_bytes=0)
+                tdir = await export_topic(client, src_grp, src_tid, src_name, limit_bytes=0, to_archive=to_tar)
                 dest_grp = await select_dialog_with_search(client, "📤 SELECIONE O DESTINO (grupos/canais)")
                 if not dest_grp:
                     continue
                 dest_tid, _ = await select_topic_with_search(client, dest_grp, "📌 TÓPICO DO DESTINO")
-                await upload_from_export(client, Path(sanitize(src_name)), dest_grp, dest_tid)
+                await upload_from_export(client, tdir, dest_grp, dest_tid)
                 pause()
 
         elif op == '3':
             p = ask_directory()
-            if not p or not (p.is_dir() and (p / "chat.html").exists()):
+            if not p or not (p.is_dir() and ((p / "chat.html").exists() or archive.open_export(p))):
                 print("❌ Pasta inválida.")
                 pause()
                 continue
@@ -784,7 +1144,10 @@ async def main(client: TelegramClient | None = None):
             if not src_grp:
                 continue
             src_tid, src_name = await select_topic_with_search(client, src_grp, "📌 SELECIONE O TÓPICO DA ORIGEM")
-            await generate_html_only(client, src_grp, src_tid, src_name)
+            sync = True
+            if store_for(src_grp).synced(src_tid or 0):
+                sync = not input("➡️  Usar só o cache local (sem rede)? (s/N) ").strip().lower().startswith("s")
+            await generate_html_only(client, src_grp, src_tid, src_name, sync=sync)
             pause()
 
         elif op == '5':
@@ -795,6 +1158,15 @@ async def main(client: TelegramClient | None = None):
                 print("❌ Pasta inválida.")
             pause()
 
+        elif op == '6':
+            q = input("🔎 Buscar (\"frase\", prefixo*, sender:nome): ").strip()
+            if q:
+                root = input("📂 Pasta (ENTER = todas abaixo da pasta atual): ").strip() or "."
+                t0 = time.perf_counter()
+                hits = search.search_archives([Path(root)], q, limit=30)
+                search.print_hits(hits, time.perf_counter() - t0)
+            pause()
+
         elif op == '0':
             break
         else:
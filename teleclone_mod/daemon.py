@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Daemon sem menus: vários pares de espelho/encaminhamento num único processo.
+
+Uso:
+    python -m teleclone_mod.daemon config.toml      (ou .yaml/.yml com PyYAML instalado)
+
+- Um único TelegramClient (uma sessão/conexão) para todos os pares
+- Orçamento de concorrência compartilhado (`concurrency`) para downloads/uploads
+- SIGHUP relê o arquivo: pares novos iniciam, removidos param, alterados reiniciam
+- SIGINT/SIGTERM encerram com calma (jobs pendentes do espelho ficam na fila)
+
+Exemplo (TOML):
+
+    [telegram]              # opcional: sem isso usa data/creds.json
+    api_id = 12345
+    api_hash = "abc..."
+    session = "minha_conta"
+
+    [daemon]
+    concurrency = 8         # transferências simultâneas no processo todo
+    mirror_workers = 4      # workers por espelho
+    retry_failed = false    # na partida, jobs 'failed' do espelho voltam para a fila
+
+    [metrics]               # opcional (ou TC_METRICS_PORT / TC_METRICS_JSON)
+    port = 9464             # texto Prometheus em http://127.0.0.1:9464/metrics
+    json = "metrics.json"   # despejo periódico
+    interval = 15
+
+    [[mirror]]
+    src = -1001234567890
+    dst = "@meu_canal"
+    topic = 0               # 0/ausente = chat inteiro
+    dst_topic = 7
+    strip_caption = false
+    routes = { "5" = 12, "9" = 14 }   # tópico origem → tópico destino (ou "title")
+
+    [[forward]]
+    src = -1001234567890
+    dst = -1009876543210
+    topic = 5
+    dst_topic = 12
+"""
+import asyncio
+import hashlib
+import json
+import os
+import signal
+import sys
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+try:
+    import tomllib  # Python 3.11+
+except ImportError:
+    tomllib = None
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+from telethon import TelegramClient
+
+from teleclone_mod import forwarding as fw
+from teleclone_mod import logs, metrics
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+CRED_FILE = DATA_DIR / "creds.json"
+STATE_FILE = DATA_DIR / "daemon_state.json"
+STATE_FLUSH_S = 2.0  # gravações do estado agrupadas nesta janela
+
+log = logs.get(__name__)
+
+
+# ───────────────────── config ─────────────────────
+def load_config(path: Path) -> Dict[str, Any]:
+    raw = path.read_bytes()
+    if path.suffix.lower() in (".yaml", ".yml"):
+        if yaml is None:
+            raise RuntimeError("Config YAML requer PyYAML (pip install pyyaml).")
+        return yaml.safe_load(raw) or {}
+    if tomllib is None:
+        raise RuntimeError("Config TOML requer Python 3.11+ (tomllib).")
+    return tomllib.loads(raw.decode("utf-8"))
+
+
+def _creds(cfg: Dict[str, Any]):
+    tg = cfg.get("telegram") or {}
+    if tg.get("api_id") and tg.get("api_hash"):
+        return int(tg["api_id"]), str(tg["api_hash"]), str(tg.get("session") or "minha_conta")
+    if CRED_FILE.exists():
+        d = json.loads(CRED_FILE.read_text("utf-8"))
+        return d["api_id"], d["api_hash"], tg.get("session") or d["session"]
+    raise RuntimeError(f"Sem credenciais: defina [telegram] no config ou crie {CRED_FILE}.")
+
+
+def _job_key(kind: str, entry: Dict[str, Any]) -> str:
+    """Chave estável do par: muda se qualquer campo do bloco mudar (→ reinicia no reload)."""
+    blob = json.dumps(entry, sort_keys=True, default=str)
+    return f"{kind}:{hashlib.sha1(blob.encode()).hexdigest()[:12]}"
+
+
+def _jobs_from(cfg: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    out: Dict[str, Dict[str, Any]] = {}
+    # espelhos: workers do [daemon] entram na chave (mudou no reload → reinicia)
+    workers = (cfg.get("daemon") or {}).get("mirror_workers")
+    for kind in ("mirror", "forward"):
+        for entry in cfg.get(kind) or []:
+            keyed = dict(entry, _workers=workers) if kind == "mirror" else entry
+            out[_job_key(kind, keyed)] = dict(entry, _kind=kind)
+    return out
+
+
+# ───────────────────── estado (retomada dos forwards) ─────────────────────
+def _load_state() -> Dict[str, int]:
+    if STATE_FILE.exists():
+        try:
+            return json.loads(STATE_FILE.read_text("utf-8"))
+        except Exception:
+            pass
+    return {}
+
+
+def _save_state(state: Dict[str, int]):
+    """Grava num temporário e troca (queda no meio não apaga o estado dos outros pares)."""
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = STATE_FILE.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(state, indent=2), encoding="utf-8")
+    os.replace(tmp, STATE_FILE)
+
+
+# ───────────────────── daemon ─────────────────────
+class Daemon:
+    def __init__(self, config_path: Path):
+        self.config_path = Path(config_path)
+        self.cfg = load_config(self.config_path)
+        api_id, api_hash, session = _creds(self.cfg)
+        self.client = TelegramClient(session, api_id, api_hash)
+        self.state = _load_state()
+        self._state_timer: Optional[asyncio.TimerHandle] = None
+        self.running: Dict[str, Callable[[], Awaitable[None]]] = {}  # chave → stop()
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self._stop = asyncio.Event()
+        self._reload_lock = asyncio.Lock()
+
+    # ───────── pares ─────────
+    async def _entity(self, value):
+        return await self.client.get_entity(value)
+
+    async def _start_mirror(self, key: str, e: Dict[str, Any]):
+        src = await self._entity(e["src"])
+        dst = await self._entity(e["dst"])
+        routes = e.get("routes")
+        if routes == "title":
+            routes = await fw.routes_by_title(self.client, src, dst)
+        elif routes:
+            routes = {int(k): (dst, int(v)) for k, v in routes.items()}
+        self.running[key] = fw.live_mirror(
+            self.client, src, dst,
+            topic_id=e.get("topic"),
+            dst_topic_id=e.get("dst_topic"),
+            strip_caption=bool(e.get("strip_caption", False)),
+            workers=(self.cfg.get("daemon") or {}).get("mirror_workers"),
+            routes=routes or None,
+            retry_failed=(self.cfg.get("daemon") or {}).get("retry_failed"),
+        )
+        log.info("🪞 [%s] espelhando %s → %s", key, e["src"], e["dst"], extra={"job": key})
+
+    async def _run_forward(self, key: str, e: Dict[str, Any]):
+        src = await self._entity(e["src"])
+        dst = await self._entity(e["dst"])
+        log.info("📨 [%s] encaminhando histórico %s → %s", key, e["src"], e["dst"], extra={"job": key})
+
+        # retomada por par (não pela chave do bloco: mudar strip_caption não recomeça do zero)
+        skey = f"{e['src']}:{e.get('topic') or 0}->{e['dst']}:{e.get('dst_topic') or 0}"
+
+        def _on_forward(mid: int):
+            self.state[skey] = max(mid, self.state.get(skey, 0))
+            self._state_dirty()
+
+        await fw.forward_history(
+            self.client, src, dst,
+            topic_id=e.get("topic"),
+            dst_topic_id=e.get("dst_topic"),
+            strip_caption=bool(e.get("strip_caption", False)),
+            resume_id=self.state.get(skey),
+            on_forward=_on_forward,
+        )
+
+    def _state_dirty(self):
+        """Agenda a gravação do estado (uma por STATE_FLUSH_S, não uma por mensagem)."""
+        if self._state_timer is None:
+            self._state_timer = asyncio.get_running_loop().call_later(STATE_FLUSH_S, self._flush_state)
+
+    def _flush_state(self):
+        if self._state_timer is not None:
+            self._state_timer.cancel()
+            self._state_timer = None
+        try:
+            _save_state(self.state)
+        except OSError as e:
+            log.warning("⚠️ Estado não gravado: %s", e)
+
+    async def _start(self, key: str, e: Dict[str, Any]):
+        try:
+            if e["_kind"] == "mirror":
+                await self._start_mirror(key, e)
+            else:
+                t = self.tasks[key] = asyncio.create_task(self._run_forward(key, e))
+                t.add_done_callback(lambda t, key=key: self._forward_done(key, t))
+        except Exception:
+            log.exception("❌ [%s] falha ao iniciar:", key, extra={"job": key})
+
+    def _forward_done(self, key: str, task: asyncio.Task):
+        """Falha do encaminhamento vai para o log e libera a chave (o próximo SIGHUP reinicia)."""
+        if task.cancelled() or task.exception() is None:
+            return
+        log.error("❌ [%s] encaminhamento falhou:", key, exc_info=task.exception(), extra={"job": key})
+        if self.tasks.get(key) is task:
+            del self.tasks[key]
+
+    async def _stop_job(self, key: str):
+        stop = self.running.pop(key, None)
+        if stop is not None:
+            await stop()
+        task = self.tasks.pop(key, None)
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        log.info("⏹️  [%s] parado.", key, extra={"job": key})
+
+    async def apply(self, cfg: Dict[str, Any]):
+        """Sincroniza os pares em execução com o config (usado no start e no SIGHUP)."""
+        async with self._reload_lock:
+            self.cfg = cfg
+            fw.set_shared_concurrency((cfg.get("daemon") or {}).get("concurrency"))
+            wanted = _jobs_from(cfg)
+            current = set(self.running) | set(self.tasks)
+            for key in current - set(wanted):
+                await self._stop_job(key)
+            for key, e in wanted.items():
+                if key not in current:
+                    await self._start(key, e)
+
+    async def reload(self):
+        try:
+            cfg = load_config(self.config_path)
+        except Exception as e:
+            log.warning("⚠️ Reload ignorado (config inválido): %s", e)
+            return
+        log.info("🔄 SIGHUP: recarregando config…")
+        await self.apply(cfg)
+
+    def _install_signals(self):
+        loop = asyncio.get_running_loop()
+        if hasattr(signal, "SIGHUP"):
+            try:
+                loop.add_signal_handler(signal.SIGHUP, lambda: asyncio.ensure_future(self.reload()))
+            except NotImplementedError:  # Windows
+                pass
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self._stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+    async def run(self):
+        await self.client.start()
+        try:
+            self._install_signals()
+            m = self.cfg.get("metrics") or {}
+            await metrics.start_exporters(m.get("port"), m.get("json"), m.get("interval"))
+            await self.apply(self.cfg)
+            log.info("✅ Daemon ativo: %d espelho(s), %d encaminhamento(s).", len(self.running), len(self.tasks))
+            disconnected = asyncio.ensure_future(self.client.run_until_disconnected())
+            stopper = asyncio.ensure_future(self._stop.wait())
+            await asyncio.wait({disconnected, stopper}, return_when=asyncio.FIRST_COMPLETED)
+            stopper.cancel()
+        finally:
+            for key in list(self.running) + list(self.tasks):
+                await self._stop_job(key)
+            self._flush_state()
+            await self.client.disconnect()
+            logs.flush()
+
+
+def main(argv: Optional[list] = None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print("Uso: python -m teleclone_mod.daemon <config.toml|config.yaml>")
+        sys.exit(2)
+
+    async def _main():
+        await Daemon(Path(argv[0])).run()
+
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        print("\n⚠️  Interrompido.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pool de conexões por DC para mídia guardada em outro datacenter:
+- O Telethon pega um "sender exportado" (conexão + auth.exportAuthorization) a cada
+  download de outro DC e o desliga após 60s sem uso; com muitos arquivos pequenos
+  de DCs alheios isso vira um handshake + exportação de auth atrás do outro
+- attach(client) troca o empréstimo/devolução de senders daquele cliente pelo pool:
+  download_media/iter_download (export_topic, _safe_download_media, relay) passam
+  a usar conexões já autorizadas e quentes
+- Por DC: até TC_DC_POOL_SIZE conexões; uma nova só abre quando todas já atendem
+  TC_DC_POOL_SHARE downloads ao mesmo tempo (o MTProto multiplexa na mesma conexão)
+- Ociosa há mais de TC_DC_POOL_IDLE_S → desconectada (na varredura periódica do
+  Telethon); a autorização fica, então reconectar não exporta auth de novo
+- Contadores: tc_dc_pool_total{dc, result=hit|reconnect|new} e tc_dc_pool_evicted_total;
+  stats() para o resumo no fim do job
+- TC_DC_POOL=0 desliga (comportamento original do Telethon)
+"""
+import asyncio
+import os
+import time
+import weakref
+from typing import Dict, List, Optional
+
+from telethon import TelegramClient
+
+from teleclone_mod import metrics
+
+# ───────── Config por ambiente ─────────
+ENABLED = os.getenv("TC_DC_POOL", "1") != "0"
+POOL_SIZE = max(1, int(os.getenv("TC_DC_POOL_SIZE", "2")))      # conexões por DC
+POOL_SHARE = max(1, int(os.getenv("TC_DC_POOL_SHARE", "4")))    # downloads por conexão
+POOL_IDLE = float(os.getenv("TC_DC_POOL_IDLE_S", "300"))        # ociosa → desconecta
+
+_POOLS: "weakref.WeakSet[DCPool]" = weakref.WeakSet()
+
+
+class _Slot:
+    __slots__ = ("dc_id", "sender", "borrows", "idle_since", "connected")
+
+    def __init__(self, dc_id: int, sender):
+        self.dc_id = dc_id
+        self.sender = sender
+        self.borrows = 0
+        self.idle_since = time.monotonic()
+        self.connected = True
+
+
+class DCPool:
+    """Senders exportados de um cliente, agrupados por DC."""
+
+    def __init__(self, client: TelegramClient, *, size: int = POOL_SIZE,
+                 share: int = POOL_SHARE, idle: float = POOL_IDLE):
+        self.client = client
+        self.size = size
+        self.share = share
+        self.idle = idle
+        self._slots: Dict[int, List[_Slot]] = {}
+        self._by_sender: Dict[int, _Slot] = {}
+        self._locks: Dict[int, asyncio.Lock] = {}  # um DC lento não trava os outros
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    async def _connect(self, sender, dc_id: int):
+        c = self.client
+        dc = await c._get_dc(dc_id)
+        await sender.connect(c._connection(
+            dc.ip_address, dc.port, dc.id,
+            loggers=c._log, proxy=c._proxy, local_addr=c._local_addr,
+        ))
+
+    async def borrow(self, dc_id: int):
+        async with self._locks.setdefault(dc_id, asyncio.Lock()):
+            slots = self._slots.setdefault(dc_id, [])
+            warm = [s for s in slots if s.connected]
+            slot = min(warm, key=lambda s: s.borrows, default=None)
+            if slot is not None and (slot.borrows < self.share or len(slots) >= self.size):
+                result = "hit"
+            else:
+                slot = next((s for s in slots if not s.connected), None)
+                if slot is not None:
+                    await self._connect(slot.sender, dc_id)  # auth já importada nesta chave
+                    slot.connected = True
+                    result = "reconnect"
+                else:
+                    sender = await self.client._create_exported_sender(dc_id)
+                    sender.dc_id = dc_id
+                    slot = _Slot(dc_id, sender)
+                    slots.append(slot)
+                    self._by_sender[id(sender)] = slot
+                    result = "new"
+            slot.borrows += 1
+        if result == "hit":
+            self.hits += 1
+        else:
+            self.misses += 1
+        metrics.inc("tc_dc_pool_total", dc=dc_id, result=result)
+        return slot.sender
+
+    async def give_back(self, sender):
+        slot = self._by_sender.get(id(sender))
+        if slot is None or slot.borrows <= 0:
+            return
+        slot.borrows -= 1
+        if slot.borrows == 0:
+            slot.idle_since = time.monotonic()
+
+    async def evict_idle(self):
+        """Desconecta as conexões ociosas há mais de `idle` segundos."""
+        now = time.monotonic()
+        for dc_id, slots in self._slots.items():
+            for s in slots:
+                if s.connected and s.borrows == 0 and now - s.idle_since > self.idle:
+                    await s.sender.disconnect()  # não levanta exceção
+                    s.connected = False
+                    self.evicted += 1
+                    metrics.inc("tc_dc_pool_evicted_total", dc=dc_id)
+
+    async def close(self):
+        for slots in self._slots.values():
+            for s in slots:
+                if s.connected:
+                    await s.sender.disconnect()
+                    s.connected = False
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evicted": self.evicted,
+            "connections": {dc: sum(s.connected for s in slots) for dc, slots in self._slots.items()},
+        }
+
+
+def attach(client: TelegramClient) -> Optional[DCPool]:
+    """
+    Liga o pool no cliente (idempotente). Devolve o pool, ou None se desligado
+    ou se o cliente não tem senders exportados (ex.: cliente falso do bench).
+    """
+    pool = getattr(client, "_tc_dc_pool", None)
+    if pool is not None or not ENABLED or not hasattr(client, "_borrow_exported_sender"):
+        return pool
+
+    pool = DCPool(client)
+    disconnect = client._disconnect_coro
+
+    async def _disconnect_coro():
+        await disconnect()
+        await pool.close()
+
+    # atributos da instância têm precedência sobre os métodos do TelegramClient
+    client._borrow_exported_sender = pool.borrow
+    client._return_exported_sender = pool.give_back
+    client._clean_exported_senders = pool.evict_idle  # chamada pelo keepalive do Telethon
+    client._disconnect_coro = _disconnect_coro
+    client._tc_dc_pool = pool
+    _POOLS.add(pool)
+    return pool
+
+
+@metrics.collector
+def _pool_gauges():
+    conns: Dict[int, int] = {}
+    for pool in list(_POOLS):
+        for dc, n in pool.stats()["connections"].items():
+            conns[dc] = conns.get(dc, 0) + n
+    for dc, n in conns.items():
+        yield "tc_dc_pool_connections", {"dc": dc}, n
+
+
+def print_pool_summary(client: TelegramClient):
+    pool = getattr(client, "_tc_dc_pool", None)
+    if pool is not None and (pool.hits or pool.misses):
+        st = pool.stats()
+        print(
+            f"🔌 Conexões de outros DCs: {st['hits']} reaproveitada(s), {st['misses']} aberta(s)/"
+            f"reconectada(s), {st['evicted']} fechada(s) por ociosidade."
+        )
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Portão global de FloodWait (compartilhado por todos os workers):
+- Um FloodWaitError em QUALQUER worker pausa todos os workers da mesma conta/DC
+- Quem esbarrar no portão fechado espera o prazo, sem disparar novas requisições
+- A operação que tomou o FloodWait é repetida (re-enfileirada) após o prazo
+- Estatísticas de pausa: quantidade, segundos totais, maior pausa, re-tentativas
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from telethon import TelegramClient
+from telethon.errors import FloodWaitError
+
+from teleclone_mod import logs, metrics
+
+# margem extra após o prazo informado pelo servidor
+FLOOD_MARGIN = 1.0
+
+log = logs.get(__name__)
+
+
+class FloodGate:
+    """
+    Portão de uma conta/DC. `wait()` bloqueia enquanto houver pausa ativa;
+    `trip(secs)` estende o prazo (nunca encurta); `run(op)` executa e repete
+    a operação sempre que ela tomar FloodWait.
+    """
+
+    def __init__(self, key: Any = None):
+        self.key = key
+        self._deadline = 0.0     # time.monotonic() até quando o portão fica fechado
+        self.pauses = 0          # quantas vezes o portão foi fechado/estendido
+        self.paused_seconds = 0.0
+        self.max_pause = 0.0
+        self.requeued = 0        # operações repetidas após FloodWait
+
+    @property
+    def remaining(self) -> float:
+        return max(0.0, self._deadline - time.monotonic())
+
+    def trip(self, seconds: float) -> bool:
+        """Fecha o portão por `seconds`. Retorna True se o prazo foi estendido."""
+        secs = float(seconds or 0) + FLOOD_MARGIN
+        now = time.monotonic()
+        new_deadline = now + secs
+        if new_deadline <= self._deadline:
+            return False  # já existe pausa maior em andamento
+        # conta apenas o trecho novo (pausas sobrepostas não somam em dobro)
+        added = new_deadline - max(now, self._deadline)
+        self.paused_seconds += added
+        metrics.inc("tc_floodwait_total")
+        metrics.inc("tc_floodwait_seconds_total", added)
+        self.max_pause = max(self.max_pause, secs)
+        self.pauses += 1
+        self._deadline = new_deadline
+        log.warning("⏳ FLOOD WAIT %ds — pausando todos os workers…", int(secs), extra={"wait_s": int(secs)})
+        return True
+
+    async def wait(self):
+        """Aguarda até o portão abrir (o prazo pode ser estendido enquanto isso)."""
+        while True:
+            remain = self._deadline - time.monotonic()
+            if remain <= 0:
+                return
+            await asyncio.sleep(remain)
+
+    async def run(self, op: Callable[[], Awaitable[Any]], *, max_requeues: Optional[int] = None) -> Any:
+        """
+        Executa `op()` respeitando o portão. Em FloodWaitError fecha o portão
+        para todos e repete a operação depois do prazo.
+        `op` deve ser uma fábrica (ex.: lambda) para criar uma corrotina nova a cada tentativa.
+        """
+        tries = 0
+        while True:
+            await self.wait()
+            try:
+                return await op()
+            except FloodWaitError as e:
+                self.trip(getattr(e, "seconds", None) or 60)
+                tries += 1
+                if max_requeues is not None and tries > max_requeues:
+                    raise
+                self.requeued += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "key": self.key,
+            "pauses": self.pauses,
+            "paused_seconds": round(self.paused_seconds, 2),
+            "max_pause": round(self.max_pause, 2),
+            "requeued": self.requeued,
+            "remaining": round(self.remaining, 2),
+        }
+
+
+# ───────────────────── registro por conta/DC ─────────────────────
+_GATES: Dict[Tuple[int, int], FloodGate] = {}
+
+
+def _gate_key(client: TelegramClient) -> Tuple[int, int]:
+    session = getattr(client, "session", None)
+    dc_id = int(getattr(session, "dc_id", 0) or 0)
+    return id(client), dc_id
+
+
+def gate_for(client: TelegramClient) -> FloodGate:
+    """Portão compartilhado da conta (cliente) + DC atual."""
+    key = _gate_key(client)
+    gate = _GATES.get(key)
+    if gate is None:
+        gate = _GATES[key] = FloodGate(key)
+    return gate
+
+
+def flood_stats() -> Dict[str, Dict[str, Any]]:
+    """Estatísticas de pausa de todos os portões ativos."""
+    return {f"{cid}:dc{dc}": g.stats() for (cid, dc), g in _GATES.items()}
+
+
+def print_flood_summary(client: TelegramClient):
+    st = gate_for(client).stats()
+    if st["pauses"]:
+        print(
+            f"⏳ FloodWait: {st['pauses']} pausa(s), {st['paused_seconds']:.0f}s no total "
+            f"(maior {st['max_pause']:.0f}s), {st['requeued']} operação(ões) repetida(s)."
+        )
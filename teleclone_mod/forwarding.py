@@ -14,19 +14,29 @@ Notas de envio de mídia (correção iOS):
 
 Novidade:
 - Barra de progresso geral no encaminhamento de histórico (%, msgs/s, ETA)
-- Correção FileReferenceExpiredError via recaptura e retentativas
+- Correção FileReferenceExpiredError via recaptura (em lote) e retentativas
 - Skip de mídia autodestrutiva (TTL)
+- FloodWait global (flood.py): pausa TODOS os workers e repete a etapa que falhou
+- Retentativas unificadas (retry.py): backoff exponencial + jitter, orçamento por tipo de erro
+- Relay em streaming (relay.py): download → upload sem spool; spool fica como fallback
+- Orçamento global de RAM (membudget.py): TC_MEM_BUDGET_MB para todas as transferências
+- Thumb de vídeo buscada em paralelo, com cache LRU RAM + disco (thumbs.py)
+- live_mirror com fila durável em SQLite + pool de workers e catch-up (mirror_queue.py)
+- live_mirror com tabela de rotas por tópico: um handler espelha o fórum inteiro (routing.py)
+- Métricas (metrics.py): bytes, mensagens, latência de RPC, fila e transferências em curso
+- Tracing por etapa (tracing.py, TC_TRACE=arquivo.json): paginação, download, upload, thumb, envio
+- forward_history lê do cache local (msgstore.py): histórico paginado uma vez, depois só ids novos
 """
 import asyncio
+import contextlib
 import os
-import sys
-import tempfile
 import time
-import traceback
-from typing import Optional, Callable, Dict, Tuple, List
+from collections import deque
+from pathlib import Path
+from typing import Optional, Awaitable, Callable, Deque, Dict, Set, Tuple, List
 
 from telethon import TelegramClient, events
-from telethon.errors import FloodWaitError, RPCError, FileReferenceExpiredError
+from telethon.errors import RPCError
 from telethon.errors.rpcerrorlist import FilePartsInvalidError
 from telethon.tl import functions
 from telethon.tl.custom.message import Message
@@ -36,10 +46,78 @@ from telethon.tl.types import (
     MessageMediaDocument,
 )
 
+from teleclone_mod import dcpool, logs, metrics, retry, shaper, tracing, upjournal
+from teleclone_mod.dcpool import print_pool_summary
+from teleclone_mod.flood import print_flood_summary
+from teleclone_mod.membudget import BUDGET, budget_stats, open_spool
+from teleclone_mod.mirror_queue import RETRY_FAILED, Lane, MirrorQueue
+from teleclone_mod.parupload import UPLOAD_PARTS
+from teleclone_mod.msgstore import store_for, stored_messages
+from teleclone_mod.refresh import refetch_message, refresher_for
+from teleclone_mod.relay import PART_SIZE as RELAY_PART_SIZE, RELAY_PARTS, can_relay, relay_upload
+from teleclone_mod.routing import Route, RouteTable
+from teleclone_mod.thumbs import get_thumb, prefetch_thumb
+
 # ───────── Config por ambiente ─────────
-SPOOL_LIMIT = int(os.getenv("TC_SPOOL_LIMIT_MB", "512")) * 1024 * 1024  # 512MB padrão
+MIRROR_WORKERS = max(1, int(os.getenv("TC_MIRROR_WORKERS", "4")))       # workers do live_mirror
+QUEUE_DB = Path(os.getenv("TC_QUEUE_DB") or (Path(__file__).resolve().parent / "data" / "mirror_queue.sqlite"))
+SPOOL_LIMIT = int(os.getenv("TC_SPOOL_LIMIT_MB", "512")) * 1024 * 1024  # 512MB padrão (por arquivo)
 CONCURRENCY = max(1, int(os.getenv("TC_CONCURRENCY", "1")))             # 1 = sequencial (igual ao seu)
 
+log = logs.get(__name__)
+
+class SharedSlots:
+    """
+    Semáforo com limite ajustável: resize() vale para quem já está dentro
+    (no reload do daemon as transferências em curso continuam contando).
+    """
+
+    def __init__(self, limit: float):
+        self.limit = limit
+        self.used = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    def _wake(self):
+        free = self.limit - self.used
+        while self._waiters and free > 0:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                free -= 1
+
+    def resize(self, limit: float):
+        self.limit = limit
+        self._wake()
+
+    async def __aenter__(self):
+        while self.used >= self.limit:
+            fut = asyncio.get_running_loop().create_future()
+            self._waiters.append(fut)
+            try:
+                await fut
+            except asyncio.CancelledError:
+                self._wake()  # a vaga que nos acordou passa para o próximo
+                raise
+        self.used += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        self.used -= 1
+        self._wake()
+        return False
+
+# orçamento de concorrência compartilhado entre jobs (daemon); None = sem limite global
+_SHARED_SLOTS: Optional[SharedSlots] = None
+
+def set_shared_concurrency(n: Optional[int]):
+    """Limita quantas transferências (download/upload) rodam ao mesmo tempo no processo."""
+    global _SHARED_SLOTS
+    limit = int(n) if n else float("inf")
+    if _SHARED_SLOTS is not None:
+        _SHARED_SLOTS.resize(limit)  # mesmo limitador: quem está em voo continua contando
+    elif n:
+        _SHARED_SLOTS = SharedSlots(limit)
+
 # ───────────────────── util da barra ─────────────────────
 def _make_total_bar(prefix: str, total: int, width: int = 34):
     """
@@ -47,6 +125,7 @@ def _make_total_bar(prefix: str, total: int, width: int = 34):
     Retorna (update(done:int), close(ok:bool)).
     """
     start = time.time()
+    last = 0
 
     def _fmt(done: int):
         pct = (done / total * 100) if total else 0.0
@@ -58,15 +137,17 @@ def _make_total_bar(prefix: str, total: int, width: int = 34):
         eta = remain / speed if speed > 0 else 0.0
         h, m = int(eta // 3600), int((eta % 3600) // 60)
         s = int(eta % 60)
-        return f"\r{prefix[:26]:26} │{bar}│ {pct:6.2f}%  {speed:5.2f} msg/s  ETA {h:02d}:{m:02d}:{s:02d}"
+        return f"{prefix[:26]:26} │{bar}│ {pct:6.2f}%  {speed:5.2f} msg/s  ETA {h:02d}:{m:02d}:{s:02d}"
 
+    # consumidor da fila de log (logs.py): redesenho não bloqueia o loop
     def update(done: int):
-        sys.stdout.write(_fmt(done))
-        sys.stdout.flush()
+        nonlocal last
+        last = done
+        logs.progress(_fmt(done), bar=prefix, done=done, total=total)
 
     def close(ok: bool = True):
-        sys.stdout.write(" ✅\n" if ok else " ❌\n")
-        sys.stdout.flush()
+        logs.progress(_fmt(last) + (" ✅" if ok else " ❌"), bar=prefix, final=True, done=last, total=total)
+        logs.flush()
 
     return update, close
 
@@ -94,12 +175,11 @@ async def _get_topics_like_core(client: TelegramClient, chan) -> Dict[int, str]:
         pass
     return topics
 
-async def _resolve_like_core(client: TelegramClient, chat, user_value: Optional[int]) -> Optional[int]:
+def _resolve_in_topics(tops: Dict[int, str], user_value: Optional[int]) -> Optional[int]:
+    """Resolve índice do menu OU topic_id real contra um mapa de tópicos já obtido."""
     if user_value is None:
         return None
     sel = int(user_value)
-
-    tops = await _get_topics_like_core(client, chat)
     items: List[Tuple[int, str]] = list(tops.items())
 
     if sel == 0:
@@ -113,21 +193,85 @@ async def _resolve_like_core(client: TelegramClient, chat, user_value: Optional[
 
     raise ValueError(f"Índice/topic_id inválido: {user_value}")
 
+async def _resolve_like_core(client: TelegramClient, chat, user_value: Optional[int]) -> Optional[int]:
+    if user_value is None:
+        return None
+    tops = await _get_topics_like_core(client, chat)
+    return _resolve_in_topics(tops, user_value)
+
+async def build_route_table(
+    client: TelegramClient,
+    src,
+    routes: Dict[int, Tuple[object, Optional[int]]],
+    default: Optional[Tuple[object, Optional[int]]] = None
+) -> RouteTable:
+    """
+    Monta a tabela {tópico de origem → (destino, tópico destino)} resolvendo
+    índices/ids UMA vez (uma paginação de tópicos por chat envolvido).
+    """
+    topics_cache: Dict[int, Dict[int, str]] = {}
+
+    async def _tops(chat) -> Dict[int, str]:
+        k = id(chat) if not isinstance(chat, int) else chat
+        if k not in topics_cache:
+            topics_cache[k] = await _get_topics_like_core(client, chat)
+        return topics_cache[k]
+
+    async def _route(pair) -> Route:
+        d, d_val = pair
+        d_tid = _resolve_in_topics(await _tops(d), d_val) if d_val is not None else None
+        return Route(d, d_tid)
+
+    table = RouteTable(await _route(default) if default is not None else None)
+    for s_val, pair in routes.items():
+        table.add(_resolve_in_topics(await _tops(src), s_val), await _route(pair))
+    return table
+
+async def routes_by_title(client: TelegramClient, src, dst) -> Dict[int, Tuple[object, Optional[int]]]:
+    """
+    Casa os tópicos da ORIGEM com tópicos de MESMO título no DESTINO
+    (fórum inteiro mantendo os tópicos separados). Tópicos sem par ficam de fora.
+    """
+    s_tops = await _get_topics_like_core(client, src)
+    d_by_title: Dict[str, int] = {}
+    for tid, title in (await _get_topics_like_core(client, dst)).items():
+        d_by_title.setdefault((title or "").strip().casefold(), tid)
+    out: Dict[int, Tuple[object, Optional[int]]] = {}
+    for tid, title in s_tops.items():
+        d_tid = d_by_title.get((title or "").strip().casefold())
+        if d_tid is not None:
+            out[tid] = (dst, d_tid)
+    return out
+
 # ───────────────────── helpers de robustez ─────────────────────
-async def _upload_handle(client: TelegramClient, fobj, filename: str):
-    """Upload com part_size_kb ajustável e fallback para compatibilidade."""
-    try:
-        fobj.seek(0)
-    except Exception:
-        pass
-    try:
-        return await client.upload_file(fobj, file_name=filename, part_size_kb=512)
-    except FilePartsInvalidError:
+async def _upload_handle(client: TelegramClient, fobj, filename: str, key: Optional[str] = None):
+    """
+    Upload com part_size_kb ajustável; FilePartsInvalid reduz a parte e repete (retry.py).
+    Com `key` e > 10MB: partes no diário (upjournal.py), retomadas depois de uma queda.
+    O diário só conhece partes de 512KB: com parte reduzida o upload sai sem diário.
+    """
+    part_kb = 512
+    jkey = key
+
+    def _rewind():
         try:
             fobj.seek(0)
         except Exception:
             pass
-        return await client.upload_file(fobj, file_name=filename, part_size_kb=256)
+
+    def _on_retry(exc, kind):
+        nonlocal part_kb, jkey
+        if isinstance(exc, FilePartsInvalidError) and part_kb > 128:
+            part_kb //= 2  # compatibilidade: partes menores
+            upjournal.forget(jkey)
+            jkey = None
+        _rewind()
+
+    _rewind()
+    return await retry.run(
+        lambda: upjournal.upload(client, fobj, filename, jkey, part_size_kb=part_kb),
+        client=client, name="upload", on_retry=_on_retry,
+    )
 
 def _is_video(msg: Message) -> bool:
     doc = getattr(getattr(msg, "media", None), "document", None)
@@ -159,60 +303,67 @@ def _has_ttl_media(msg: Message) -> bool:
 async def _safe_refetch_message(client: TelegramClient, msg: Message) -> Message:
     """
     Recarrega a mesma mensagem do servidor para renovar o file_reference.
+    Pedidos simultâneos são agrupados em lotes de até 100 ids (refresh.py).
     """
-    return await client.get_messages(msg.chat_id, ids=msg.id)
+    return await refetch_message(client, msg.chat_id, msg)
+
+def _rewind_sink(file):
+    """Volta um arquivo/spool de destino ao início (retentativa recomeça do zero)."""
+    if hasattr(file, "seek"):
+        try:
+            file.seek(0)
+            file.truncate()
+        except Exception:
+            pass
 
 async def _safe_download_media(
     client: TelegramClient,
     msg: Message,
     *,
     file,
-    max_retries: int = 3,
-    retry_sleep: float = 1.5
+    policy: Optional[retry.RetryPolicy] = None
 ):
     """
-    Faz download com retentativas automáticas.
-    Se o file_reference estiver expirado, recarrega a mensagem e tenta novamente.
-    Trata FloodWait respeitando o tempo informado.
+    Faz download com a política de retentativas (retry.py):
+    - file_reference expirado → recarrega a mensagem e tenta de novo
+    - FloodWait → portão global (todos os workers pausam)
+    - rede transitória → backoff exponencial com jitter
+    Mídia de outro DC usa as conexões do pool (dcpool.py); banda limitada por shaper.DOWN.
     """
-    last_err = None
+    dcpool.attach(client)
     cur_msg = msg
-    for attempt in range(1, max_retries + 1):
-        try:
-            return await client.download_media(cur_msg, file=file)
-        except FileReferenceExpiredError as e:
-            last_err = e
-            # recarrega e tenta de novo
+
+    async def _on_retry(exc, kind):
+        nonlocal cur_msg
+        if kind == retry.FILE_REF:
             cur_msg = await _safe_refetch_message(client, cur_msg)
-        except FloodWaitError as e:
-            await asyncio.sleep(getattr(e, "seconds", 1) + 1)
-        except Exception as e:
-            last_err = e
-        await asyncio.sleep(retry_sleep * attempt)
-    if last_err:
-        raise last_err
+        _rewind_sink(file)
+
+    return await retry.run(
+        lambda: client.download_media(cur_msg, file=file, progress_callback=shaper.DOWN.meter()),
+        client=client, policy=policy, name="download", on_retry=_on_retry,
+    )
 
 async def _download_thumb_best_effort(client: TelegramClient, msg: Message):
     """
-    Tenta baixar uma miniatura (thumb) do documento, mas ignora erros.
+    Tenta obter uma miniatura (thumb) do documento, mas ignora erros.
+    Usa o cache LRU (RAM + disco) por id do documento (thumbs.py).
     Retorna bytes ou None.
     """
-    try:
-        doc = getattr(getattr(msg, "media", None), "document", None)
-        thumbs = getattr(doc, "thumbs", None) or []
-        if not thumbs:
-            return None
-        # usar a menor thumb
-        return await client.download_media(thumbs[0], file=bytes)
-    except Exception:
-        return None
+    return await get_thumb(client, msg)
 
-async def _build_send_kwargs_for_media(client: TelegramClient, msg: Message, filename: str) -> dict:
+async def _build_send_kwargs_for_media(
+    client: TelegramClient,
+    msg: Message,
+    filename: str,
+    thumb_task: Optional["asyncio.Future"] = None
+) -> dict:
     """
     Constrói kwargs para send_file de modo que:
     - vídeos sejam enviados como 'vídeo' (preview retangular e tocável em iOS)
     - preserva attributes e mime_type do documento original
     - inclui miniatura (thumb) quando existir
+    `thumb_task`: thumb já disparada em paralelo (prefetch_thumb); senão busca aqui.
     """
     kwargs: dict = {
         "file_name": filename,
@@ -233,8 +384,15 @@ async def _build_send_kwargs_for_media(client: TelegramClient, msg: Message, fil
         if (mt or "").lower() == "video/mp4" and not filename.lower().endswith(".mp4"):
             kwargs["file_name"] = filename + ".mp4"
 
-        # thumb (best-effort)
-        tbytes = await _download_thumb_best_effort(client, msg)
+        # thumb (best-effort; normalmente já veio em paralelo com a transferência)
+        with tracing.span("thumb", msg=msg.id):
+            if thumb_task is not None:
+                try:
+                    tbytes = await thumb_task
+                except Exception:
+                    tbytes = None
+            else:
+                tbytes = await _download_thumb_best_effort(client, msg)
         if tbytes:
             kwargs["thumb"] = tbytes
 
@@ -265,54 +423,131 @@ def _extract_filename(msg: Message) -> str:
     return f"{msg.id}{ext}"
 
 # ───────────────────── processamento (1 msg) ─────────────────────
-async def _process_one_message(
+async def _transfer_media(client: TelegramClient, msg: Message, filename: str):
+    """Download + upload da mídia; devolve o handle para send_file."""
+    async with (_SHARED_SLOTS or contextlib.nullcontext()):
+        with metrics.inflight("transfer"):
+            return await _transfer_media_unshared(client, msg, filename)
+
+async def _transfer_media_unshared(client: TelegramClient, msg: Message, filename: str):
+    # Relay: download e upload em paralelo, poucos MB por arquivo, sem temporário
+    handle = None
+    if can_relay(msg):
+        try:
+            async with BUDGET.reserve((RELAY_PARTS + UPLOAD_PARTS) * RELAY_PART_SIZE) as granted:  # anel + partes em voo
+                # sem RAM no orçamento (política spill / anel maior que o teto): vai pelo spool
+                if granted:
+                    with tracing.span("relay", msg=msg.id):
+                        handle = await relay_upload(client, msg, filename, key=upjournal.doc_key(msg))
+        except Exception as e:
+            log.warning("⚠️  Relay falhou (%s: %s); usando spool.", type(e).__name__, e, extra={"msg_id": msg.id})
+
+    if handle is None:
+        # Orçamento global: reserva o que ficaria em RAM (no máx. SPOOL_LIMIT);
+        # sem espaço → espera ou derrama direto para TC_SPOOL_DIR
+        size = int(getattr(getattr(msg, "file", None), "size", 0) or 0)
+        async with BUDGET.reserve(min(size, SPOOL_LIMIT)) as in_ram:
+            # Spooling: RAM até SPOOL_LIMIT; > derrama pro disco
+            with open_spool(in_ram, SPOOL_LIMIT) as sp:
+                # download robusto (recaptura se ref expirar; backoff em erro de rede)
+                with tracing.span("download_media", msg=msg.id):
+                    await _safe_download_media(client, msg, file=sp)
+                metrics.inc("tc_bytes_downloaded_total", sp.tell(), path="spool")
+
+                with tracing.span("upload_file", msg=msg.id):
+                    handle = await _upload_handle(client, sp, filename, upjournal.doc_key(msg))
+                metrics.inc("tc_bytes_uploaded_total", sp.tell(), path="spool")
+    return handle
+
+async def _prepare_message(
     client: TelegramClient,
     msg: Message,
     dst,
     dst_tid: Optional[int],
     strip_caption: bool
-):
+) -> Optional[Callable[[], Awaitable]]:
+    """
+    Etapa pesada (download/upload) de uma mensagem.
+    Devolve uma função que faz o envio final (send_file/send_message),
+    ou None se não há nada a enviar. Permite preparar em paralelo e enviar em ordem.
+    """
     caption = "" if strip_caption else (msg.text or "")
     if not getattr(msg, "media", None) and not caption:
-        return  # realmente vazia
+        return None  # realmente vazia
 
     # pular mídia autodestrutiva
     if getattr(msg, "media", None) and _has_ttl_media(msg):
-        print("⚠️  Mídia com TTL detectada; pulando.")
-        return
+        log.info("⚠️  Mídia com TTL detectada; pulando.", extra={"msg_id": msg.id})
+        return None
 
     reply_to = int(dst_tid) if (dst_tid is not None and dst_tid != 0) else None
 
     if getattr(msg, "media", None):
         filename = _extract_filename(msg)
+        # thumb do vídeo em paralelo com o download/upload principal
+        thumb_task = prefetch_thumb(client, msg) if _is_video(msg) else None
 
-        # Spooling: RAM até SPOOL_LIMIT; > derrama pro disco
-        with tempfile.SpooledTemporaryFile(max_size=SPOOL_LIMIT, mode="w+b") as sp:
-            try:
-                # download robusto (recaptura se ref expirar)
-                await _safe_download_media(client, msg, file=sp)
-            except FileReferenceExpiredError:
-                # redundante (já tenta recapturar), mas fica como fallback
-                msg = await _safe_refetch_message(client, msg)
-                await _safe_download_media(client, msg, file=sp)
-
-            handle = await _upload_handle(client, sp, filename)
-
-        send_kwargs = await _build_send_kwargs_for_media(client, msg, filename)
-        await client.send_file(
-            dst,
-            handle,
-            caption=caption,
-            reply_to=reply_to,
-            **send_kwargs
-        )
+        try:
+            handle = await _transfer_media(client, msg, filename)
+        except BaseException:
+            if thumb_task is not None:
+                thumb_task.cancel()
+            raise
+
+        send_kwargs = await _build_send_kwargs_for_media(client, msg, filename, thumb_task)
+
+        def _send_file(h):
+            return retry.run(
+                lambda: client.send_file(
+                    dst,
+                    h,
+                    caption=caption,
+                    reply_to=reply_to,
+                    **send_kwargs
+                ),
+                client=client, name="send",
+            )
+
+        async def _send():
+            nonlocal handle
+            with tracing.span("send_file", msg=msg.id):
+                try:
+                    res = await _send_file(handle)
+                except upjournal.PARTS_GONE:
+                    # partes expiraram no servidor: upload completo de novo (uma vez)
+                    upjournal.finish(handle)
+                    handle = await _transfer_media(client, msg, filename)
+                    res = await _send_file(handle)
+                upjournal.finish(handle)
+                return res
     else:
-        await client.send_message(
-            dst,
-            caption,
-            parse_mode="md",
-            reply_to=reply_to
-        )
+        async def _send():
+            with tracing.span("send_message", msg=msg.id):
+                return await retry.run(
+                    lambda: client.send_message(
+                        dst,
+                        caption,
+                        parse_mode="md",
+                        reply_to=reply_to
+                    ),
+                    client=client, name="send",
+                )
+    return _send
+
+async def _process_one_message(
+    client: TelegramClient,
+    msg: Message,
+    dst,
+    dst_tid: Optional[int],
+    strip_caption: bool
+) -> bool:
+    """True se algo foi enviado; False se a mensagem foi pulada."""
+    with tracing.span("message", msg=msg.id):
+        send = await _prepare_message(client, msg, dst, dst_tid, strip_caption)
+        if send is None:
+            return False
+        await send()
+        return True
 
 # ───────────────────── encaminhamento ─────────────────────
 async def forward_history(
@@ -330,23 +565,24 @@ async def forward_history(
     Encaminha o histórico de mensagens com barra de progresso geral.
     A barra reflete *mensagens processadas* (enviadas/puladas/falhas).
     """
+    total = done = 0
+    dcpool.attach(client)  # antes do primeiro download (relay e spool)
+
+    @metrics.collector
+    def _pending():
+        yield "tc_queue_depth", {"queue": "forward_history"}, total - done
+
     try:
         src_tid = await _resolve_like_core(client, src, topic_id)
         dst_tid = await _resolve_like_core(client, dst, dst_topic_id)
 
-        # Filtro base
-        im_kwargs = dict(reverse=True)
-        if src_tid and src_tid != 0:
-            im_kwargs["reply_to"] = int(src_tid)
-
-        # ── Passo 1: contar quantas mensagens serão consideradas ──
-        total = 0
-        async for m in client.iter_messages(src, **im_kwargs):
-            if resume_id is not None and m.id <= resume_id:
-                continue
-            cap = "" if strip_caption else (m.text or "")
-            if getattr(m, "media", None) or cap:
-                total += 1
+        # ── Passo 1: cache local (msgstore.py) — só ids novos vêm do Telegram ──
+        scope = int(src_tid or 0)
+        store = store_for(src)
+        await store.sync(client, src, scope)
+        # sem mensagens “vazias” (sem texto e sem mídia) e a partir do ponto de retomada
+        sel = dict(min_id=resume_id or 0, nonempty=True, strip_caption=strip_caption)
+        total = store.count(scope, **sel)
 
         update_bar, close_bar = _make_total_bar("Encaminhando", total)
         done = 0
@@ -359,68 +595,80 @@ async def forward_history(
                 done += 1
                 update_bar(done)
 
+        # mensagens completas em lotes de 100 ids (get_messages), na ordem do cache
+        messages = stored_messages(client, src, store, scope, **sel)
+
         if CONCURRENCY == 1:
-            async for msg in client.iter_messages(src, **im_kwargs):
-                if resume_id is not None and msg.id <= resume_id:
+            async for msg in messages:
+                if msg is None:  # apagada no Telegram depois do sync
+                    metrics.inc("tc_messages_total", job="forward", result="skipped")
+                    await _tick()
                     continue
                 try:
-                    await _process_one_message(client, msg, dst, dst_tid, strip_caption)
+                    # FloodWait/rede: retry.py pausa, espera e repete a etapa que falhou
+                    sent = await _process_one_message(client, msg, dst, dst_tid, strip_caption)
+                    metrics.inc("tc_messages_total", job="forward", result="processed" if sent else "skipped")
                     if on_forward:
                         try:
                             on_forward(msg.id)
                         except Exception:
                             pass
-                except FloodWaitError as e:
-                    secs = getattr(e, "seconds", None) or 60
-                    print(f"\n⏳ FLOOD WAIT {secs}s — aguardando…")
-                    await asyncio.sleep(secs)
                 except Exception:
-                    print("⚠️ Falha ao enviar esta mensagem; pulando.")
-                    traceback.print_exc(file=sys.stdout)
+                    metrics.inc("tc_messages_total", job="forward", result="failed")
+                    log.exception("⚠️ Falha ao enviar esta mensagem; pulando.", extra={"msg_id": msg.id})
                 finally:
                     await _tick()
 
         else:
             sem = asyncio.Semaphore(CONCURRENCY)
-            tasks = []
+            tasks: Set[asyncio.Task] = set()
 
             async def worker(m: Message):
-                async with sem:
-                    try:
-                        await _process_one_message(client, m, dst, dst_tid, strip_caption)
-                        if on_forward:
-                            try:
-                                on_forward(m.id)
-                            except Exception:
-                                pass
-                    except FloodWaitError as e:
-                        secs = getattr(e, "seconds", None) or 60
-                        print(f"\n⏳ FLOOD WAIT {secs}s — aguardando…")
-                        await asyncio.sleep(secs)
-                    except Exception:
-                        print("⚠️ Falha ao enviar esta mensagem; pulando.")
-                        traceback.print_exc(file=sys.stdout)
-                    finally:
-                        await _tick()
-
-            async for msg in client.iter_messages(src, **im_kwargs):
-                if resume_id is not None and msg.id <= resume_id:
-                    continue
-                # aplica mesmo critério de contagem (mensagens “vazias” já foram excluídas no total)
-                cap = "" if strip_caption else (msg.text or "")
-                if not getattr(msg, "media", None) and not cap:
+                try:
+                    # FloodWait em um worker pausa todos (portão global) e repete a etapa
+                    sent = await _process_one_message(client, m, dst, dst_tid, strip_caption)
+                    metrics.inc("tc_messages_total", job="forward", result="processed" if sent else "skipped")
+                    if on_forward:
+                        try:
+                            on_forward(m.id)
+                        except Exception:
+                            pass
+                except Exception:
+                    metrics.inc("tc_messages_total", job="forward", result="failed")
+                    log.exception("⚠️ Falha ao enviar esta mensagem; pulando.", extra={"msg_id": m.id})
+                finally:
+                    sem.release()
+                    await _tick()
+
+            async for msg in messages:
+                if msg is None:  # apagada no Telegram depois do sync
+                    metrics.inc("tc_messages_total", job="forward", result="skipped")
+                    await _tick()
                     continue
-                tasks.append(asyncio.create_task(worker(msg)))
+                # vaga ANTES de criar a task: só CONCURRENCY Messages vivos por vez
+                # (sem isso o histórico inteiro ficaria retido em tasks pendentes)
+                await sem.acquire()
+                t = asyncio.create_task(worker(msg))
+                tasks.add(t)
+                t.add_done_callback(tasks.discard)
 
             if tasks:
                 await asyncio.gather(*tasks, return_exceptions=True)
 
         close_bar(True)
+        print_flood_summary(client)
+        print_pool_summary(client)
+        retry.print_retry_summary()
+        bs = budget_stats()
+        print(f"🧠 RAM de spool: pico {bs['peak']/1024**2:.1f} MB, {bs['waits']} espera(s), {bs['spills']} direto p/ disco.")
         print("\n✅ Encaminhamento concluído!\n")
 
     except Exception:
-        print("\n❌ Erro inesperado no encaminhamento:")
-        traceback.print_exc(file=sys.stdout)
+        log.exception("❌ Erro inesperado no encaminhamento:")
+    finally:
+        metrics.REGISTRY.unregister(_pending)
+        tracing.flush()
+        logs.flush()
 
 # ───────────────────── espelhamento em tempo real ─────────────────────
 def live_mirror(
@@ -430,60 +678,181 @@ def live_mirror(
     *,
     topic_id: Optional[int] = None,
     dst_topic_id: Optional[int] = None,
-    strip_caption: bool = False
+    strip_caption: bool = False,
+    workers: Optional[int] = None,
+    queue_path: Optional[Path] = None,
+    routes: Optional[Dict[int, Tuple[object, Optional[int]]]] = None,
+    retry_failed: Optional[bool] = None
 ):
-    _dst_tid: Optional[int] = None
-
-    async def _init():
-        nonlocal _dst_tid
-        _dst_tid = await _resolve_like_core(client, dst, dst_topic_id)
-
-    asyncio.get_event_loop().create_task(_init())
+    """
+    Espelhamento em tempo real com fila durável (mirror_queue.py):
+    - o handler do Telethon apenas enfileira; `workers` processam em paralelo
+    - envio em ordem por destino; falhas ficam registradas na fila
+    - no reinício, faz catch-up desde o último ID visto (nada se perde offline)
+    - erro transitório: o job volta para a fila com espera exponencial;
+      `retry_failed` (padrão TC_QUEUE_RETRY_FAILED) reenfileira os 'failed' na partida
+
+    Roteamento por tópico (routing.py):
+    - `routes`: {tópico origem: (chat destino, tópico destino)}; o que não casar
+      vai para (dst, dst_topic_id) se `topic_id` for None/0, senão é ignorado
+    - sem `routes`: `topic_id` != 0 filtra só aquele tópico; None/0 espelha tudo
+
+    Retorna `stop()` (corrotina) para desligar este espelho sem derrubar o cliente.
+    """
+    n_workers = max(1, int(workers or MIRROR_WORKERS))
+    dcpool.attach(client)
+    queue = MirrorQueue(queue_path or QUEUE_DB)
+    table: Optional[RouteTable] = None
+    ready = asyncio.Event()
+    lanes: Dict[str, Lane] = {}
+    by_key: Dict[str, Route] = {}
+    fresh: Dict[int, Message] = {}  # mensagens já em mãos (evita refetch)
+    start_cursors: Dict[str, Dict[int, int]] = {}
+    inflight: Set[asyncio.Task] = set()
+    collectors: List[Callable] = []
 
     @client.on(events.NewMessage(chats=src))
     async def _handler(event):
-        caption = "" if strip_caption else (event.message.text or "")
-        if not getattr(event.message, "media", None) and not caption:
+        msg = event.message
+        caption = "" if strip_caption else (msg.text or "")
+        if not getattr(msg, "media", None) and not caption:
+            return
+        if not ready.is_set():
+            await ready.wait()  # só na partida, enquanto a tabela é resolvida
+        if table is None:
+            return  # partida falhou (registrada no log): não há rotas
+        route = table.route(msg)
+        if route is None:
             return
+        if queue.enqueue(event.chat_id, msg.id, route.key):
+            fresh[msg.id] = msg  # duplicado/já visto no catch-up: nenhum job vai consumir
+
+    async def _run_job(job, sem: asyncio.Semaphore):
+        job_id, src_id, msg_id, key = job
+        lane = lanes.setdefault(key, Lane())
         try:
-            while True:
-                try:
-                    if getattr(event.message, "media", None):
-                        # mídia TTL? pular
-                        if _has_ttl_media(event.message):
-                            print("⚠️  Mídia com TTL detectada (live); pulando.")
-                            break
-
-                        filename = _extract_filename(event.message)
-                        with tempfile.SpooledTemporaryFile(max_size=SPOOL_LIMIT, mode="w+b") as sp:
-                            try:
-                                await _safe_download_media(client, event.message, file=sp)
-                            except FileReferenceExpiredError:
-                                fresh = await _safe_refetch_message(client, event.message)
-                                await _safe_download_media(client, fresh, file=sp)
-
-                            handle = await _upload_handle(client, sp, filename)
-
-                        send_kwargs = await _build_send_kwargs_for_media(client, event.message, filename)
-                        await client.send_file(
-                            dst,
-                            handle,
-                            caption=caption,
-                            reply_to=(int(_dst_tid) if (_dst_tid is not None and _dst_tid != 0) else None),
-                            **send_kwargs
-                        )
-                    else:
-                        await client.send_message(
-                            dst,
-                            caption,
-                            parse_mode="md",
-                            reply_to=(int(_dst_tid) if (_dst_tid is not None and _dst_tid != 0) else None)
-                        )
-                    break
-                except FloodWaitError as e:
-                    secs = getattr(e, "seconds", None) or 60
-                    print(f"\n⏳ FLOOD WAIT {secs}s — aguardando…")
-                    await asyncio.sleep(secs)
-        except Exception:
-            print("\n❌ Erro no espelhamento em tempo real:")
-            traceback.print_exc(file=sys.stdout)
+            msg = fresh.pop(msg_id, None) or await refresher_for(client).refresh(src, msg_id)
+            if msg is None:
+                queue.finish(job_id, "mensagem não encontrada (apagada?)", retry=False)
+                metrics.inc("tc_messages_total", job="mirror", result="skipped")
+                return
+            route = by_key.get(key)
+            if route is None:
+                queue.finish(job_id, f"rota '{key}' não existe mais", retry=False)
+                return
+            # preparo (download/upload) em paralelo; envio só na vez deste job
+            with tracing.span("message", msg=msg_id, route=key):
+                send = await _prepare_message(client, msg, route.dst, route.dst_tid, strip_caption)
+                with tracing.span("lane_wait"):
+                    await lane.turn(job_id)
+                if send is not None:
+                    await send()
+            queue.finish(job_id)
+            metrics.inc("tc_messages_total", job="mirror", result="processed" if send else "skipped")
+        except Exception as e:
+            # transitório: volta para a fila com espera; 'failed' só após TC_QUEUE_MAX_ATTEMPTS
+            requeued = queue.finish(job_id, f"{type(e).__name__}: {e}")
+            metrics.inc("tc_messages_total", job="mirror", result="retried" if requeued else "failed")
+            log.exception("❌ Erro no espelhamento (msg %s%s):", msg_id,
+                          ", nova tentativa mais tarde" if requeued else "", extra={"msg_id": msg_id})
+        finally:
+            await lane.release(job_id)
+            sem.release()
+            st = queue.stats(src_id, by_key)
+            logs.progress(
+                f"🪞 Fila: {st['pending']} pendente(s) │ {st['running']} em curso │ "
+                f"{st['done']} ok │ {st['failed']} falha(s)",
+                bar=f"mirror:{src_id}", **st,
+            )
+
+    async def _start():
+        nonlocal table
+        # tabela resolvida UMA vez; cada mensagem depois é um lookup O(1)
+        unrouted = (dst, dst_topic_id) if not topic_id else None
+        try:
+            if routes:
+                table = await build_route_table(client, src, routes, default=unrouted)
+            elif topic_id:
+                table = await build_route_table(client, src, {topic_id: (dst, dst_topic_id)})
+            else:
+                table = await build_route_table(client, src, {}, default=(dst, dst_topic_id))
+            for r in table.routes():
+                by_key[r.key] = r
+                start_cursors[r.key] = queue.cursors(r.key)
+        except BaseException:
+            table = None  # handler vê a falha e descarta os eventos
+            raise
+        finally:
+            ready.set()  # sem isso cada evento ficaria preso em ready.wait()
+        src_id = await client.get_peer_id(src)
+        # só as rotas deste espelho: outro live_mirror da mesma origem (fan-out,
+        # recarga do daemon) divide o arquivo e não pode ter jobs roubados
+        queue.recover(src_id, by_key)
+        if RETRY_FAILED if retry_failed is None else retry_failed:
+            n = queue.retry_failed(src_id, by_key)
+            if n:
+                log.info("🔁 %d job(s) com falha de volta à fila.", n)
+
+        def _depth():
+            st = queue.stats(src_id, by_key)
+            yield "tc_queue_depth", {"queue": f"mirror:{src_id}"}, st["pending"] + st["running"]
+        collectors.append(metrics.collector(_depth))
+
+        # catch-up: o que chegou enquanto o processo estava fora do ar
+        lasts = {k: c.get(src_id) for k, c in start_cursors.items()}
+        known = [v for v in lasts.values() if v is not None]
+        if len(known) < len(lasts):
+            newest = await client.get_messages(src, limit=1)
+            for k, v in lasts.items():
+                if v is None and newest:
+                    queue.mark_seen(src_id, k, newest[0].id)  # 1ª execução da rota: começa de agora
+        if known:
+            n = 0
+            async for m in client.iter_messages(src, min_id=min(known), reverse=True):
+                caption = "" if strip_caption else (m.text or "")
+                if not getattr(m, "media", None) and not caption:
+                    continue
+                route = table.route(m)
+                if route is None or lasts.get(route.key) is None or m.id <= lasts[route.key]:
+                    continue
+                # sem guardar em `fresh`: um catch-up longo reteria o histórico inteiro;
+                # o worker recarrega pelo id (lotes de 100 no refresh.py)
+                n += queue.enqueue(src_id, m.id, route.key)
+            if n:
+                log.info("🔁 Catch-up: %d mensagem(ns) desde o ID %d.", n, min(known))
+
+        # despacho: claim em ordem de chegada → lane do destino → worker livre
+        sem = asyncio.Semaphore(n_workers)
+        while True:
+            jobs = queue.claim(n_workers, src_id, by_key)
+            if not jobs:
+                await queue.wait_for_work()
+                continue
+            for job in jobs:
+                lanes.setdefault(job[3], Lane()).admit(job[0])
+                await sem.acquire()
+                t = asyncio.create_task(_run_job(job, sem))
+                inflight.add(t)
+                t.add_done_callback(inflight.discard)
+
+    def _starter_done(t: asyncio.Task):
+        if not t.cancelled() and t.exception() is not None:
+            log.error("❌ Espelho parou (%s → %s):", getattr(src, "title", src), getattr(dst, "title", dst),
+                      exc_info=t.exception())
+
+    starter = asyncio.get_running_loop().create_task(_start())
+    starter.add_done_callback(_starter_done)
+
+    async def stop():
+        """Para este espelho: remove o handler e o despacho (jobs pendentes ficam na fila)."""
+        client.remove_event_handler(_handler)
+        starter.cancel()
+        for t in list(inflight):
+            t.cancel()  # interrompidos voltam para 'pending' no próximo recover()
+        await asyncio.gather(starter, *inflight, return_exceptions=True)
+        tracing.flush()
+        for fn in collectors:
+            metrics.REGISTRY.unregister(fn)
+        queue.close()
+
+    return stop
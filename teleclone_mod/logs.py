@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Log fora do event loop (fila + thread de escrita):
+- get(__name__).info/…/exception só enfileiram o registro; quem escreve no terminal
+  ou no arquivo é uma thread (QueueListener) — terminal/pipe lento não trava o loop
+- Terminal: mesma cara de sempre (só a mensagem); barras de progresso redesenham
+  a mesma linha com \\r e a próxima mensagem começa numa linha nova
+- Sem terminal (pipe, serviço, daemon) ou TC_LOG_PLAIN=1: uma linha por evento com
+  data/hora, nível e módulo; barras viram uma linha a cada TC_LOG_PROGRESS_S segundos
+- TC_LOG_JSON=<arquivo>: também grava JSON lines {"ts","level","logger","msg",
+  campos extras, "exc"}; "-" = JSON no stdout no lugar do texto
+- Avisos/erros repetidos (mesmo módulo + mesma mensagem-modelo + mesmo tipo de
+  exceção): até TC_LOG_REPEAT_MAX a cada TC_LOG_REPEAT_S; os demais só são contados
+  e a próxima que passar diz quantas foram suprimidas
+- progress(texto, bar=…): a barra é só mais um registro (campo "progress")
+- flush(): espera a fila esvaziar (fim de job, antes de voltar a usar print/input)
+
+Uso:
+    log = logs.get(__name__)
+    log.error("❌ Erro em '%s': %s", fname, e)   # modelo fixo → limite de repetição
+    logs.progress(f"Baixando … {pct:6.2f}%", bar="export")
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# ───────── Config por ambiente ─────────
+LOG_LEVEL = os.getenv("TC_LOG_LEVEL", "INFO").upper()
+LOG_JSON = os.getenv("TC_LOG_JSON") or None                        # arquivo | "-" (stdout)
+PLAIN = os.getenv("TC_LOG_PLAIN") == "1" or not sys.stdout.isatty()
+PROGRESS_EVERY = float(os.getenv("TC_LOG_PROGRESS_S", "10"))        # barra sem terminal
+REDRAW_EVERY = 0.1                                                  # barra no terminal
+REPEAT_WINDOW = float(os.getenv("TC_LOG_REPEAT_S", "60"))
+REPEAT_MAX = max(1, int(os.getenv("TC_LOG_REPEAT_MAX", "5")))
+
+ROOT = "teleclone"
+
+# atributos padrão do LogRecord (o resto vira campo no JSON)
+_STD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+_INTERNAL = {"progress", "final", "suppressed"}
+
+
+class _RepeatFilter(logging.Filter):
+    """Limita avisos/erros repetidos por (módulo, modelo da mensagem, tipo de exceção)."""
+
+    def __init__(self):
+        super().__init__()
+        self._seen: Dict[Tuple, list] = {}  # chave → [início da janela, emitidas, suprimidas]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING:
+            return True
+        exc = record.exc_info[0].__name__ if record.exc_info and record.exc_info[0] else ""
+        key = (record.name, str(record.msg), exc)
+        now = time.monotonic()
+        with self._lock:
+            st = self._seen.get(key)
+            if st is None or now - st[0] >= REPEAT_WINDOW:
+                dropped = st[2] if st else 0
+                self._seen[key] = [now, 1, 0]
+                if dropped:
+                    record.suppressed = dropped
+                return True
+            if st[1] < REPEAT_MAX:
+                st[1] += 1
+                return True
+            st[2] += 1
+            return False
+
+    def drain(self) -> int:
+        """Total suprimido ainda não relatado (zera as contagens)."""
+        with self._lock:
+            n = sum(st[2] for st in self._seen.values())
+            self._seen.clear()
+        return n
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Formata no chamador (args/traceback viram texto) e mantém os campos extras."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg, record.args = record.message, None
+        record.exc_info = record.stack_info = None
+        return record
+
+
+def _text(record: logging.LogRecord) -> str:
+    msg = record.getMessage()
+    n = getattr(record, "suppressed", 0)
+    if n:
+        msg += f" (+{n} igual(is) suprimida(s))"
+    return msg
+
+
+class _ConsoleHandler(logging.Handler):
+    """Terminal: mensagem pura e barra com \\r. Sem terminal: linha com data/nível/módulo."""
+
+    def __init__(self, stream, plain: bool):
+        super().__init__()
+        self._stream = stream  # None = o sys.stdout da hora (pode ser trocado, ex.: bench)
+        self.plain = plain
+        self._bar_open = False
+        self._bar_len = 0
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            bar = getattr(record, "progress", None)
+            msg = _text(record)
+            if self.plain:
+                ts = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record.created))
+                out = f"{ts} {record.levelname:<7} {record.name}: {msg.strip()}\n"
+                if record.exc_text:
+                    out += record.exc_text + "\n"
+            elif bar is not None:
+                final = getattr(record, "final", False)
+                # espaços apagam o resto de uma barra anterior mais longa
+                out = "\r" + msg + " " * max(0, self._bar_len - len(msg)) + ("\n" if final else "")
+                self._bar_open, self._bar_len = not final, (0 if final else len(msg))
+            else:
+                out = ("\n" if self._bar_open else "") + msg + "\n"
+                if record.exc_text:
+                    out += record.exc_text + "\n"
+                self._bar_open, self._bar_len = False, 0
+            stream = self._stream or sys.stdout
+            stream.write(out)
+            stream.flush()
+        except Exception:
+            self.handleError(record)
+
+
+class _JsonHandler(logging.Handler):
+    """Uma linha JSON por registro; barras só a cada PROGRESS_EVERY (e a final)."""
+
+    def __init__(self, stream):
+        super().__init__()
+        self._stream = stream  # None = o sys.stdout da hora
+        self._last_bar: Dict[str, float] = {}
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            bar = getattr(record, "progress", None)
+            if bar is not None and not getattr(record, "final", False):
+                if record.created - self._last_bar.get(bar, 0.0) < PROGRESS_EVERY:
+                    return
+                self._last_bar[bar] = record.created
+            doc = {
+                "ts": round(record.created, 3),
+                "level": record.levelname.lower(),
+                "logger": record.name,
+                "msg": record.getMessage().strip(),
+            }
+            if bar is not None:
+                doc["progress"] = bar
+            n = getattr(record, "suppressed", 0)
+            if n:
+                doc["suppressed"] = n
+            for k, v in vars(record).items():
+                if k not in _STD_ATTRS and k not in _INTERNAL:
+                    doc[k] = v if isinstance(v, (int, float, str, bool, type(None))) else str(v)
+            if record.exc_text:
+                doc["exc"] = record.exc_text
+            stream = self._stream or sys.stdout
+            stream.write(json.dumps(doc, ensure_ascii=False) + "\n")
+            stream.flush()
+        except Exception:
+            self.handleError(record)
+
+
+# ───────── montagem (uma vez por processo) ─────────
+_queue: "queue.Queue[logging.LogRecord]" = queue.Queue()
+_repeat = _RepeatFilter()
+_listener: Optional[logging.handlers.QueueListener] = None
+_setup_lock = threading.Lock()
+_last_bar: Dict[str, float] = {}
+
+
+def _start():
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+        handlers = []
+        if LOG_JSON == "-":
+            handlers.append(_JsonHandler(None))
+        else:
+            handlers.append(_ConsoleHandler(None, PLAIN))
+            if LOG_JSON:
+                handlers.append(_JsonHandler(open(LOG_JSON, "a", encoding="utf-8")))
+        _listener = logging.handlers.QueueListener(_queue, *handlers)
+        _listener.start()
+        atexit.register(flush)
+
+
+class _LazyQueueHandler(_QueueHandler):
+    def enqueue(self, record):
+        if _listener is None:
+            _start()  # thread só nasce no primeiro registro
+        super().enqueue(record)
+
+
+_root = logging.getLogger(ROOT)
+_root.setLevel(LOG_LEVEL)
+_root.propagate = False
+_qh = _LazyQueueHandler(_queue)
+_qh.addFilter(_repeat)
+_root.addHandler(_qh)
+
+
+def get(name: str) -> logging.Logger:
+    """Logger do módulo (teleclone_mod.core → teleclone.core)."""
+    return logging.getLogger(f"{ROOT}.{name.rsplit('.', 1)[-1]}")
+
+
+_progress_log = get("progress")
+
+
+def progress(text: str, *, bar: str = "bar", final: bool = False, **fields):
+    """
+    Redesenha a barra `bar`. Descarta redesenhos mais rápidos que REDRAW_EVERY
+    (terminal) ou PROGRESS_EVERY (sem terminal); `final=True` sempre sai e fecha a linha.
+    """
+    now = time.monotonic()
+    if not final and now - _last_bar.get(bar, 0.0) < (PROGRESS_EVERY if PLAIN else REDRAW_EVERY):
+        return
+    _last_bar[bar] = now
+    if final:
+        _last_bar.pop(bar, None)
+    _progress_log.info(text, extra={"progress": bar, "final": final, **fields})
+
+
+def flush():
+    """Espera a thread escrever tudo (e relata supressões pendentes)."""
+    if _listener is None:
+        return
+    n = _repeat.drain()
+    if n:
+        get("logs").info("🔇 %d aviso(s)/erro(s) repetido(s) suprimido(s).", n)
+    _queue.join()
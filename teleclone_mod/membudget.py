@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Orçamento global de memória para transferências com spool:
+- Limite de bytes em RAM para o PROCESSO inteiro (TC_MEM_BUDGET_MB), não por arquivo
+- Cada transferência reserva o tamanho da mídia antes de começar
+- Sem espaço: espera (TC_MEM_POLICY=wait) ou derrama direto para disco (=spill)
+  no diretório TC_SPOOL_DIR (ex.: tmpfs ou NVMe)
+- Reserva atual e pico expostos em budget_stats()
+"""
+import asyncio
+import contextlib
+import os
+import tempfile
+from typing import Any, Dict, Optional
+
+from teleclone_mod import metrics
+
+# ───────── Config por ambiente ─────────
+MEM_BUDGET = int(os.getenv("TC_MEM_BUDGET_MB", "1024")) * 1024 * 1024  # 0 = sem limite
+MEM_POLICY = os.getenv("TC_MEM_POLICY", "wait").strip().lower()         # wait | spill
+SPOOL_DIR = os.getenv("TC_SPOOL_DIR") or None                            # None = padrão do SO
+
+
+class MemoryBudget:
+    """
+    `async with budget.reserve(n) as in_ram:` — in_ram=True quando os `n` bytes
+    cabem em RAM (reservados até o fim do bloco); False = use disco.
+    """
+
+    def __init__(self, limit: int, policy: str = "wait"):
+        self.limit = max(0, int(limit))
+        self.policy = policy if policy in ("wait", "spill") else "wait"
+        self.current = 0
+        self.peak = 0
+        self.waits = 0    # reservas que precisaram esperar
+        self.spills = 0   # transferências mandadas direto para disco
+        self._cond = asyncio.Condition()
+
+    def _fits(self, n: int) -> bool:
+        return not self.limit or self.current + n <= self.limit
+
+    @contextlib.asynccontextmanager
+    async def reserve(self, nbytes: int):
+        n = max(0, int(nbytes or 0))
+        if self.limit and n > self.limit:
+            # nunca caberia: vai direto para disco
+            self.spills += 1
+            yield False
+            return
+
+        async with self._cond:
+            if not self._fits(n):
+                if self.policy == "spill":
+                    self.spills += 1
+                    granted = False
+                else:
+                    self.waits += 1
+                    await self._cond.wait_for(lambda: self._fits(n))
+                    granted = True
+            else:
+                granted = True
+            if granted:
+                self.current += n
+                self.peak = max(self.peak, self.current)
+
+        try:
+            yield granted
+        finally:
+            if granted:
+                async with self._cond:
+                    self.current -= n
+                    self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "policy": self.policy,
+            "current": self.current,
+            "peak": self.peak,
+            "waits": self.waits,
+            "spills": self.spills,
+        }
+
+
+BUDGET = MemoryBudget(MEM_BUDGET, MEM_POLICY)
+
+
+@metrics.collector
+def _budget_metrics():
+    yield "tc_spool_reserved_bytes", {}, BUDGET.current
+    yield "tc_spool_reserved_peak_bytes", {}, BUDGET.peak
+
+
+def budget_stats() -> Dict[str, Any]:
+    return BUDGET.stats()
+
+
+def open_spool(in_ram: bool, max_size: int, spool_dir: Optional[str] = None):
+    """
+    Arquivo de trabalho para uma transferência:
+    - in_ram=True → SpooledTemporaryFile (RAM até `max_size`, depois disco)
+    - in_ram=False → TemporaryFile direto no disco de spool
+    """
+    d = spool_dir or SPOOL_DIR
+    if in_ram:
+        return tempfile.SpooledTemporaryFile(max_size=max_size, mode="w+b", dir=d)
+    return tempfile.TemporaryFile(mode="w+b", dir=d)
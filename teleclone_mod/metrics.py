@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Registro de métricas em processo (sem dependências externas):
+- Contadores, gauges e histogramas com labels
+- Exportação em texto Prometheus numa porta local (TC_METRICS_PORT)
+  e/ou despejo periódico em JSON (TC_METRICS_JSON, a cada TC_METRICS_INTERVAL s)
+- Coletores: funções chamadas na hora da leitura (fila, orçamento de RAM, etc.)
+
+Métricas principais:
+    tc_bytes_downloaded_total / tc_bytes_uploaded_total {path}
+    tc_messages_total {job, result=processed|skipped|failed}
+    tc_rpc_seconds (histograma) {rpc}
+    tc_retries_total {op, kind}
+    tc_floodwait_total / tc_floodwait_seconds_total
+    tc_queue_depth {queue}
+    tc_inflight {stage}
+"""
+import asyncio
+import contextlib
+import json
+import os
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# ───────── Config por ambiente ─────────
+METRICS_PORT = int(os.getenv("TC_METRICS_PORT", "0"))           # 0 = desligado
+METRICS_HOST = os.getenv("TC_METRICS_HOST", "127.0.0.1")
+METRICS_JSON = os.getenv("TC_METRICS_JSON") or None              # caminho do dump JSON
+METRICS_INTERVAL = float(os.getenv("TC_METRICS_INTERVAL", "15"))
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _esc(v: str) -> str:
+    return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_esc(v)}"' for k, v in items) + "}"
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "n")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.n = 0
+
+    def observe(self, v: float):
+        self.counts[bisect_left(LATENCY_BUCKETS, v)] += 1
+        self.total += v
+        self.n += 1
+
+
+class Registry:
+    def __init__(self):
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+        self.gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self.histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, Dict[str, object], float]]]] = []
+
+    # ───────── escrita ─────────
+    def inc(self, name: str, value: float = 1, **labels):
+        series = self.counters.setdefault(name, {})
+        k = _key(labels)
+        series[k] = series.get(k, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        self.gauges.setdefault(name, {})[_key(labels)] = value
+
+    def add(self, name: str, delta: float, **labels):
+        series = self.gauges.setdefault(name, {})
+        k = _key(labels)
+        series[k] = series.get(k, 0) + delta
+
+    def observe(self, name: str, value: float, **labels):
+        series = self.histograms.setdefault(name, {})
+        k = _key(labels)
+        h = series.get(k)
+        if h is None:
+            h = series[k] = _Histogram()
+        h.observe(value)
+
+    def collector(self, fn: Callable[[], Iterable[Tuple[str, Dict[str, object], float]]]):
+        """Registra fn() → [(nome_gauge, labels, valor)], avaliada a cada leitura."""
+        self._collectors.append(fn)
+        return fn
+
+    def unregister(self, fn):
+        with contextlib.suppress(ValueError):
+            self._collectors.remove(fn)
+
+    # ───────── leitura ─────────
+    def _collected(self) -> Dict[str, Dict[LabelKey, float]]:
+        out: Dict[str, Dict[LabelKey, float]] = {}
+        for fn in list(self._collectors):
+            try:
+                for name, labels, value in fn():
+                    out.setdefault(name, {})[_key(labels)] = float(value)
+            except Exception:
+                pass
+        return out
+
+    def snapshot(self) -> Dict[str, object]:
+        def _series(d):
+            return [{"labels": dict(k), "value": v} for k, v in d.items()]
+        gauges = {n: dict(s) for n, s in self.gauges.items()}
+        for n, s in self._collected().items():
+            gauges.setdefault(n, {}).update(s)
+        return {
+            "time": time.time(),
+            "counters": {n: _series(s) for n, s in self.counters.items()},
+            "gauges": {n: _series(s) for n, s in gauges.items()},
+            "histograms": {
+                n: [{"labels": dict(k), "count": h.n, "sum": h.total,
+                     "buckets": dict(zip([str(b) for b in LATENCY_BUCKETS] + ["+Inf"], h.counts))}
+                    for k, h in s.items()]
+                for n, s in self.histograms.items()
+            },
+        }
+
+    def prometheus(self) -> str:
+        lines: List[str] = []
+        for name, series in sorted(self.counters.items()):
+            lines.append(f"# TYPE {name} counter")
+            lines += [f"{name}{_fmt_labels(k)} {v:g}" for k, v in series.items()]
+        gauges = {n: dict(s) for n, s in self.gauges.items()}
+        for n, s in self._collected().items():
+            gauges.setdefault(n, {}).update(s)
+        for name, series in sorted(gauges.items()):
+            lines.append(f"# TYPE {name} gauge")
+            lines += [f"{name}{_fmt_labels(k)} {v:g}" for k, v in series.items()]
+        for name, series in sorted(self.histograms.items()):
+            lines.append(f"# TYPE {name} histogram")
+            for k, h in series.items():
+                acc = 0
+                for b, c in zip(LATENCY_BUCKETS, h.counts):
+                    acc += c
+                    lines.append(f"{name}_bucket{_fmt_labels(k, ('le', f'{b:g}'))} {acc}")
+                lines.append(f"{name}_bucket{_fmt_labels(k, ('le', '+Inf'))} {h.n}")
+                lines.append(f"{name}_sum{_fmt_labels(k)} {h.total:g}")
+                lines.append(f"{name}_count{_fmt_labels(k)} {h.n}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# atalhos usados nos caminhos quentes
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+gauge_add = REGISTRY.add
+gauge_set = REGISTRY.set
+collector = REGISTRY.collector
+
+
+@contextlib.contextmanager
+def inflight(stage: str):
+    """Conta transferências em andamento (concorrência) de uma etapa."""
+    REGISTRY.add("tc_inflight", 1, stage=stage)
+    try:
+        yield
+    finally:
+        REGISTRY.add("tc_inflight", -1, stage=stage)
+
+
+# ───────────────────── exportadores ─────────────────────
+async def _handle_http(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 5)
+        body = REGISTRY.prometheus().encode("utf-8")
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            + f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except Exception:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_prometheus(port: int, host: str = METRICS_HOST):
+    """Servidor HTTP mínimo: qualquer GET devolve o texto Prometheus."""
+    return await asyncio.start_server(_handle_http, host, port)
+
+
+def dump_json(path: Path):
+    p = Path(path)
+    tmp = p.with_suffix(p.suffix + ".tmp")
+    tmp.write_text(json.dumps(REGISTRY.snapshot(), ensure_ascii=False, indent=2), "utf-8")
+    os.replace(tmp, p)  # troca atômica: leitores nunca veem arquivo pela metade
+
+
+async def _dump_loop(path: Path, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        with contextlib.suppress(Exception):
+            dump_json(path)
+
+
+_started = False
+
+
+async def start_exporters(
+    port: Optional[int] = None,
+    json_path: Optional[str] = None,
+    interval: Optional[float] = None,
+):
+    """Liga os exportadores configurados (parâmetros ou TC_METRICS_*). Idempotente."""
+    global _started
+    if _started:
+        return
+    port = METRICS_PORT if port is None else port
+    json_path = METRICS_JSON if json_path is None else json_path
+    interval = METRICS_INTERVAL if interval is None else interval
+    if port:
+        await serve_prometheus(int(port))
+        print(f"📈 Métricas Prometheus em http://{METRICS_HOST}:{port}/metrics")
+    if json_path:
+        asyncio.ensure_future(_dump_loop(Path(json_path), float(interval)))
+        print(f"📈 Métricas JSON em {json_path} (a cada {interval:g}s)")
+    _started = bool(port or json_path)
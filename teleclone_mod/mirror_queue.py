@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fila durável (SQLite) entre a recepção de eventos e o processamento do live_mirror:
+- O handler só enfileira (src, msg_id, destino); workers fazem download/upload/envio
+- Jobs sobrevivem a reinícios; 'running' interrompidos voltam para 'pending' (recover)
+- Vários espelhos podem dividir o mesmo arquivo: consumo filtrado por chat de origem
+  e pelos destinos (chaves de rota) do próprio espelho — fan-out da mesma origem
+  não rouba nem recupera jobs do outro
+- Ordem de entrega garantida por destino (Lane): preparo em paralelo, envio em ordem
+- Catch-up: cursor por par (src, destino) = maior msg_id já visto/enfileirado
+- Falha transitória: o job volta para 'pending' com espera exponencial
+  (TC_QUEUE_RETRY_S, 2×, até 1h) até TC_QUEUE_MAX_ATTEMPTS tentativas; só então 'failed'
+- retry_failed(): jobs 'failed' voltam para a fila (ex.: na partida, TC_QUEUE_RETRY_FAILED=1)
+"""
+import asyncio
+import os
+import sqlite3
+import time
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id       INTEGER PRIMARY KEY AUTOINCREMENT,
+    src      INTEGER NOT NULL,
+    msg_id   INTEGER NOT NULL,
+    dst      TEXT    NOT NULL,
+    status   TEXT    NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error    TEXT,
+    created  REAL    NOT NULL,
+    updated  REAL    NOT NULL,
+    not_before REAL  NOT NULL DEFAULT 0,
+    UNIQUE (src, msg_id, dst)
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+CREATE TABLE IF NOT EXISTS cursors (
+    src     INTEGER NOT NULL,
+    dst     TEXT    NOT NULL,
+    last_id INTEGER NOT NULL,
+    PRIMARY KEY (src, dst)
+);
+"""
+
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+# ───────── Config por ambiente ─────────
+MAX_ATTEMPTS = max(1, int(os.getenv("TC_QUEUE_MAX_ATTEMPTS", "5")))
+RETRY_BASE = float(os.getenv("TC_QUEUE_RETRY_S", "30"))   # 1ª espera; dobra a cada tentativa
+RETRY_MAX = 3600.0
+RETRY_FAILED = os.getenv("TC_QUEUE_RETRY_FAILED", "0") == "1"
+
+
+def _scope(src: int, dsts: Optional[Iterable[str]]) -> Tuple[str, list]:
+    """Filtro SQL de um espelho: origem e, se dados, só os seus destinos."""
+    if dsts is None:
+        return "src=?", [int(src)]
+    dsts = list(dsts)
+    return f"src=? AND dst IN ({','.join('?' * len(dsts)) or 'NULL'})", [int(src), *dsts]
+
+
+class MirrorQueue:
+    """Fila persistente de jobs de espelhamento (um arquivo SQLite)."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path))
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(_SCHEMA)
+        cols = {r[1] for r in self.db.execute("PRAGMA table_info(jobs)")}
+        if "not_before" not in cols:  # arquivo criado antes da retentativa
+            self.db.execute("ALTER TABLE jobs ADD COLUMN not_before REAL NOT NULL DEFAULT 0")
+        self.db.commit()
+        self._wakeup = asyncio.Event()
+
+    def recover(self, src: int, dsts: Optional[Iterable[str]] = None) -> int:
+        """Jobs 'running' de `src` (→ `dsts`) interrompidos (processo caiu) voltam para a fila."""
+        where, args = _scope(src, dsts)
+        cur = self.db.execute(
+            f"UPDATE jobs SET status=? WHERE status=? AND {where}", (PENDING, RUNNING, *args)
+        )
+        self.db.commit()
+        return cur.rowcount
+
+    def retry_failed(self, src: int, dsts: Optional[Iterable[str]] = None) -> int:
+        """Jobs 'failed' de `src` (→ `dsts`) voltam para a fila com as tentativas zeradas."""
+        where, args = _scope(src, dsts)
+        cur = self.db.execute(
+            f"UPDATE jobs SET status=?, attempts=0, not_before=0, error=NULL WHERE status=? AND {where}",
+            (PENDING, FAILED, *args),
+        )
+        self.db.commit()
+        if cur.rowcount:
+            self._wakeup.set()
+        return cur.rowcount
+
+    def close(self):
+        self.db.close()
+
+    # ───────── intake ─────────
+    def enqueue(self, src: int, msg_id: int, dst: str) -> bool:
+        """Enfileira (idempotente). Retorna True se o job é novo."""
+        now = time.time()
+        cur = self.db.execute(
+            "INSERT OR IGNORE INTO jobs (src, msg_id, dst, created, updated) VALUES (?,?,?,?,?)",
+            (int(src), int(msg_id), dst, now, now),
+        )
+        self._advance(src, dst, msg_id)
+        self.db.commit()
+        if cur.rowcount:
+            self._wakeup.set()
+        return bool(cur.rowcount)
+
+    def _advance(self, src: int, dst: str, msg_id: int):
+        self.db.execute(
+            "INSERT INTO cursors (src, dst, last_id) VALUES (?,?,?) "
+            "ON CONFLICT (src, dst) DO UPDATE SET last_id=MAX(last_id, excluded.last_id)",
+            (int(src), dst, int(msg_id)),
+        )
+
+    def mark_seen(self, src: int, dst: str, msg_id: int):
+        """Avança o cursor sem criar job (ex.: 1ª execução começa 'de agora')."""
+        self._advance(src, dst, msg_id)
+        self.db.commit()
+
+    def last_seen(self, src: int, dst: str) -> Optional[int]:
+        """Maior msg_id já visto para o par — de onde o catch-up continua (None = nunca rodou)."""
+        row = self.db.execute(
+            "SELECT last_id FROM cursors WHERE src=? AND dst=?", (int(src), dst)
+        ).fetchone()
+        return int(row[0]) if row else None
+
+    def cursors(self, dst: str) -> Dict[int, int]:
+        """Cursores {src: last_id} de um destino (foto do estado antes de ouvir eventos)."""
+        return {int(a): int(b) for a, b in self.db.execute(
+            "SELECT src, last_id FROM cursors WHERE dst=?", (dst,)
+        )}
+
+    # ───────── consumo ─────────
+    def claim(self, limit: int, src: int,
+              dsts: Optional[Iterable[str]] = None) -> List[Tuple[int, int, int, str]]:
+        """Marca até `limit` jobs pendentes de `src` (→ `dsts`) como 'running' (em ordem de chegada)."""
+        self._wakeup.clear()  # limpa antes de ler: enqueue posterior acorda de novo
+        where, args = _scope(src, dsts)
+        rows = self.db.execute(
+            f"SELECT id, src, msg_id, dst FROM jobs WHERE status=? AND not_before<=? AND {where} "
+            "ORDER BY id LIMIT ?",
+            (PENDING, time.time(), *args, int(limit)),
+        ).fetchall()
+        if rows:
+            now = time.time()
+            self.db.executemany(
+                "UPDATE jobs SET status=?, attempts=attempts+1, updated=? WHERE id=?",
+                [(RUNNING, now, r[0]) for r in rows],
+            )
+            self.db.commit()
+        return rows
+
+    def finish(self, job_id: int, error: Optional[str] = None, *, retry: bool = True) -> bool:
+        """
+        Conclui o job. Com `error` e `retry`: volta para 'pending' depois da espera
+        exponencial enquanto houver tentativas (devolve True); senão fica 'failed'.
+        """
+        now = time.time()
+        if error and retry:
+            row = self.db.execute("SELECT attempts FROM jobs WHERE id=?", (job_id,)).fetchone()
+            attempts = int(row[0]) if row else MAX_ATTEMPTS
+            if attempts < MAX_ATTEMPTS:
+                delay = min(RETRY_MAX, RETRY_BASE * 2 ** (attempts - 1))
+                self.db.execute(
+                    "UPDATE jobs SET status=?, error=?, updated=?, not_before=? WHERE id=?",
+                    (PENDING, error, now, now + delay, job_id),
+                )
+                self.db.commit()
+                return True
+        self.db.execute(
+            "UPDATE jobs SET status=?, error=?, updated=? WHERE id=?",
+            (FAILED if error else DONE, error, now, job_id),
+        )
+        self.db.commit()
+        return False
+
+    async def wait_for_work(self, timeout: float = 5.0):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def stats(self, src: Optional[int] = None, dsts: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        out = {PENDING: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        if src is None:
+            rows = self.db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+        else:
+            where, args = _scope(src, dsts)
+            rows = self.db.execute(
+                f"SELECT status, COUNT(*) FROM jobs WHERE {where} GROUP BY status", args
+            )
+        for status, n in rows:
+            out[status] = n
+        return out
+
+
+class Lane:
+    """
+    Ordem de envio de UM destino: jobs entram na ordem de despacho
+    e cada um só envia quando todos os anteriores terminaram.
+    """
+
+    def __init__(self):
+        self._order: Deque[int] = deque()
+        self._cond = asyncio.Condition()
+
+    def admit(self, job_id: int):
+        self._order.append(job_id)
+
+    async def turn(self, job_id: int):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._order and self._order[0] == job_id)
+
+    async def release(self, job_id: int):
+        async with self._cond:
+            try:
+                self._order.remove(job_id)
+            except ValueError:
+                pass
+            self._cond.notify_all()
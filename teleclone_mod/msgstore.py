@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache local de mensagens (SQLite) com sincronização incremental:
+- Um arquivo por chat (TC_STORE_DIR/<chat_id>.sqlite); escopos por tópico (0 = chat inteiro)
+- sync(): só busca ids novos (min_id = maior id já salvo no escopo); progresso salvo
+  a cada lote, então uma sincronização interrompida continua de onde parou
+- Edições: `edits=N` revisita as N mensagens mais recentes do escopo (<0 = todas)
+- Render HTML, export e contagens do forward leem daqui: trocar de modo não
+  repagina o histórico, e regerar o chat.html pode rodar sem rede
+- Mensagens apagadas no Telegram continuam no cache (o forward/export as pula)
+- TC_MSG_STORE=0 → cache só em memória (comportamento antigo: sem arquivo)
+"""
+import asyncio
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from telethon import TelegramClient
+from telethon.tl.custom.message import Message
+
+from teleclone_mod import retry, tracing
+from teleclone_mod.records import MessageRecord, SenderNames
+
+# ───────── Config por ambiente ─────────
+STORE_ENABLED = os.getenv("TC_MSG_STORE", "1") != "0"
+STORE_DIR = Path(os.getenv("TC_STORE_DIR") or (Path(__file__).resolve().parent / "data" / "msgstore"))
+SYNC_BATCH = 500  # linhas por commit durante o sync
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id        INTEGER PRIMARY KEY,
+    ts        REAL    NOT NULL,
+    sender_id INTEGER,
+    text      TEXT    NOT NULL DEFAULT '',
+    out       INTEGER NOT NULL DEFAULT 0,
+    reply_to  INTEGER,
+    has_media INTEGER NOT NULL DEFAULT 0,
+    has_file  INTEGER NOT NULL DEFAULT 0,
+    file_name TEXT,
+    file_ext  TEXT,
+    file_size INTEGER NOT NULL DEFAULT 0,
+    edit_ts   REAL
+);
+CREATE TABLE IF NOT EXISTS scope (
+    topic  INTEGER NOT NULL,
+    msg_id INTEGER NOT NULL,
+    PRIMARY KEY (topic, msg_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sync_state (
+    topic     INTEGER PRIMARY KEY,
+    max_id    INTEGER NOT NULL,
+    synced_at REAL    NOT NULL
+);
+CREATE TABLE IF NOT EXISTS senders (
+    id    INTEGER PRIMARY KEY,
+    label TEXT NOT NULL
+);
+"""
+
+_COLS = ("id", "ts", "sender_id", "text", "out", "reply_to",
+         "has_media", "has_file", "file_name", "file_ext", "file_size")
+
+
+def _row(msg: Message) -> tuple:
+    r = MessageRecord(msg)
+    edit = getattr(msg, "edit_date", None)
+    return (r.id, r.ts, r.sender_id, r.text, int(r.out), r.reply_to, int(r.has_media),
+            int(r.has_file), r.file_name, r.file_ext, r.file_size, edit.timestamp() if edit else None)
+
+
+class MessageStore:
+    """Cache de um chat. Escopo = topic_id (0 = chat inteiro)."""
+
+    def __init__(self, path: Optional[Path]):
+        self.path = Path(path) if path else None
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path) if self.path else ":memory:")
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(_SCHEMA)
+        self.db.commit()
+        self._locks: Dict[int, asyncio.Lock] = {}
+
+    def close(self):
+        self.db.close()
+
+    # ───────── estado ─────────
+    def synced(self, topic: int = 0) -> bool:
+        return self.db.execute("SELECT 1 FROM sync_state WHERE topic=?", (int(topic),)).fetchone() is not None
+
+    def max_id(self, topic: int = 0) -> int:
+        row = self.db.execute("SELECT max_id FROM sync_state WHERE topic=?", (int(topic),)).fetchone()
+        return int(row[0]) if row else 0
+
+    # ───────── escrita ─────────
+    def _save(self, topic: int, rows: List[tuple], senders: Dict[int, str], max_id: Optional[int]):
+        with self.db:  # uma transação por lote
+            self.db.executemany(
+                f"INSERT OR REPLACE INTO messages ({', '.join(_COLS)}, edit_ts) "
+                f"VALUES ({', '.join('?' * (len(_COLS) + 1))})", rows,
+            )
+            self.db.executemany(
+                "INSERT OR IGNORE INTO scope (topic, msg_id) VALUES (?,?)", [(topic, r[0]) for r in rows]
+            )
+            if senders:
+                self.db.executemany("INSERT OR REPLACE INTO senders (id, label) VALUES (?,?)", senders.items())
+            if max_id is not None:
+                self.db.execute(
+                    "INSERT INTO sync_state (topic, max_id, synced_at) VALUES (?,?,?) "
+                    "ON CONFLICT(topic) DO UPDATE SET max_id=MAX(max_id, excluded.max_id), "
+                    "synced_at=excluded.synced_at",
+                    (topic, max_id, time.time()),
+                )
+
+    async def _ingest(self, topic: int, it, *, advance: bool) -> int:
+        names = SenderNames()
+        rows: List[tuple] = []
+        n = 0
+        async for m in it:
+            # mensagens de serviço ficam: a numeração do export (001_, 002_…) conta todas
+            rows.append(_row(m))
+            names.learn(m)
+            if len(rows) >= SYNC_BATCH:
+                self._save(topic, rows, names.pop_new(), rows[-1][0] if advance else None)
+                n += len(rows)
+                rows = []
+        self._save(topic, rows, names.pop_new(), (rows[-1][0] if rows else None) if advance else None)
+        return n + len(rows)
+
+    async def sync(self, client: TelegramClient, chat, topic: Optional[int] = 0, *, edits: int = 0) -> int:
+        """Baixa do Telegram só o que falta no escopo. Retorna quantas mensagens novas."""
+        topic = int(topic or 0)
+        lock = self._locks.setdefault(topic, asyncio.Lock())
+        async with lock:
+            kw = {"reply_to": topic} if topic else {}
+            n = await self._ingest(topic, tracing.traced_aiter(
+                client.iter_messages(chat, reverse=True, min_id=self.max_id(topic), **kw), "iter_messages"
+            ), advance=True)
+            if not self.synced(topic):
+                # escopo vazio: marca como sincronizado mesmo assim
+                self._save(topic, [], {}, 0)
+            if edits:
+                limit = None if edits < 0 else int(edits)
+                await self._ingest(topic, tracing.traced_aiter(
+                    client.iter_messages(chat, limit=limit, **kw), "iter_messages(edits)"
+                ), advance=False)
+            return n
+
+    # ───────── leitura ─────────
+    def _where(self, topic: int, min_id: int, nonempty: bool, strip_caption: bool):
+        sql = "FROM scope s JOIN messages m ON m.id = s.msg_id WHERE s.topic=? AND s.msg_id > ?"
+        args: list = [int(topic or 0), int(min_id or 0)]
+        if nonempty:
+            # mesmo critério do forward: mídia, ou texto quando a legenda é mantida
+            sql += " AND (m.has_media = 1 OR (? = 0 AND m.text != ''))"
+            args.append(int(strip_caption))
+        return sql, args
+
+    def count(self, topic: int = 0, *, min_id: int = 0, nonempty: bool = False, strip_caption: bool = False) -> int:
+        sql, args = self._where(topic, min_id, nonempty, strip_caption)
+        return int(self.db.execute(f"SELECT COUNT(*) {sql}", args).fetchone()[0])
+
+    def records(self, topic: int = 0, *, min_id: int = 0) -> Iterator[MessageRecord]:
+        """Registros do escopo em ordem de id (cursor: não carrega tudo de uma vez)."""
+        sql, args = self._where(topic, min_id, False, False)
+        cols = ", ".join(f"m.{c}" for c in _COLS)
+        for row in self.db.execute(f"SELECT {cols} {sql} ORDER BY s.msg_id", args):
+            yield MessageRecord.from_row(row)
+
+    def ids(self, topic: int = 0, *, after: int = 0, limit: int = 100,
+            nonempty: bool = False, strip_caption: bool = False) -> List[int]:
+        """Próximos `limit` ids depois de `after` (paginação por chave)."""
+        sql, args = self._where(topic, after, nonempty, strip_caption)
+        return [r[0] for r in self.db.execute(f"SELECT s.msg_id {sql} ORDER BY s.msg_id LIMIT ?", args + [limit])]
+
+    def sender_names(self) -> SenderNames:
+        return SenderNames(dict(self.db.execute("SELECT id, label FROM senders")))
+
+
+# ───────────────────── um store por chat (processo inteiro) ─────────────────────
+_STORES: Dict[int, MessageStore] = {}
+
+
+def store_for(chat) -> MessageStore:
+    """Store do chat (aberto uma vez). `chat` = entidade com .id ou o próprio id."""
+    cid = int(getattr(chat, "id", chat))
+    st = _STORES.get(cid)
+    if st is None:
+        st = _STORES[cid] = MessageStore(STORE_DIR / f"{cid}.sqlite" if STORE_ENABLED else None)
+    return st
+
+
+async def stored_messages(client: TelegramClient, chat, store: MessageStore, topic: int = 0, *,
+                          min_id: int = 0, nonempty: bool = False, strip_caption: bool = False,
+                          batch: int = 100):
+    """
+    Mensagens completas (com mídia) na ordem do cache, recarregadas em lotes de `batch`
+    ids por get_messages. Apagadas no Telegram vêm como None (o chamador conta/pula).
+    """
+    after = int(min_id or 0)
+    while True:
+        ids = store.ids(topic, after=after, limit=batch, nonempty=nonempty, strip_caption=strip_caption)
+        if not ids:
+            return
+        msgs = await retry.run(lambda: client.get_messages(chat, ids=ids), client=client, name="get_messages")
+        for m in msgs:
+            yield m
+        after = ids[-1]
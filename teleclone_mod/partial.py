@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Download retomável por faixa de bytes (export_topic):
+- Grava em <arquivo>.part; o nome final só aparece no rename atômico (os.replace)
+  depois de conferir o tamanho com msg.file.size
+- <arquivo>.part.json identifica o documento (id + tamanho); o progresso é o próprio
+  tamanho do .part (gravação sequencial, flush a cada pedaço)
+- Retomada: continua do último offset alinhado (múltiplo de 512KB, exigência do
+  upload.getFile) com iter_download(offset=…); .part de outro documento é descartado
+- Documentos pequenos (< TC_RESUME_MIN_MB) e fotos: download_media direto no .part
+  (recomeçar custa pouco), mas com o mesmo rename atômico
+- Cada pedaço recebido passa pelo limite de banda de download (shaper.py)
+"""
+import json
+import os
+from pathlib import Path
+from typing import Callable, Optional
+
+from telethon.tl.custom.message import Message
+
+from teleclone_mod import shaper
+
+# ───────── Config por ambiente ─────────
+ALIGN = 512 * 1024  # offset e tamanho de pedido do iter_download
+RESUME_MIN = int(float(os.getenv("TC_RESUME_MIN_MB", "8")) * 1024 * 1024)
+
+
+class SizeMismatch(RuntimeError):
+    """O arquivo baixado não tem o tamanho anunciado (o .part é descartado)."""
+
+
+def _paths(dest: Path):
+    dest = Path(dest)
+    return dest.with_name(dest.name + ".part"), dest.with_name(dest.name + ".part.json")
+
+
+def _identity(msg: Message) -> Optional[dict]:
+    doc = getattr(msg, "document", None)
+    size = int(getattr(getattr(msg, "file", None), "size", 0) or 0)
+    if doc is None or size < RESUME_MIN:
+        return None
+    return {"id": doc.id, "size": size}
+
+
+def resume_offset(msg: Message, dest: Path) -> int:
+    """Quantos bytes de `dest` já estão no .part e valem para `msg` (0 = do começo)."""
+    ident = _identity(msg)
+    part, meta = _paths(dest)
+    if ident is None or not part.exists() or not meta.exists():
+        return 0
+    try:
+        if json.loads(meta.read_text("utf-8")) != ident:
+            return 0
+    except (OSError, ValueError):
+        return 0
+    return min(part.stat().st_size, ident["size"]) // ALIGN * ALIGN
+
+
+def _discard(*paths: Path):
+    for p in paths:
+        try:
+            p.unlink()
+        except FileNotFoundError:
+            pass
+
+
+async def download(msg: Message, dest: Path, *,
+                   progress_callback: Optional[Callable[[int, int], None]] = None) -> Path:
+    """Baixa `msg` em `dest` (retomando um .part compatível). Pode ser repetido pelo retry."""
+    dest = Path(dest)
+    part, meta = _paths(dest)
+    ident = _identity(msg)
+    expected = int(getattr(getattr(msg, "file", None), "size", 0) or 0)
+
+    if ident is None:
+        # pequeno/foto: inteiro no .part, rename no fim
+        got = await msg.download_media(file=str(part), progress_callback=shaper.DOWN.meter(progress_callback))
+        if not got:
+            raise FileNotFoundError(f"sem mídia para baixar ({dest.name})")
+        size = part.stat().st_size
+        if getattr(msg, "document", None) is not None and expected and size != expected:
+            _discard(part)
+            raise SizeMismatch(f"{dest.name}: {size} de {expected} bytes")
+        os.replace(part, dest)
+        return dest
+
+    offset = resume_offset(msg, dest)
+    if not offset:
+        _discard(part)
+        meta.write_text(json.dumps(ident), "utf-8")
+    with open(part, "r+b" if offset else "wb") as fh:
+        fh.truncate(offset)  # pedaço incompleto depois do último alinhamento
+        fh.seek(offset)
+        async for chunk in msg.client.iter_download(
+            msg.media, offset=offset, request_size=ALIGN, file_size=expected
+        ):
+            fh.write(chunk)
+            fh.flush()
+            offset += len(chunk)
+            if progress_callback:
+                progress_callback(offset, expected)
+            await shaper.DOWN.take(len(chunk))
+
+    if offset != expected:
+        if offset > expected:
+            _discard(part, meta)  # conteúdo não confere: recomeça na próxima vez
+        raise SizeMismatch(f"{dest.name}: {offset} de {expected} bytes")
+    os.replace(part, dest)
+    _discard(meta)
+    return dest
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Upload com várias partes em voo (substitui client.upload_file nos caminhos de envio):
+- TC_UPLOAD_PARTS pedidos SaveBigFilePart/SaveFilePart simultâneos (padrão 4); cada
+  parte tem a própria retentativa (retry.py), uma falha não refaz as outras
+- Leitura sem buffer intermediário: fatias memoryview de um mmap do arquivo (caminho,
+  TemporaryFile, spool já em disco, entrada do export.tar) ou do buffer em RAM do
+  SpooledTemporaryFile (md5 e tamanho também saem das views)
+- Não é zero-copy até o fio: o serializador do Telethon (TLObject.serialize_bytes)
+  só aceita `bytes`, então cada parte vira `bytes` (≤ 512KB) na hora de montar o
+  pedido, depois da espera do limite de banda; nada além das partes em voo fica em RAM
+- Stream sem arquivo por trás: seek/read por parte (fallback)
+- Até 10MB: SaveFilePart + md5 (InputSizedFile); acima: SaveBigFilePart (InputFileBig)
+- `file_id`/`skip`/`on_part`: retomada e registro de partes pelo diário (upjournal.py)
+- Cada parte passa pelo limite de banda de upload (shaper.py) antes de sair
+"""
+import asyncio
+import hashlib
+import io
+import mmap
+import os
+from typing import Callable, Iterable, Optional
+
+from telethon import TelegramClient, helpers
+from telethon.tl import functions, types
+from telethon.tl.custom import InputSizedFile
+
+from teleclone_mod import retry, shaper
+
+# ───────── Config por ambiente ─────────
+UPLOAD_PARTS = max(1, int(os.getenv("TC_UPLOAD_PARTS", "4")))  # partes em voo por arquivo
+PART_SIZE = 512 * 1024                                         # máximo aceito pelo Telegram
+BIG_FILE = 10 * 1024 * 1024                                    # acima disso: SaveBigFilePart
+
+
+def stream_size(f) -> int:
+    """Tamanho de um arquivo aberto, sem mexer na posição."""
+    pos = f.tell()
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    f.seek(pos)
+    return size
+
+
+class _Source:
+    """Partes de um arquivo/stream como memoryview (mmap/buffer) ou, em último caso, read()."""
+
+    def __init__(self, fobj):
+        self._own = None
+        self._mm: Optional[mmap.mmap] = None
+        self._buf: Optional[memoryview] = None
+        self.view: Optional[memoryview] = None
+        self._f = fobj
+
+        if isinstance(fobj, (str, os.PathLike)):
+            self._f = self._own = open(fobj, "rb")
+        f = self._f
+
+        region = getattr(f, "mmap_region", None)
+        if callable(region):  # entrada do export.tar: janela dentro do .tar
+            fd, start, size = region()
+            self._map(fd)
+            self.view = self._mm_view()[start:start + size] if self._mm is not None else None
+        elif isinstance(getattr(f, "_file", None), io.BytesIO) and not getattr(f, "_rolled", True):
+            self._buf = f._file.getbuffer()  # SpooledTemporaryFile ainda em RAM (fileno() forçaria o disco)
+            self.view = self._buf
+        elif isinstance(f, io.BytesIO):
+            self._buf = f.getbuffer()
+            self.view = self._buf
+        else:
+            try:
+                f.flush()
+                self._map(f.fileno())
+            except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+                pass
+            if self._mm is not None:
+                self.view = self._mm_view()
+
+        self.size = len(self.view) if self.view is not None else stream_size(f)
+
+    def _map(self, fd: int):
+        if os.fstat(fd).st_size > 0:
+            self._mm = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+
+    def _mm_view(self) -> memoryview:
+        self._buf = memoryview(self._mm)
+        return self._buf
+
+    def part(self, index: int, part_size: int):
+        lo = index * part_size
+        if self.view is not None:
+            return self.view[lo:lo + part_size]
+        self._f.seek(lo)
+        return self._f.read(part_size)
+
+    def close(self):
+        # soltar as views antes do mmap/buffer (senão BufferError)
+        self.view = None
+        if self._buf is not None:
+            self._buf.release()
+            self._buf = None
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._own is not None:
+            self._own.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+async def upload(
+    client: TelegramClient,
+    fobj,
+    file_name: str,
+    *,
+    part_size: int = PART_SIZE,
+    workers: Optional[int] = None,
+    file_id: Optional[int] = None,
+    skip: Iterable[int] = (),
+    on_part: Optional[Callable[[int], None]] = None,
+):
+    """
+    Sobe `fobj` (caminho ou arquivo) e devolve o handle para send_file.
+    `skip`: partes já confirmadas (mesmo `file_id`); `on_part(i)`: a cada parte aceita.
+    """
+    with _Source(fobj) as src:
+        size = src.size
+        parts = max(1, -(-size // part_size))
+        big = size > BIG_FILE
+        file_id = file_id or helpers.generate_random_long()
+        md5 = None
+        if not big:
+            md5 = hashlib.md5()  # Telegram confere o md5 só nos arquivos pequenos
+            for i in range(parts):
+                md5.update(src.part(i, part_size))
+
+        done = set(skip)
+        todo = iter([i for i in range(parts) if i not in done])
+
+        async def _worker():
+            for i in todo:  # iterador compartilhado: cada parte sai para um worker só
+                # nenhuma view guardada durante o await (traceback de falha prenderia o mmap)
+                await shaper.UP.take(min(part_size, size - i * part_size))
+                data = bytes(src.part(i, part_size))  # serialize_bytes do Telethon exige bytes
+                if big:
+                    req = functions.upload.SaveBigFilePartRequest(file_id, i, parts, data)
+                else:
+                    req = functions.upload.SaveFilePartRequest(file_id, i, data)
+                ok = await retry.run(lambda: client(req), client=client, name="upload_part")
+                if not ok:
+                    raise RuntimeError(f"parte {i} recusada")
+                if on_part:
+                    on_part(i)
+
+        tasks = [asyncio.ensure_future(_worker())
+                 for _ in range(min(workers or UPLOAD_PARTS, max(1, parts - len(done))))]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    if big:
+        return types.InputFileBig(file_id, parts, file_name)
+    return InputSizedFile(file_id, parts, file_name, md5=md5, size=size)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Registro compacto de mensagem para varreduras longas (export/HTML):
+- Só o que o exportador usa: id, data, remetente, texto, out, reply_to e nome/ext/tamanho do arquivo
+- Também é a linha do cache local (msgstore.py): from_row() reconstrói sem o Message
+- __slots__ e data como timestamp: ~200 bytes + texto, contra vários KB de um Message
+  com os objetos TL crus (mídia, entidades, cabeçalhos…)
+- Nomes de remetente resolvidos uma vez por usuário (SenderNames), sem RPC por mensagem
+- A mídia NÃO é guardada: recarregue a mensagem pelo id na hora do download (get_messages em lote)
+"""
+from datetime import datetime, timezone
+from typing import Dict, Optional, Sequence
+
+from telethon import TelegramClient
+from telethon.tl.custom.message import Message
+
+
+def sender_label(sender) -> str:
+    """'Nome Sobrenome', senão @username, senão '?' (mesma regra do chat.html)."""
+    if sender is None:
+        return "?"
+    full = f"{getattr(sender, 'first_name', '') or ''} {getattr(sender, 'last_name', '') or ''}".strip()
+    return full or getattr(sender, "username", None) or getattr(sender, "title", None) or "?"
+
+
+class MessageRecord:
+    __slots__ = ("id", "ts", "sender_id", "text", "out", "reply_to",
+                 "has_media", "has_file", "file_name", "file_ext", "file_size")
+
+    def __init__(self, msg: Message):
+        f = msg.file
+        rt = getattr(msg, "reply_to", None)
+        self.id: int = msg.id
+        self.ts: float = msg.date.timestamp() if msg.date else 0.0
+        self.sender_id: Optional[int] = msg.sender_id
+        self.text: str = msg.text or ""
+        self.out: bool = bool(msg.out)
+        self.reply_to: Optional[int] = getattr(rt, "reply_to_msg_id", None)
+        self.has_media: bool = bool(getattr(msg, "media", None))
+        self.has_file: bool = f is not None
+        self.file_name: Optional[str] = f.name if f is not None else None
+        self.file_ext: Optional[str] = f.ext if f is not None else None
+        self.file_size: int = int((f.size if f is not None else 0) or 0)
+
+    @classmethod
+    def from_row(cls, row: Sequence) -> "MessageRecord":
+        """Linha do msgstore, na ordem de __slots__."""
+        rec = cls.__new__(cls)
+        (rec.id, rec.ts, rec.sender_id, rec.text, out, rec.reply_to,
+         has_media, has_file, rec.file_name, rec.file_ext, rec.file_size) = row
+        rec.out, rec.has_media, rec.has_file = bool(out), bool(has_media), bool(has_file)
+        return rec
+
+    @property
+    def date(self) -> datetime:
+        return datetime.fromtimestamp(self.ts, timezone.utc)
+
+    def __repr__(self):
+        return f"MessageRecord(id={self.id}, file={self.file_name!r}, size={self.file_size})"
+
+
+class SenderNames:
+    """id do remetente → rótulo; preenchido pelas entidades que já vêm na página."""
+
+    def __init__(self, known: Optional[Dict[Optional[int], str]] = None):
+        self._names: Dict[Optional[int], str] = dict(known or {})
+        self._new: Dict[int, str] = {}
+
+    def learn(self, msg: Message):
+        sid = msg.sender_id
+        if sid not in self._names and msg.sender is not None:
+            self._names[sid] = self._new[sid] = sender_label(msg.sender)
+
+    def pop_new(self) -> Dict[int, str]:
+        """Nomes aprendidos desde a última chamada (para persistir)."""
+        new, self._new = self._new, {}
+        return new
+
+    async def get(self, client: TelegramClient, sender_id: Optional[int]) -> str:
+        name = self._names.get(sender_id)
+        if name is None:
+            try:
+                name = sender_label(await client.get_entity(sender_id)) if sender_id else "?"
+            except Exception:
+                name = "?"
+            self._names[sender_id] = name
+        return name
+
+
+def compact(msg: Message, names: Optional[SenderNames] = None) -> MessageRecord:
+    """Converte durante a iteração; o Message pode ser descartado logo em seguida."""
+    if names is not None:
+        names.learn(msg)
+    return MessageRecord(msg)
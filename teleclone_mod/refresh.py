@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Renovação de file_reference em lote:
+- Junta os ids de mensagens com referência expirada que chegam juntos (janela curta)
+- Um único get_messages(chat, ids=[...]) para até 100 ids por chamada
+- Cache curto das mensagens recém-obtidas (referência fresca) para evitar novo RPC
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from telethon import TelegramClient
+from telethon.tl.custom.message import Message
+
+# ───────── Config por ambiente ─────────
+BATCH_MAX = 100                                                    # limite do Telegram por chamada
+BATCH_WINDOW = float(os.getenv("TC_REFRESH_WINDOW_MS", "50")) / 1000  # janela de coalescência
+CACHE_TTL = float(os.getenv("TC_REFRESH_TTL", "300"))              # segundos
+CACHE_MAX = 5000
+
+
+def _chat_key(chat) -> Any:
+    if isinstance(chat, int):
+        return chat
+    return getattr(chat, "id", None) or id(chat)
+
+
+class RefRefresher:
+    """
+    `await refresh(chat, msg_id)` devolve a mensagem recarregada (ou None se sumiu).
+    Pedidos do mesmo chat dentro da janela são agrupados em lotes de até 100 ids.
+    """
+
+    def __init__(self, client: TelegramClient):
+        self.client = client
+        self._pending: Dict[Any, Dict[int, asyncio.Future]] = {}
+        self._chats: Dict[Any, Any] = {}
+        self._timers: Dict[Any, asyncio.Task] = {}
+        self._flushing: Set[asyncio.Task] = set()  # o loop só guarda referência fraca
+        self._cache: "OrderedDict[Tuple[Any, int], Tuple[float, Optional[Message]]]" = OrderedDict()
+        self.calls = 0       # RPCs get_messages feitos
+        self.requested = 0   # pedidos de renovação recebidos
+        self.cache_hits = 0
+
+    # ───────── cache ─────────
+    def _cache_get(self, key: Tuple[Any, int]):
+        hit = self._cache.get(key)
+        if hit and time.monotonic() - hit[0] < CACHE_TTL:
+            self._cache.move_to_end(key)
+            return hit
+        if hit:
+            self._cache.pop(key, None)
+        return None
+
+    def _cache_put(self, key: Tuple[Any, int], msg: Optional[Message]):
+        self._cache[key] = (time.monotonic(), msg)
+        self._cache.move_to_end(key)
+        while len(self._cache) > CACHE_MAX:
+            self._cache.popitem(last=False)
+
+    def invalidate(self, chat, msg_id: int):
+        """Descarta a entrada em cache (ex.: a referência 'fresca' expirou de novo)."""
+        self._cache.pop((_chat_key(chat), int(msg_id)), None)
+
+    # ───────── API ─────────
+    async def refresh(self, chat, msg_id: int) -> Optional[Message]:
+        self.requested += 1
+        ck = _chat_key(chat)
+        key = (ck, int(msg_id))
+        hit = self._cache_get(key)
+        if hit:
+            self.cache_hits += 1
+            return hit[1]
+
+        pend = self._pending.setdefault(ck, {})
+        self._chats[ck] = chat
+        fut = pend.get(key[1])
+        if fut is None:
+            fut = pend[key[1]] = asyncio.get_running_loop().create_future()
+            if len(pend) >= BATCH_MAX:
+                self._flush_now(ck)
+            elif ck not in self._timers:
+                self._timers[ck] = asyncio.create_task(self._flush_later(ck))
+        return await asyncio.shield(fut)
+
+    async def _flush_later(self, ck):
+        await asyncio.sleep(BATCH_WINDOW)
+        self._timers.pop(ck, None)
+        await self._flush(ck)
+
+    def _flush_now(self, ck):
+        t = self._timers.pop(ck, None)
+        if t:
+            t.cancel()
+        t = asyncio.create_task(self._flush(ck))
+        self._flushing.add(t)
+        t.add_done_callback(self._flushing.discard)
+
+    async def _flush(self, ck):
+        pend = self._pending.pop(ck, {})
+        if not pend:
+            return
+        chat = self._chats.get(ck, ck)
+        ids: List[int] = list(pend)
+        for i in range(0, len(ids), BATCH_MAX):
+            chunk = ids[i:i + BATCH_MAX]
+            try:
+                self.calls += 1
+                res = await self.client.get_messages(chat, ids=chunk)
+            except Exception as e:
+                for mid in chunk:
+                    fut = pend[mid]
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            # get_messages(ids=[...]) devolve na mesma ordem, com None p/ apagadas
+            for mid, m in zip(chunk, res or []):
+                self._cache_put((ck, mid), m)
+                fut = pend[mid]
+                if not fut.done():
+                    fut.set_result(m)
+            for mid in chunk:
+                fut = pend[mid]
+                if not fut.done():
+                    fut.set_result(None)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "requested": self.requested,
+            "rpc_calls": self.calls,
+            "cache_hits": self.cache_hits,
+            "cached": len(self._cache),
+        }
+
+
+# ───────────────────── um refresher por cliente ─────────────────────
+_REFRESHERS: Dict[int, RefRefresher] = {}
+
+
+def refresher_for(client: TelegramClient) -> RefRefresher:
+    r = _REFRESHERS.get(id(client))
+    if r is None:
+        r = _REFRESHERS[id(client)] = RefRefresher(client)
+    return r
+
+
+async def refetch_message(client: TelegramClient, chat, msg: Message) -> Message:
+    """
+    Recarrega `msg` (em lote) para renovar o file_reference.
+    Se a mensagem sumiu no servidor, devolve a original (o download falhará de forma clara).
+    """
+    r = refresher_for(client)
+    fresh = await r.refresh(chat, msg.id)
+    if fresh is msg:
+        # a cópia "fresca" do cache também expirou: força novo lote
+        r.invalidate(chat, msg.id)
+        fresh = await r.refresh(chat, msg.id)
+    return fresh or msg
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Relay sem spool (download → upload em streaming):
+- Os chunks de iter_download viram partes de upload (SaveFilePart/SaveBigFilePart)
+- Buffer circular pequeno e limitado (TC_RELAY_PARTS partes de 512KB) entre as duas pontas
+- Download e upload andam em paralelo; memória por arquivo = poucos MB, sem arquivo temporário
+- Até TC_UPLOAD_PARTS partes sobem ao mesmo tempo (parupload.py), cada uma com retentativa própria
+- Limite de banda (shaper.py) cobrado por chunk baixado e por parte enviada
+- Com `key` (upjournal.doc_key) e > 10MB: partes no diário de upload; depois de uma
+  queda o mesmo file_id continua e o download recomeça na primeira parte não confirmada
+- Qualquer falha levanta exceção: quem chama volta para o caminho com SpooledTemporaryFile
+"""
+import asyncio
+import hashlib
+import os
+from typing import Optional
+
+from telethon import TelegramClient, helpers
+from telethon.tl import functions, types
+from telethon.tl.custom import InputSizedFile
+from telethon.tl.custom.message import Message
+
+from teleclone_mod import metrics, retry, shaper, upjournal
+from teleclone_mod.parupload import UPLOAD_PARTS
+
+# ───────── Config por ambiente ─────────
+RELAY_ENABLED = os.getenv("TC_RELAY", "1") != "0"
+RELAY_PARTS = max(1, int(os.getenv("TC_RELAY_PARTS", "4")))  # partes no buffer (4×512KB = 2MB)
+PART_SIZE = 512 * 1024                                        # máximo aceito pelo Telegram
+BIG_FILE = 10 * 1024 * 1024                                   # acima disso: SaveBigFilePart
+
+_EOF = object()
+
+
+class RelayError(RuntimeError):
+    """O relay não pôde ser concluído (use o spool como fallback)."""
+
+
+def can_relay(msg: Message) -> bool:
+    """Somente documentos com tamanho conhecido (fotos são pequenas: spool resolve)."""
+    doc = getattr(getattr(msg, "media", None), "document", None)
+    size = getattr(getattr(msg, "file", None), "size", None)
+    return RELAY_ENABLED and doc is not None and bool(size)
+
+
+async def relay_upload(
+    client: TelegramClient,
+    msg: Message,
+    filename: str,
+    *,
+    ring_parts: Optional[int] = None,
+    key: Optional[str] = None,
+):
+    """
+    Faz download e upload simultâneos de `msg` e devolve o handle
+    (InputFileBig ou InputSizedFile) pronto para send_file.
+    `key`: chave no diário de upload (upjournal.py), só para arquivos grandes.
+    """
+    size = int(msg.file.size)
+    part_count = (size + PART_SIZE - 1) // PART_SIZE
+    is_big = size > BIG_FILE
+    start, on_part = 0, None
+    if is_big and key and upjournal.ENABLED:
+        file_id, start, on_part = upjournal.resume(key, size, filename)
+    else:
+        file_id = helpers.generate_random_long()
+    md5 = hashlib.md5()
+    ring: asyncio.Queue = asyncio.Queue(maxsize=ring_parts or RELAY_PARTS)
+
+    async def _producer():
+        """Lê do Telegram e corta em partes exatas de PART_SIZE (última pode ser menor)."""
+        buf = bytearray()
+        try:
+            async for chunk in client.iter_download(
+                msg.media, offset=start * PART_SIZE, request_size=PART_SIZE, file_size=size
+            ):
+                buf += chunk
+                metrics.inc("tc_bytes_downloaded_total", len(chunk), path="relay")
+                await shaper.DOWN.take(len(chunk))
+                while len(buf) >= PART_SIZE:
+                    await ring.put(bytes(buf[:PART_SIZE]))
+                    del buf[:PART_SIZE]
+            if buf:
+                await ring.put(bytes(buf))
+            await ring.put(_EOF)
+        except Exception as e:
+            await ring.put(e)
+
+    async def _send_part(index: int, part: bytes):
+        if is_big:
+            req = functions.upload.SaveBigFilePartRequest(file_id, index, part_count, part)
+        else:
+            req = functions.upload.SaveFilePartRequest(file_id, index, part)
+        await shaper.UP.take(len(part))
+        ok = await retry.run(lambda: client(req), client=client, name="relay_part")
+        if not ok:
+            raise RelayError(f"parte {index} recusada")
+        metrics.inc("tc_bytes_uploaded_total", len(part), path="relay")
+        if on_part:
+            on_part(index)
+
+    producer = asyncio.create_task(_producer())
+    inflight: set = set()
+    sent = start * PART_SIZE
+    try:
+        for index in range(start, part_count):
+            part = await ring.get()
+            if part is _EOF:
+                raise RelayError(f"download terminou cedo ({sent}/{size} bytes)")
+            if isinstance(part, BaseException):
+                raise part
+            if not is_big:
+                md5.update(part)  # Telegram só exige MD5 para arquivos pequenos (em ordem)
+            if len(inflight) >= UPLOAD_PARTS:
+                done, inflight = await asyncio.wait(inflight, return_when=asyncio.FIRST_COMPLETED)
+                for t in done:
+                    t.result()  # propaga a falha de uma parte
+            inflight.add(asyncio.ensure_future(_send_part(index, part)))
+            sent += len(part)
+        if inflight:
+            await asyncio.gather(*inflight)
+
+        tail = await ring.get()
+        if isinstance(tail, BaseException):
+            raise tail
+        if tail is not _EOF or sent != size:
+            raise RelayError(f"tamanho divergente ({sent}/{size} bytes)")
+    finally:
+        for t in inflight:
+            t.cancel()
+        await asyncio.gather(*inflight, return_exceptions=True)
+        if not producer.done():
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+
+    if is_big:
+        return types.InputFileBig(file_id, part_count, filename)
+    return InputSizedFile(file_id, part_count, filename, md5=md5, size=size)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Política única de retentativas para as transferências:
+- Classificação por erro: FloodWait, FileReferenceExpired, rede transitória, permanente
+- Backoff exponencial com jitter (apenas para erros transitórios)
+- FloodWait vai para o portão global (flood.py), sem consumir backoff
+- Orçamento de retentativas por classe de erro
+- Contadores de retentativas/falhas por operação (retry_stats)
+"""
+import asyncio
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from telethon import TelegramClient
+from telethon.errors import (
+    FileReferenceExpiredError,
+    FloodWaitError,
+    RPCError,
+    ServerError,
+    TimedOutError,
+)
+from telethon.errors.rpcerrorlist import FilePartsInvalidError, RpcCallFailError
+
+from teleclone_mod import metrics
+from teleclone_mod.flood import gate_for
+
+# ───────── classes de erro ─────────
+FLOOD = "flood"
+FILE_REF = "file_ref"
+TRANSIENT = "transient"
+PERMANENT = "permanent"
+
+# erros de RPC que costumam passar sozinhos
+_TRANSIENT_RPC = (ServerError, TimedOutError, RpcCallFailError, FilePartsInvalidError)
+
+
+def classify(exc: BaseException) -> str:
+    """Mapeia uma exceção para FLOOD / FILE_REF / TRANSIENT / PERMANENT."""
+    if isinstance(exc, FloodWaitError):
+        return FLOOD
+    if isinstance(exc, FileReferenceExpiredError):
+        return FILE_REF
+    if isinstance(exc, _TRANSIENT_RPC):
+        return TRANSIENT
+    if isinstance(exc, RPCError):
+        return PERMANENT  # 400/403 etc.: repetir não resolve
+    if isinstance(exc, (FileNotFoundError, PermissionError, IsADirectoryError)):
+        return PERMANENT  # erro local de arquivo
+    if isinstance(exc, (ConnectionError, asyncio.TimeoutError, TimeoutError, OSError)):
+        return TRANSIENT
+    return PERMANENT
+
+
+class RetryPolicy:
+    """
+    Parâmetros de backoff e orçamento.
+    budget: máximo de retentativas por classe (None = ilimitado; FLOOD é ilimitado por padrão).
+    """
+
+    def __init__(
+        self,
+        *,
+        base: float = 1.0,
+        factor: float = 2.0,
+        cap: float = 60.0,
+        jitter: float = 0.5,
+        transient: Optional[int] = 5,
+        file_ref: Optional[int] = 3,
+        flood: Optional[int] = None,
+    ):
+        self.base = base
+        self.factor = factor
+        self.cap = cap
+        self.jitter = jitter
+        self.budget = {TRANSIENT: transient, FILE_REF: file_ref, FLOOD: flood, PERMANENT: 0}
+
+    def delay(self, attempt: int) -> float:
+        """Atraso da n-ésima retentativa (1, 2, 3…): exponencial com jitter proporcional."""
+        d = min(self.cap, self.base * (self.factor ** max(0, attempt - 1)))
+        return d * (1 + random.uniform(-self.jitter, self.jitter)) if self.jitter else d
+
+
+# ───────── config por ambiente ─────────
+DEFAULT_POLICY = RetryPolicy(
+    base=float(os.getenv("TC_RETRY_BASE", "1.0")),
+    cap=float(os.getenv("TC_RETRY_CAP", "60")),
+    transient=int(os.getenv("TC_RETRY_ATTEMPTS", "5")),
+)
+
+# ───────── contadores ─────────
+_COUNTERS: Dict[str, Dict[str, int]] = {}
+
+
+def _count(name: str, key: str):
+    c = _COUNTERS.setdefault(name, {})
+    c[key] = c.get(key, 0) + 1
+    metrics.inc("tc_retries_total", op=name, kind=key)
+
+
+def retry_stats() -> Dict[str, Dict[str, int]]:
+    """Retentativas por operação e classe (ex.: {'download': {'transient': 3, 'failed': 1}})."""
+    return {k: dict(v) for k, v in _COUNTERS.items()}
+
+
+def print_retry_summary():
+    st = retry_stats()
+    if st:
+        parts = [f"{name}: " + ", ".join(f"{k}={v}" for k, v in sorted(c.items())) for name, c in sorted(st.items())]
+        print("🔁 Retentativas — " + " | ".join(parts))
+
+
+async def run(
+    op: Callable[[], Awaitable[Any]],
+    *,
+    client: Optional[TelegramClient] = None,
+    policy: Optional[RetryPolicy] = None,
+    name: str = "op",
+    on_retry: Optional[Callable[[BaseException, str], Any]] = None,
+) -> Any:
+    """
+    Executa `op()` (fábrica de corrotina) aplicando a política.
+    - FLOOD: fecha o portão global do `client` e repete após o prazo
+    - FILE_REF / TRANSIENT: chama `on_retry(exc, kind)` (pode ser async; serve p/
+      recapturar mensagem, rebobinar arquivo etc.) e repete
+    - PERMANENT ou orçamento esgotado: propaga a exceção
+    """
+    policy = policy or DEFAULT_POLICY
+    used: Dict[str, int] = {}
+    while True:
+        if client is not None:
+            await gate_for(client).wait()
+        t0 = time.perf_counter()
+        try:
+            res = await op()
+            metrics.observe("tc_rpc_seconds", time.perf_counter() - t0, rpc=name)
+            return res
+        except Exception as e:
+            metrics.observe("tc_rpc_seconds", time.perf_counter() - t0, rpc=name)
+            kind = classify(e)
+            n = used.get(kind, 0) + 1
+            limit = policy.budget.get(kind)
+            if kind == FLOOD and client is None:
+                limit = limit if limit is not None else 0
+            if limit is not None and n > limit:
+                _count(name, "failed")
+                raise
+            used[kind] = n
+            _count(name, kind)
+
+            if kind == FLOOD:
+                gate = gate_for(client)
+                gate.trip(getattr(e, "seconds", None) or 60)
+                gate.requeued += 1
+            if on_retry is not None:
+                res = on_retry(e, kind)
+                if asyncio.iscoroutine(res):
+                    await res
+            if kind == TRANSIENT:
+                await asyncio.sleep(policy.delay(n))
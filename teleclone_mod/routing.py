@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tabela de rotas por tópico para o live_mirror:
+- tópico de ORIGEM (cabeçalho de resposta da mensagem) → (chat, tópico) de DESTINO
+- despacho O(1) por dicionário; rota padrão opcional para o que não casar
+- ids de tópico resolvidos uma única vez na partida (ver forwarding.build_route_table)
+"""
+from typing import Any, Dict, List, Optional
+
+from telethon.tl.custom.message import Message
+from telethon.tl.types import MessageActionTopicCreate
+
+# o tópico "General" de um fórum tem id 1; mensagens nele chegam sem forum_topic (→ 0)
+GENERAL_IDS = (0, 1)
+
+
+def message_topic_id(msg: Message) -> int:
+    """Tópico da mensagem num fórum (0 = Geral / chat sem tópicos)."""
+    if isinstance(getattr(msg, "action", None), MessageActionTopicCreate):
+        return int(msg.id)  # a mensagem de criação É o tópico
+    rt = getattr(msg, "reply_to", None)
+    if rt is None or not getattr(rt, "forum_topic", False):
+        return 0
+    return int(getattr(rt, "reply_to_top_id", None) or getattr(rt, "reply_to_msg_id", None) or 0)
+
+
+class Route:
+    __slots__ = ("key", "dst", "dst_tid")
+
+    def __init__(self, dst: Any, dst_tid: Optional[int]):
+        self.dst = dst
+        self.dst_tid = dst_tid
+        # chave estável (fila/cursores/ordem de envio por destino)
+        self.key = f"{getattr(dst, 'id', dst)}:{dst_tid or 0}"
+
+    def __repr__(self):
+        return f"Route({self.key})"
+
+
+class RouteTable:
+    """{tópico de origem: Route} + rota padrão (None = ignora o que não casar)."""
+
+    def __init__(self, default: Optional[Route] = None):
+        self._by_topic: Dict[int, Route] = {}
+        self.default = default
+
+    def add(self, src_topic: int, route: Route):
+        if int(src_topic) in GENERAL_IDS:
+            for tid in GENERAL_IDS:
+                self._by_topic[tid] = route
+        else:
+            self._by_topic[int(src_topic)] = route
+
+    def route(self, msg: Message) -> Optional[Route]:
+        return self._by_topic.get(message_topic_id(msg), self.default)
+
+    def routes(self) -> List[Route]:
+        """Rotas distintas (uma por destino)."""
+        seen: Dict[str, Route] = {}
+        for r in list(self._by_topic.values()) + ([self.default] if self.default else []):
+            seen.setdefault(r.key, r)
+        return list(seen.values())
+
+    def __len__(self):
+        return len(self._by_topic)
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Busca de texto (SQLite FTS5) nos arquivos exportados:
+- Um índice por pasta exportada (<tópico>/search.sqlite), ao lado do chat.html
+- Preenchido pelo export_topic e pelo generate_html_only; reexportar só regrava as
+  linhas que mudaram (upsert com WHERE + gatilhos mantêm o FTS em dia)
+- Indexa texto, remetente e data; guarda o permalink e o caminho da mídia de cada mensagem
+- Busca sem rede nem Telethon: só o sqlite3 da biblioteca padrão
+
+Uso:
+    python -m teleclone_mod.search "termo"                    # todos os índices sob a pasta atual
+    python -m teleclone_mod.search "sender:joao boleto*" Grupo/Topico Outro/
+    python -m teleclone_mod.search "nota fiscal" --since 2024-01-01 --limit 50
+
+A consulta segue a sintaxe do FTS5 (frases entre aspas, prefixo*, coluna:termo, AND/OR/NOT);
+se não for válida, cada palavra vira um termo literal.
+"""
+import argparse
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, List, NamedTuple, Optional
+
+INDEX_NAME = "search.sqlite"
+INDEX_BATCH = 1000  # linhas por transação durante a indexação
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS docs (
+    id     INTEGER PRIMARY KEY,
+    seq    INTEGER NOT NULL,
+    ts     REAL    NOT NULL,
+    date   TEXT    NOT NULL,
+    sender TEXT    NOT NULL DEFAULT '',
+    text   TEXT    NOT NULL DEFAULT '',
+    media  TEXT,
+    link   TEXT    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS docs_ts ON docs (ts);
+CREATE VIRTUAL TABLE IF NOT EXISTS fts USING fts5 (
+    text, sender, date,
+    content='docs', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS docs_ai AFTER INSERT ON docs BEGIN
+    INSERT INTO fts (rowid, text, sender, date) VALUES (new.id, new.text, new.sender, new.date);
+END;
+CREATE TRIGGER IF NOT EXISTS docs_ad AFTER DELETE ON docs BEGIN
+    INSERT INTO fts (fts, rowid, text, sender, date) VALUES ('delete', old.id, old.text, old.sender, old.date);
+END;
+CREATE TRIGGER IF NOT EXISTS docs_au AFTER UPDATE OF text, sender, date ON docs BEGIN
+    INSERT INTO fts (fts, rowid, text, sender, date) VALUES ('delete', old.id, old.text, old.sender, old.date);
+    INSERT INTO fts (rowid, text, sender, date) VALUES (new.id, new.text, new.sender, new.date);
+END;
+"""
+
+# só toca na linha (e no FTS) quando algo mudou: reexportar um arquivo inteiro é barato
+_UPSERT = """
+INSERT INTO docs (id, seq, ts, date, sender, text, media, link) VALUES (?,?,?,?,?,?,?,?)
+ON CONFLICT(id) DO UPDATE SET
+    seq=excluded.seq, ts=excluded.ts, date=excluded.date, sender=excluded.sender,
+    text=excluded.text, media=excluded.media, link=excluded.link
+WHERE docs.seq IS NOT excluded.seq OR docs.ts IS NOT excluded.ts OR docs.sender IS NOT excluded.sender
+   OR docs.text IS NOT excluded.text OR docs.media IS NOT excluded.media OR docs.link IS NOT excluded.link
+"""
+
+
+class Hit(NamedTuple):
+    archive: Path
+    msg_id: int
+    date: str
+    sender: str
+    snippet: str
+    link: str
+    media: Optional[Path]
+    rank: float
+
+
+class ArchiveIndex:
+    """Índice FTS5 de uma pasta exportada."""
+
+    def __init__(self, tdir: Path):
+        self.dir = Path(tdir)
+        self.path = self.dir / INDEX_NAME
+        self.db = sqlite3.connect(str(self.path))
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(_SCHEMA)
+        self.db.commit()
+        self._rows: List[tuple] = []
+        self.changed = 0
+
+    def close(self):
+        self.commit()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    # ───────── escrita ─────────
+    def set_meta(self, **kv):
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?,?)",
+                                [(k, str(v)) for k, v in kv.items()])
+
+    def add(self, msg_id: int, *, seq: int, ts: float, sender: str, text: str,
+            link: str, media: Optional[str] = None):
+        """Enfileira uma mensagem; grava em lotes de INDEX_BATCH."""
+        date = datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M") if ts else ""
+        self._rows.append((msg_id, seq, ts, date, sender, text, media, link))
+        if len(self._rows) >= INDEX_BATCH:
+            self.commit()
+
+    def commit(self):
+        if not self._rows:
+            return
+        with self.db:
+            # rowcount conta só as linhas de docs (sem as escritas dos gatilhos no FTS)
+            self.changed += max(0, self.db.executemany(_UPSERT, self._rows).rowcount)
+        self._rows = []
+
+    # ───────── leitura ─────────
+    def meta(self, key: str, default: str = "") -> str:
+        row = self.db.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def count(self) -> int:
+        return int(self.db.execute("SELECT COUNT(*) FROM docs").fetchone()[0])
+
+    def search(self, query: str, *, limit: int = 20, since: Optional[float] = None,
+               until: Optional[float] = None) -> List[Hit]:
+        sql = (
+            "SELECT d.id, d.date, d.sender, snippet(fts, -1, '[', ']', '…', 12), d.link, d.media, bm25(fts) "
+            "FROM fts JOIN docs d ON d.id = fts.rowid WHERE fts MATCH ?"
+        )
+        args: list = []
+        if since is not None:
+            sql += " AND d.ts >= ?"
+            args.append(since)
+        if until is not None:
+            sql += " AND d.ts < ?"
+            args.append(until)
+        sql += " ORDER BY bm25(fts) LIMIT ?"
+        args.append(int(limit))
+        try:
+            rows = self.db.execute(sql, [query] + args).fetchall()
+        except sqlite3.OperationalError:
+            # sintaxe FTS5 inválida (ex.: "c++", "a-b"): cada palavra vira termo literal
+            rows = self.db.execute(sql, [literal(query)] + args).fetchall()
+        return [
+            Hit(self.dir, mid, date, sender, snip, link, self.dir / media if media else None, rank)
+            for mid, date, sender, snip, link, media, rank in rows
+        ]
+
+
+def literal(query: str) -> str:
+    """Consulta com cada palavra entre aspas (sem operadores)."""
+    return " ".join('"' + w.replace('"', '""') + '"' for w in query.split())
+
+
+# ───────────────────── várias pastas ─────────────────────
+def find_indexes(paths: Iterable[Path]) -> List[Path]:
+    """Pastas com search.sqlite: a própria pasta, ou qualquer uma abaixo dela."""
+    found: List[Path] = []
+    for p in map(Path, paths):
+        if p.is_file() and p.name == INDEX_NAME:
+            found.append(p.parent)
+        elif (p / INDEX_NAME).is_file():
+            found.append(p)
+        elif p.is_dir():
+            found.extend(sorted(f.parent for f in p.rglob(INDEX_NAME)))
+    return list(dict.fromkeys(found))
+
+
+def search_archives(paths: Iterable[Path], query: str, *, limit: int = 20,
+                    since: Optional[float] = None, until: Optional[float] = None) -> List[Hit]:
+    """Consulta cada índice e junta os `limit` melhores pelo bm25."""
+    hits: List[Hit] = []
+    for d in find_indexes(paths):
+        try:
+            with ArchiveIndex(d) as idx:
+                hits.extend(idx.search(query, limit=limit, since=since, until=until))
+        except sqlite3.DatabaseError as e:
+            print(f"⚠️  Índice ilegível em '{d}': {e}", file=sys.stderr)
+    hits.sort(key=lambda h: h.rank)
+    return hits[:limit]
+
+
+def print_hits(hits: List[Hit], elapsed: float):
+    if not hits:
+        print(f"Nenhum resultado ({elapsed*1000:.0f} ms).")
+        return
+    for h in hits:
+        print(f"\n📄 {h.archive}  #{h.msg_id}  {h.date}  {h.sender}")
+        print(f"   {h.snippet.replace(chr(10), ' ')}")
+        print(f"   🔗 {h.link}")
+        if h.media is not None:
+            if h.media.exists():
+                print(f"   📎 {h.media}")
+            elif (h.archive / "export.tar").exists():  # export em .tar (archive.py)
+                print(f"   📎 {h.archive / 'export.tar'} → {h.media.relative_to(h.archive).as_posix()}")
+            else:
+                print(f"   📎 {h.media}  (não baixada)")
+    print(f"\n{len(hits)} resultado(s) em {elapsed*1000:.0f} ms.")
+
+
+def _day(s: str) -> float:
+    return datetime.strptime(s, "%Y-%m-%d").timestamp()
+
+
+def main(argv: Optional[list] = None):
+    ap = argparse.ArgumentParser(prog="python -m teleclone_mod.search",
+                                 description="Busca nos arquivos exportados (índice FTS5).")
+    ap.add_argument("query", help="termos (sintaxe FTS5: \"frase\", prefixo*, sender:nome, OR, NOT)")
+    ap.add_argument("paths", nargs="*", default=["."], help="pastas exportadas ou raízes (padrão: .)")
+    ap.add_argument("--limit", type=int, default=20)
+    ap.add_argument("--since", type=_day, help="AAAA-MM-DD (inclusive)")
+    ap.add_argument("--until", type=_day, help="AAAA-MM-DD (exclusive)")
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    hits = search_archives(args.paths, args.query, limit=args.limit, since=args.since, until=args.until)
+    print_hits(hits, time.perf_counter() - t0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Limite de banda do processo inteiro (token bucket), separado por sentido:
+- DOWN (downloads) e UP (uploads) valem para todos os jobs e workers juntos
+- Cobrado a cada pedaço transferido (chunk do iter_download, progresso do
+  download_media, parte do upload), então arquivos grandes também respeitam o teto
+- Rajada de até TC_BW_BURST_S segundos de banda; quem passa do saldo espera
+  na fila (ordem de chegada) até o saldo voltar
+- Agenda por horário (hora local): "08:00-19:00=1M,19:00-08:00=0"; fora das
+  faixas listadas vale sem limite. Faixas que viram a meia-noite são aceitas
+- Taxas em bytes/s com sufixo K/M/G opcional (1M = 1 MiB/s); 0 = sem limite
+
+    TC_BW_DOWN="4M"                          # sempre 4 MiB/s
+    TC_BW_UP="08:00-19:00=512K,19:00-08:00=0"  # 512 KiB/s no expediente
+"""
+import asyncio
+import inspect
+import os
+import time
+from typing import Callable, List, Optional, Tuple
+
+from teleclone_mod import metrics
+
+# ───────── Config por ambiente ─────────
+BURST_S = float(os.getenv("TC_BW_BURST_S", "1"))
+
+_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_rate(s: str) -> float:
+    """"512K" → 524288.0 bytes/s; "" ou "0" → 0 (sem limite)."""
+    s = s.strip().upper().removesuffix("B")
+    if not s:
+        return 0.0
+    unit = s[-1] if s[-1] in _UNITS else ""
+    return float(s[:len(s) - len(unit)]) * _UNITS[unit]
+
+
+def _minutes(hhmm: str) -> int:
+    h, _, m = hhmm.strip().partition(":")
+    return (int(h) * 60 + int(m or 0)) % (24 * 60)
+
+
+def parse_schedule(spec: str) -> List[Tuple[int, int, float]]:
+    """
+    "4M" → taxa fixa; "08:00-19:00=1M,19:00-08:00=256K" → [(início, fim, taxa)]
+    em minutos do dia.
+    """
+    spec = (spec or "").strip()
+    if "=" not in spec:
+        return [(0, 24 * 60, parse_rate(spec))]
+    out = []
+    for item in spec.split(","):
+        span, _, rate = item.partition("=")
+        start, _, end = span.partition("-")
+        out.append((_minutes(start), _minutes(end), parse_rate(rate)))
+    return out
+
+
+class TokenBucket:
+    """
+    `await bucket.take(n)` depois de transferir `n` bytes: desconta do saldo e,
+    se o saldo ficou negativo, espera o tempo de pagar a dívida.
+    """
+
+    def __init__(self, direction: str, schedule: List[Tuple[int, int, float]]):
+        self.direction = direction
+        self.schedule = schedule
+        self.tokens = 0.0
+        self.waited = 0.0        # segundos de espera acumulados
+        self._stamp = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def rate(self, now: Optional[time.struct_time] = None) -> float:
+        t = now or time.localtime()
+        m = t.tm_hour * 60 + t.tm_min
+        for start, end, rate in self.schedule:
+            inside = start <= m < end if start < end else (m >= start or m < end)
+            if inside:
+                return rate
+        return 0.0
+
+    @property
+    def limited(self) -> bool:
+        return any(rate > 0 for _, _, rate in self.schedule)
+
+    async def take(self, n: int):
+        if n <= 0 or not self.limited:
+            return
+        rate = self.rate()
+        if rate <= 0:
+            return
+        async with self._lock:  # quem chegou antes paga antes
+            now = time.monotonic()
+            cap = rate * BURST_S
+            self.tokens = min(cap, self.tokens + (now - self._stamp) * rate) - n
+            self._stamp = now
+            if self.tokens < 0:
+                wait = -self.tokens / rate
+                self.waited += wait
+                metrics.inc("tc_bw_wait_seconds_total", wait, dir=self.direction)
+                await asyncio.sleep(wait)
+
+    def meter(self, inner: Optional[Callable] = None) -> Callable:
+        """
+        progress_callback(atual, total) que cobra o que andou desde a última chamada
+        (e repassa para `inner`). Um por tentativa: recomeço zera a conta.
+        """
+        last = 0
+
+        async def _cb(current, total):
+            nonlocal last
+            delta, last = current - last, current
+            if inner is not None:
+                r = inner(current, total)
+                if inspect.isawaitable(r):
+                    await r
+            await self.take(delta)
+
+        return _cb
+
+
+DOWN = TokenBucket("down", parse_schedule(os.getenv("TC_BW_DOWN", "0")))
+UP = TokenBucket("up", parse_schedule(os.getenv("TC_BW_UP", "0")))
+
+
+@metrics.collector
+def _rate_gauges():
+    for b in (DOWN, UP):
+        yield "tc_bw_limit_bytes_per_second", {"dir": b.direction}, b.rate()
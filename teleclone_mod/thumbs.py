@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Miniaturas (thumb) de vídeo:
+- Busca concorrente: a thumb é baixada em paralelo ao download/upload principal
+- Cache LRU limitado em dois níveis (RAM + disco), chave = id do documento
+- Pedidos simultâneos da mesma thumb compartilham um único download
+- Best-effort: qualquer erro devolve None (envio segue sem thumb)
+"""
+import asyncio
+import contextlib
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+from telethon import TelegramClient
+from telethon.tl.custom.message import Message
+
+# ───────── Config por ambiente ─────────
+THUMB_MEM_ITEMS = int(os.getenv("TC_THUMB_MEM_ITEMS", "256"))
+THUMB_DISK_ITEMS = int(os.getenv("TC_THUMB_DISK_ITEMS", "5000"))  # 0 = sem cache em disco
+THUMB_DIR = Path(os.getenv("TC_THUMB_DIR") or (Path(__file__).resolve().parent / "data" / "thumbs"))
+
+
+class ThumbCache:
+    """LRU em RAM (bytes) + LRU em disco (um arquivo por documento)."""
+
+    def __init__(self, mem_items: int, disk_items: int, disk_dir: Path):
+        self.mem_items = mem_items
+        self.disk_items = disk_items
+        self.disk_dir = disk_dir
+        self._mem: "OrderedDict[int, bytes]" = OrderedDict()
+        self._disk: Optional["OrderedDict[int, Path]"] = None  # carregado sob demanda
+        self.hits = self.disk_hits = self.misses = 0
+
+    def _disk_index(self) -> "OrderedDict[int, Path]":
+        if self._disk is None:
+            self._disk = OrderedDict()
+            if self.disk_items and self.disk_dir.is_dir():
+                files = sorted(self.disk_dir.glob("*.thumb"), key=lambda p: p.stat().st_mtime)
+                for p in files:
+                    with contextlib.suppress(ValueError):
+                        self._disk[int(p.stem)] = p
+        return self._disk
+
+    def _mem_put(self, doc_id: int, data: bytes):
+        self._mem[doc_id] = data
+        self._mem.move_to_end(doc_id)
+        while len(self._mem) > self.mem_items:
+            self._mem.popitem(last=False)
+
+    def get(self, doc_id: int) -> Optional[bytes]:
+        data = self._mem.get(doc_id)
+        if data is not None:
+            self._mem.move_to_end(doc_id)
+            self.hits += 1
+            return data
+        if self.disk_items:
+            p = self._disk_index().get(doc_id)
+            if p is not None:
+                try:
+                    data = p.read_bytes()
+                except OSError:
+                    self._disk_index().pop(doc_id, None)
+                else:
+                    self._disk_index().move_to_end(doc_id)
+                    with contextlib.suppress(OSError):
+                        os.utime(p)
+                    self._mem_put(doc_id, data)
+                    self.disk_hits += 1
+                    return data
+        self.misses += 1
+        return None
+
+    def put(self, doc_id: int, data: bytes):
+        self._mem_put(doc_id, data)
+        if not self.disk_items:
+            return
+        idx = self._disk_index()
+        try:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            p = self.disk_dir / f"{doc_id}.thumb"
+            p.write_bytes(data)
+        except OSError:
+            return
+        idx[doc_id] = p
+        idx.move_to_end(doc_id)
+        while len(idx) > self.disk_items:
+            _, old = idx.popitem(last=False)
+            with contextlib.suppress(OSError):
+                old.unlink()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "mem": len(self._mem),
+            "disk": len(self._disk or {}),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+        }
+
+
+CACHE = ThumbCache(THUMB_MEM_ITEMS, THUMB_DISK_ITEMS, THUMB_DIR)
+_inflight: Dict[int, "asyncio.Task"] = {}
+
+
+async def _download_smallest_thumb(client: TelegramClient, msg: Message) -> Optional[bytes]:
+    try:
+        doc = getattr(getattr(msg, "media", None), "document", None)
+        thumbs = getattr(doc, "thumbs", None) or []
+        if not thumbs:
+            return None
+        # usar a menor thumb
+        return await client.download_media(thumbs[0], file=bytes)
+    except Exception:
+        return None
+
+
+async def get_thumb(client: TelegramClient, msg: Message) -> Optional[bytes]:
+    """Thumb do documento de `msg` (cache → download). None se não houver/erro."""
+    doc = getattr(getattr(msg, "media", None), "document", None)
+    doc_id = getattr(doc, "id", None)
+    if doc_id is None:
+        return await _download_smallest_thumb(client, msg)
+
+    data = CACHE.get(doc_id)
+    if data is not None:
+        return data
+
+    task = _inflight.get(doc_id)
+    if task is None:
+        task = _inflight[doc_id] = asyncio.ensure_future(_download_smallest_thumb(client, msg))
+        task.add_done_callback(lambda _t: _inflight.pop(doc_id, None))
+    data = await asyncio.shield(task)
+    if data:
+        CACHE.put(doc_id, data)
+    return data
+
+
+def prefetch_thumb(client: TelegramClient, msg: Message) -> "asyncio.Task":
+    """Dispara a busca da thumb em paralelo; aguarde a task na hora do send_file."""
+    return asyncio.ensure_future(get_thumb(client, msg))
+
+
+def thumb_stats() -> Dict[str, int]:
+    return CACHE.stats()
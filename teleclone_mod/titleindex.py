@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Índice em memória de títulos (chats/tópicos) para as telas de seleção:
+- Montado uma vez por lista; cada busca consulta o índice, sem rede e sem varrer
+  todos os títulos de novo
+- Trigramas (tolera erro de digitação: "telgram" acha "Telegram") + prefixo de
+  palavra ("dev back" acha "Backend Devs")
+- Sem acento e sem caixa: "acoes" acha "Ações"
+- Busca de 1-2 letras (curta demais para trigramas): varredura por substring,
+  "an" acha "Canal 1"
+- Resultado ordenado: título igual > começa com > contém > prefixos > parecido
+
+Uso:
+    idx = TitleIndex(dialogs, key=lambda d: d.entity.title)
+    achados = idx.search("telgram")
+"""
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import Counter
+from typing import Callable, Dict, Generic, List, Optional, Set, Tuple, TypeVar
+
+T = TypeVar("T")
+
+MIN_COVERAGE = 0.5  # fração dos trigramas da busca presentes no título (parecido)
+SHORT_QUERY = 3     # abaixo disso: substring em todos os títulos
+_CACHE_MAX = 256    # buscas memorizadas por índice
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize(s: str) -> str:
+    """Sem acentos, casefold, pontuação vira espaço."""
+    s = unicodedata.normalize("NFKD", s or "")
+    s = "".join(c for c in s if not unicodedata.combining(c))
+    return _NON_WORD.sub(" ", s.casefold()).strip()
+
+
+def _grams(norm: str) -> Set[str]:
+    p = f" {norm} "
+    return {p[i:i + 3] for i in range(len(p) - 2)}
+
+
+class TitleIndex(Generic[T]):
+    """Itens indexados pelo título (`key`); search() devolve os itens ordenados."""
+
+    def __init__(self, items: List[T], key: Callable[[T], str] = str):
+        self.items: List[T] = list(items)
+        self._norm: List[str] = [normalize(key(x)) for x in self.items]
+        self._postings: Dict[str, List[int]] = {}
+        self._ngrams: List[int] = []
+        words: Set[Tuple[str, int]] = set()
+        for i, n in enumerate(self._norm):
+            g = _grams(n)
+            self._ngrams.append(len(g))
+            for t in g:
+                self._postings.setdefault(t, []).append(i)
+            words.update((w, i) for w in n.split())
+        self._words: List[Tuple[str, int]] = sorted(words)
+        self._cache: Dict[str, List[int]] = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def search(self, term: str, limit: Optional[int] = None) -> List[T]:
+        q = normalize(term)
+        if not q:
+            return self.items[:limit]
+        ids = self._cache.get(q)
+        if ids is None:
+            if len(self._cache) >= _CACHE_MAX:
+                self._cache.clear()
+            ids = self._cache[q] = self._rank(q)
+        return [self.items[i] for i in ids[:limit]]
+
+    # ───────── internos ─────────
+    def _prefixed(self, word: str) -> Set[int]:
+        """Itens com alguma palavra começando por `word` (busca binária)."""
+        out: Set[int] = set()
+        j = bisect_left(self._words, (word, -1))
+        while j < len(self._words) and self._words[j][0].startswith(word):
+            out.add(self._words[j][1])
+            j += 1
+        return out
+
+    def _rank(self, q: str) -> List[int]:
+        pref: Optional[Set[int]] = None
+        for w in q.split():
+            hit = self._prefixed(w)
+            pref = hit if pref is None else pref & hit
+            if not pref:
+                break
+        pref = pref or set()
+
+        qg = _grams(q)
+        shared: Counter = Counter()
+        for g in qg:
+            shared.update(self._postings.get(g, ()))
+
+        cand = shared.keys() | pref
+        if len(q) < SHORT_QUERY:
+            # trigramas com espaço só cobrem início/fim de palavra: "eg" no meio de "Telegram" não
+            cand |= {i for i, n in enumerate(self._norm) if q in n}
+
+        scored: List[Tuple[float, str, int]] = []
+        for i in cand:
+            n = self._norm[i]
+            cover = shared[i] / len(qg)
+            if n == q:
+                score = 4.0
+            elif n.startswith(q):
+                score = 3.0
+            elif q in n:
+                score = 2.0
+            elif i in pref:
+                score = 1.5
+            elif cover >= MIN_COVERAGE:
+                score = cover
+            else:
+                continue
+            # desempate: títulos mais curtos/parecidos primeiro (Dice)
+            score += shared[i] / (len(qg) + self._ngrams[i])
+            scored.append((-score, n, i))
+        scored.sort()
+        return [i for _, _, i in scored]
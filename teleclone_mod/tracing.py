@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Spans por etapa em formato Chrome Trace (abre em chrome://tracing ou ui.perfetto.dev):
+- Ligado por TC_TRACE=<arquivo.json>; desligado, `span()` devolve um contexto nulo
+  pré-alocado (custo de uma checagem de global por etapa)
+- Cada tarefa asyncio vira uma "thread" no visualizador: etapas de uma mensagem
+  aparecem aninhadas e mensagens em paralelo ficam em faixas separadas
+- Buffer limitado (TC_TRACE_MAX_EVENTS); o arquivo é regravado em flush() e na saída
+
+Uso:
+    with tracing.span("download_media", msg=msg.id):
+        ...
+    async for m in tracing.traced_aiter(client.iter_messages(...), "iter_messages"):
+        ...
+"""
+import asyncio
+import atexit
+import contextlib
+import itertools
+import json
+import os
+import time
+import weakref
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+# ───────── Config por ambiente ─────────
+TRACE_PATH = os.getenv("TC_TRACE") or None
+MAX_EVENTS = int(os.getenv("TC_TRACE_MAX_EVENTS", "200000"))
+
+_NULL = contextlib.nullcontext()
+_PID = os.getpid()
+_T0 = time.perf_counter()
+
+_enabled = False
+_path: Optional[Path] = None
+_events: List[Dict[str, Any]] = []
+# pela própria tarefa (id() se repete após o GC); some junto com a tarefa
+_tids: "weakref.WeakKeyDictionary[asyncio.Task, int]" = weakref.WeakKeyDictionary()
+_next_tid = itertools.count(1)
+_dropped = 0
+
+
+def _now_us() -> float:
+    return (time.perf_counter() - _T0) * 1e6
+
+
+def _tid() -> int:
+    """Id curto e estável da tarefa asyncio atual (0 = fora de tarefa)."""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    if task is None:
+        return 0
+    tid = _tids.get(task)
+    if tid is None:
+        tid = _tids[task] = next(_next_tid)
+        _emit({"name": "thread_name", "ph": "M", "pid": _PID, "tid": tid,
+               "args": {"name": task.get_name()}})
+    return tid
+
+
+def _emit(ev: Dict[str, Any]):
+    global _dropped
+    if len(_events) >= MAX_EVENTS:
+        _dropped += 1
+        return
+    _events.append(ev)
+
+
+class _Span:
+    __slots__ = ("name", "args", "tid", "t0")
+
+    def __init__(self, name: str, args: Dict[str, Any]):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.tid = _tid()
+        self.t0 = _now_us()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        ev = {"name": self.name, "ph": "X", "pid": _PID, "tid": self.tid,
+              "ts": round(self.t0, 1), "dur": round(_now_us() - self.t0, 1)}
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        if self.args:
+            ev["args"] = self.args
+        _emit(ev)
+        return False
+
+
+def span(name: str, **args):
+    """Context manager que mede uma etapa (nulo quando o tracing está desligado)."""
+    if not _enabled:
+        return _NULL
+    return _Span(name, args)
+
+
+def traced_aiter(it: AsyncIterator, name: str) -> AsyncIterator:
+    """Envolve um iterador assíncrono medindo cada passo (ex.: páginas do iter_messages)."""
+    return _traced(it, name) if _enabled else it
+
+
+async def _traced(it: AsyncIterator, name: str) -> AsyncIterator:
+    ait = it.__aiter__()
+    while True:
+        with span(name):
+            try:
+                x = await ait.__anext__()
+            except StopAsyncIteration:
+                return
+        yield x
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable(path: Optional[str] = None):
+    """Liga o tracing (gravado em `path` ou TC_TRACE)."""
+    global _enabled, _path
+    p = path or TRACE_PATH
+    if not p:
+        return
+    _path = Path(p)
+    if not _enabled:
+        atexit.register(flush)
+    _enabled = True
+
+
+def flush():
+    """Regrava o arquivo de trace com todos os eventos até agora (troca atômica)."""
+    if not _enabled or _path is None:
+        return
+    data = {"traceEvents": _events, "displayTimeUnit": "ms",
+            "otherData": {"dropped_events": _dropped}}
+    with contextlib.suppress(Exception):
+        _path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = _path.with_suffix(_path.suffix + ".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False), "utf-8")
+        os.replace(tmp, _path)
+
+
+if TRACE_PATH:
+    enable(TRACE_PATH)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Upload retomável de arquivos grandes (diário em SQLite):
+- Arquivos > 10MB sobem em partes (SaveBigFilePart) e cada parte confirmada vai para o
+  diário: chave do arquivo → file_id, partes confirmadas, total, carimbo de tempo
+- Depois de uma queda, o mesmo arquivo continua da primeira parte não confirmada,
+  com o mesmo file_id (o Telegram guarda as partes por um tempo)
+- Partes expiradas: entradas mais velhas que TC_UPLOAD_JOURNAL_TTL_H são ignoradas;
+  se o envio ainda assim der FILE_PART_X_MISSING, finish() e o upload recomeça inteiro
+- Chave: caminho+tamanho+mtime (path_key), entrada do export.tar ou id do documento
+  de origem (doc_key, forward)
+- Até 10MB: upload comum (refazer custa pouco)
+- As partes sobem em paralelo (parupload.py); o diário guarda a primeira parte ainda
+  não confirmada (as seguintes já confirmadas fora de ordem são reenviadas, sem dano)
+- O relay (relay.py) usa o mesmo diário pela chave do documento: retoma o
+  iter_download no byte da primeira parte não confirmada
+- TC_UPLOAD_JOURNAL=0 desliga (sempre upload completo)
+"""
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Optional
+
+from telethon import TelegramClient, helpers
+from telethon.errors.rpcerrorlist import FilePart0MissingError, FilePartMissingError
+from telethon.tl import types
+
+from teleclone_mod import logs, metrics, parupload
+from teleclone_mod.parupload import BIG_FILE, PART_SIZE
+
+# ───────── Config por ambiente ─────────
+_ENV = os.getenv("TC_UPLOAD_JOURNAL", "")
+ENABLED = _ENV != "0"
+JOURNAL_DB = Path(_ENV if _ENV not in ("", "0", "1") else
+                  Path(__file__).resolve().parent / "data" / "upload_journal.sqlite")
+TTL = float(os.getenv("TC_UPLOAD_JOURNAL_TTL_H", "12")) * 3600
+
+# erro no envio que indica partes que o servidor já descartou
+PARTS_GONE = (FilePartMissingError, FilePart0MissingError)
+
+log = logs.get(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    key        TEXT PRIMARY KEY,
+    file_id    INTEGER NOT NULL,
+    parts      INTEGER NOT NULL,
+    done       INTEGER NOT NULL DEFAULT 0,
+    size       INTEGER NOT NULL,
+    updated_at REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS uploads_file_id ON uploads (file_id);
+"""
+
+_db: Optional[sqlite3.Connection] = None
+
+
+def _conn() -> sqlite3.Connection:
+    global _db
+    if _db is None:
+        JOURNAL_DB.parent.mkdir(parents=True, exist_ok=True)
+        _db = sqlite3.connect(str(JOURNAL_DB))
+        _db.execute("PRAGMA journal_mode=WAL")
+        _db.execute("PRAGMA synchronous=NORMAL")
+        _db.executescript(_SCHEMA)
+        _db.commit()
+    return _db
+
+
+def path_key(path) -> str:
+    """Chave estável de um arquivo local (muda se o conteúdo for regravado)."""
+    st = os.stat(path)
+    return f"path:{Path(path).resolve()}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def _resume_point(key: str, size: int, parts: int):
+    row = _conn().execute(
+        "SELECT file_id, done, updated_at FROM uploads WHERE key=? AND size=? AND parts=?",
+        (key, size, parts),
+    ).fetchone()
+    if row and time.time() - row[2] < TTL:
+        return int(row[0]), int(row[1])
+    file_id = helpers.generate_random_long()
+    with _conn():
+        _conn().execute(
+            "INSERT OR REPLACE INTO uploads (key, file_id, parts, done, size, updated_at) VALUES (?,?,?,0,?,?)",
+            (key, file_id, parts, size, time.time()),
+        )
+    return file_id, 0
+
+
+def resume(key: str, size: int, file_name: str):
+    """
+    Ponto de retomada de um upload em partes de PART_SIZE: (file_id, primeira parte
+    ainda não confirmada, on_part). `on_part(i)` grava a marca d'água contígua
+    (partes chegam fora de ordem). Usado aqui e pelo relay (relay.py).
+    """
+    parts = -(-size // PART_SIZE)
+    file_id, start = _resume_point(key, size, parts)
+    if start:
+        log.info("♻️  Retomando upload de '%s' na parte %d/%d.", file_name, start + 1, parts)
+        metrics.inc("tc_upload_resumed_parts_total", start)
+
+    confirmed = set()
+    mark = start
+
+    def _on_part(index: int):
+        nonlocal mark
+        confirmed.add(index)
+        if index != mark:
+            return
+        while mark in confirmed:
+            confirmed.discard(mark)
+            mark += 1
+        with _conn():
+            _conn().execute("UPDATE uploads SET done=?, updated_at=? WHERE key=?", (mark, time.time(), key))
+
+    return file_id, start, _on_part
+
+
+async def upload(client: TelegramClient, fobj, file_name: str, key: Optional[str],
+                 *, part_size_kb: float = 512):
+    """
+    Handle para send_file (InputFileBig quando retomável). `fobj`: caminho ou
+    arquivo com seek/read. Sem `key`, diário desligado ou até 10MB → upload_file comum.
+    """
+    size = os.path.getsize(fobj) if isinstance(fobj, (str, os.PathLike)) else parupload.stream_size(fobj)
+    if not (ENABLED and key and size > BIG_FILE):
+        return await parupload.upload(client, fobj, file_name, part_size=int(part_size_kb * 1024))
+
+    file_id, start, on_part = resume(key, size, file_name)
+    return await parupload.upload(client, fobj, file_name, part_size=PART_SIZE, file_id=file_id,
+                                  skip=range(start), on_part=on_part)
+
+
+def finish(handle):
+    """
+    Tira o arquivo do diário: depois de um envio concluído, ou quando o envio deu
+    PARTS_GONE (a próxima tentativa recomeça do zero).
+    """
+    fid = getattr(handle, "id", None)
+    if ENABLED and isinstance(handle, types.InputFileBig) and fid is not None:
+        with _conn():
+            _conn().execute("DELETE FROM uploads WHERE file_id=?", (fid,))
+
+
+def forget(key: Optional[str]):
+    """Tira a entrada de `key` do diário (ex.: o servidor recusou as partes gravadas)."""
+    if ENABLED and key:
+        with _conn():
+            _conn().execute("DELETE FROM uploads WHERE key=?", (key,))
+
+
+def doc_key(msg) -> Optional[str]:
+    """Chave pelo documento de origem (forward): o mesmo arquivo rebaixado casa."""
+    doc = getattr(getattr(msg, "media", None), "document", None)
+    if doc is None:
+        return None
+    return f"doc:{doc.id}:{int(getattr(doc, 'size', 0) or 0)}"